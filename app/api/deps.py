@@ -6,7 +6,7 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_session
+from app.db.session import WORKLOADS, current_workload, get_session
 from app.core.config import settings
 from app.core.security import decode_token
 from app.db.models import User
@@ -39,6 +39,21 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 DBDep = Annotated[AsyncSession, Depends(get_session)]
 
 
+def use_workload(name: str):
+    """
+    Пул БД для роутера: include_router(..., dependencies=[Depends(use_workload("analytics"))]).
+    Dependency роутера виконується раніше за get_session, тож сесія запиту
+    (і get_current_user) береться з пулу цього класу.
+    """
+    if name not in WORKLOADS:
+        raise ValueError(f"unknown workload {name!r}, expected one of {WORKLOADS}")
+
+    async def _set() -> None:
+        current_workload.set(name)
+
+    return _set
+
+
 async def get_current_user(
     db: DBDep,
     token: Annotated[str, Depends(oauth2_scheme)]
@@ -4,14 +4,20 @@ from __future__ import annotations
 import secrets
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, func, case, cast, literal
-from sqlalchemy.dialects.postgresql import INTERVAL
-from pydantic import BaseModel
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from sqlalchemy import select, func, case, update
+from pydantic import BaseModel, Field
 
 from ..deps import get_current_user, DBDep, require_role
+from app.core import cache
+from app.core.admission import admission
+from app.core.cache import cached, invalidate
 from app.core.security import hash_password
 from app.db.models import User, Ticket, Question, Answer
+from app.db.dialects import day_trunc, days_ago, epoch_diff
+from app.services import audit, deadletter, workload
+from app.services.archive import ticket_source
+from app.services.notifications import _get_redis, enqueue, lane_stats
 from sqlalchemy import select
 # NB: узгоджені enum-и
 try:
@@ -74,15 +80,49 @@ async def list_users(db: DBDep):
     "/users/{user_id}/role",
     dependencies=[Depends(require_role(Role.admin))],
 )
-async def set_role(user_id: int, payload: SetRoleRequest, db: DBDep):
-    u = (
-        await db.execute(select(User).where(User.id == user_id))
-    ).scalar_one_or_none()
-    if not u:
+async def set_role(
+    user_id: int,
+    payload: SetRoleRequest,
+    db: DBDep,
+    current=Depends(get_current_user),
+):
+    if db.bind.dialect.name == "postgresql":
+        # UPDATE ... FROM (SELECT старої ролі) RETURNING — один стейтмент;
+        # RETURNING бачить нові значення, тож стару роль беремо з підзапиту
+        prev = select(User.id, User.role.label("old_role")).where(User.id == user_id).subquery("prev")
+        row = (
+            await db.execute(
+                update(User)
+                .where(User.id == prev.c.id)
+                .values(role=payload.role)
+                .returning(User.id, User.email, User.is_active, prev.c.old_role)
+                .execution_options(synchronize_session=False)
+            )
+        ).first()
+        old_role = row.old_role if row else None
+    else:
+        # SQLite не пускає FROM-таблиці в RETURNING: стара роль окремим SELECT
+        old_role = (await db.execute(select(User.role).where(User.id == user_id))).scalar_one_or_none()
+        row = (
+            await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(role=payload.role)
+                .returning(User.id, User.email, User.is_active)
+                .execution_options(synchronize_session=False)
+            )
+        ).first()
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
-    u.role = payload.role
     await db.commit()
-    return {"id": u.id, "email": u.email, "role": payload.role}
+    await invalidate(f"user:{row.id}", "reports")
+    await workload.track_operator(row.id, active=payload.role == Role.operator and row.is_active)
+    audit.record("user.role_changed", actor_id=current.id, payload={
+        "user_id": row.id,
+        "from": getattr(old_role, "value", str(old_role)),
+        "to": getattr(payload.role, "value", str(payload.role)),
+    })
+    return {"id": row.id, "email": row.email, "role": payload.role}
 
 
 @router.delete(
@@ -98,21 +138,27 @@ async def delete_user(
     М'яке видалення користувача: ставимо is_active = False.
     Використовується кнопкою "Видалити" в адмінці.
     """
-    u = (
-        await db.execute(select(User).where(User.id == user_id))
-    ).scalar_one_or_none()
-    if not u:
-        raise HTTPException(status_code=404, detail="User not found")
-
     # не даємо видалити самого себе
-    if u.id == current.id:
+    if user_id == current.id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Не можна видалити власний акаунт",
         )
 
-    u.is_active = False
+    found = (
+        await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(is_active=False)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalar_one_or_none()
+    if found is None:
+        raise HTTPException(status_code=404, detail="User not found")
     await db.commit()
+    await invalidate(f"user:{user_id}", "reports")
+    await workload.track_operator(user_id, active=False)
     return {"ok": True}
 
 
@@ -120,13 +166,15 @@ async def delete_user(
     "/reports/latest",
     dependencies=[Depends(require_role(Role.admin))],
 )
-async def latest_report(db: DBDep):
+@cached("admin.reports_latest", tags=("reports",))
+async def latest_report(db: DBDep, include_archived: bool = False):
+    T = ticket_source(include_archived)
     by_status = (
-        await db.execute(select(Ticket.status, func.count()).group_by(Ticket.status))
+        await db.execute(select(T.status, func.count()).group_by(T.status))
     ).all()
     by_priority = (
         await db.execute(
-            select(Ticket.priority, func.count()).group_by(Ticket.priority)
+            select(T.priority, func.count()).group_by(T.priority)
         )
     ).all()
     return {
@@ -172,17 +220,22 @@ class AdminStatsOut(BaseModel):
     dependencies=[Depends(require_role(Role.admin))],
     response_model=AdminStatsOut,
 )
-async def admin_stats(db: DBDep):
+@cached("admin.stats", tags=("reports",))
+async def admin_stats(db: DBDep, include_archived: bool = False):
+    # за замовчуванням лише гаряча таблиця; include_archived — разом з архівом
+    T = ticket_source(include_archived)
+
     # 1) Users
     users_q = (
         select(
             User.email.label("email"),
-            func.count(Ticket.id).label("tickets_created"),
+            func.count(T.id).label("tickets_created"),
         )
         .select_from(User)
-        .join(Ticket, Ticket.author_id == User.id, isouter=True)
+        .join(T, T.author_id == User.id, isouter=True)
         .where(User.role == Role.user)
-        .group_by(User.id)
+        # (email, id) — порядок ix_users_role_email: групування й сортування без temp b-tree
+        .group_by(User.email, User.id)
         .order_by(User.email.asc())
     )
     users_rows = (await db.execute(users_q)).all()
@@ -197,27 +250,25 @@ async def admin_stats(db: DBDep):
             User.email.label("email"),
             func.coalesce(
                 func.sum(
-                    case((Ticket.status == Status.in_progress, 1), else_=0)
+                    case((T.status == Status.in_progress, 1), else_=0)
                 ),
                 0,
             ).label("in_progress"),
             func.coalesce(
-                func.sum(case((Ticket.status == Status.done, 1), else_=0)),
+                func.sum(case((T.status == Status.done, 1), else_=0)),
                 0,
             ).label("done"),
             func.coalesce(
                 func.sum(
-                    case((Ticket.status == Status.canceled, 1), else_=0)
+                    case((T.status == Status.canceled, 1), else_=0)
                 ),
                 0,
             ).label("canceled"),
             func.avg(
                 case(
                     (
-                        Ticket.status == Status.done,
-                        func.extract(
-                            "epoch", Ticket.resolved_at - Ticket.created_at
-                        )
+                        T.status == Status.done,
+                        epoch_diff(T.resolved_at, T.created_at)
                         / 60.0,
                     ),
                     else_=None,
@@ -225,10 +276,10 @@ async def admin_stats(db: DBDep):
             ).label("avg_resolution_minutes"),
         )
         .select_from(User)
-        .join(Ticket, Ticket.assignee_id == User.id, isouter=True)
+        .join(T, T.assignee_id == User.id, isouter=True)
         .where(User.role == Role.operator)
         .where(User.is_active == True)  # тільки активні оператори  # noqa: E712
-        .group_by(User.id)
+        .group_by(User.email, User.id)
         .order_by(User.email.asc())
     )
     op_rows = (await db.execute(op_q)).all()
@@ -249,20 +300,26 @@ async def admin_stats(db: DBDep):
             )
         )
 
-    # 3) QA
+    # 3) QA: спершу 100 останніх питань (ix_questions_created_at), потім агрегат
+    # відповідей лише по них — а не GROUP BY по всій таблиці questions
+    recent_q = (
+        select(Question.id, Question.title, Question.author_id, Question.created_at)
+        .order_by(Question.created_at.desc())
+        .limit(100)
+        .subquery("recent_questions")
+    )
     qa_q = (
         select(
-            Question.id.label("question_id"),
-            Question.title.label("title"),
+            recent_q.c.id.label("question_id"),
+            recent_q.c.title.label("title"),
             User.email.label("user_email"),
             func.count(Answer.id).label("answers"),
             func.max(Answer.created_at).label("last_answer_at"),
         )
-        .join(User, User.id == Question.author_id)
-        .join(Answer, Answer.question_id == Question.id, isouter=True)
-        .group_by(Question.id, Question.title, User.email)
-        .order_by(Question.created_at.desc())
-        .limit(100)
+        .join(User, User.id == recent_q.c.author_id)
+        .join(Answer, Answer.question_id == recent_q.c.id, isouter=True)
+        .group_by(recent_q.c.id, recent_q.c.title, recent_q.c.created_at, User.email)
+        .order_by(recent_q.c.created_at.desc())
     )
     qa_rows = (await db.execute(qa_q)).all()
     qa_stats = [
@@ -328,7 +385,11 @@ async def list_operator_signups(db: DBDep):
     "/operator-signups/{ticket_id}/approve",
     dependencies=[Depends(require_role(Role.admin))],
 )
-async def approve_operator_signup(ticket_id: int, db: DBDep):
+async def approve_operator_signup(
+    ticket_id: int,
+    db: DBDep,
+    current=Depends(get_current_user),
+):
     # 1) знайти тікет-заявку
     t = (
         await db.execute(select(Ticket).where(Ticket.id == ticket_id))
@@ -364,6 +425,12 @@ async def approve_operator_signup(ticket_id: int, db: DBDep):
     t.resolved_at = func.now()
 
     await db.commit()
+    await invalidate(f"user:{u.id}", f"ticket:{t.id}", "reports")
+    await workload.track_operator(u.id, active=True)
+    audit.record("operator_signup.approved", actor_id=current.id, ticket_id=t.id, payload={
+        "user_id": u.id,
+        "role": "operator",
+    })
     return {"ok": True, "user_id": u.id, "email": u.email, "role": "operator"}
 
 
@@ -384,28 +451,30 @@ class OperatorProductivity(BaseModel):
     dependencies=[Depends(require_role(Role.admin))],
     response_model=list[OperatorProductivity],
 )
-async def operator_productivity(db: DBDep, days: int = 30):
+@cached("admin.operator_productivity", tags=("reports",))
+async def operator_productivity(db: DBDep, days: int = 30, include_archived: bool = False):
     """
     Повертає по кожному активному оператору серію по днях за останні N днів:
     [{ operator_id, email, series: [{date:'YYYY-MM-DD', count:int}, ...] }, ...]
     """
     # агрегація: скільки 'done' у кожного оператора по днях
-    day_trunc = func.date_trunc("day", Ticket.resolved_at).label("d")
-
-    # інтервал останніх N днів через CAST до INTERVAL (SQLAlchemy не приймає kwargs у make_interval)
-    interval_days = cast(literal(f"{int(days)} days"), INTERVAL())
+    # date_trunc / INTERVAL компілюються під діалект (див. app/db/dialects.py)
+    T = ticket_source(include_archived)
+    # в архіві done-заявки лежать уже зі статусом archived
+    done = (Status.done, Status.archived) if include_archived else (Status.done,)
+    d_col = day_trunc(T.resolved_at).label("d")
 
     base = (
         select(
-            Ticket.assignee_id.label("op_id"),
-            day_trunc,
-            func.count(Ticket.id).label("cnt"),
+            T.assignee_id.label("op_id"),
+            d_col,
+            func.count(T.id).label("cnt"),
         )
-        .where(Ticket.status == Status.done)
-        .where(Ticket.resolved_at.isnot(None))
-        .where(Ticket.resolved_at >= func.now() - interval_days)
-        .group_by(Ticket.assignee_id, day_trunc)
-        .order_by(day_trunc.asc())
+        .where(T.status.in_(done))
+        .where(T.resolved_at.isnot(None))
+        .where(T.resolved_at >= days_ago(days))
+        .group_by(T.assignee_id, d_col)
+        .order_by(d_col.asc())
     )
     rows = (await db.execute(base)).all()
 
@@ -525,3 +594,105 @@ async def list_operator_feedback(db: DBDep):
         )
     return out
 
+
+
+# ===== NEW: dead-letter нотифікацій (перегляд / replay) =====
+
+
+class DeadLetterOut(BaseModel):
+    id: str
+    event_type: str | None = None
+    destination: str | None = None
+    error_class: str | None = None
+    error: str | None = None
+    payload: dict
+    failed_at: float
+
+
+class DeadLetterReplayIn(BaseModel):
+    event_type: str | None = None
+    destination: str | None = None
+    error_class: str | None = None
+    ids: list[str] | None = Field(None, max_length=1000)
+    limit: int = Field(1000, ge=1, le=1000)
+    # 0 у deadletter.replay означає «без обмеження» — через API так не можна
+    rate_per_sec: float = Field(10.0, gt=0, le=100)
+
+
+@router.get(
+    "/dead-letters",
+    dependencies=[Depends(require_role(Role.admin))],
+    response_model=list[DeadLetterOut],
+)
+def list_dead_letters(
+    event_type: str | None = None,
+    destination: str | None = None,
+    error_class: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+):
+    conn = _get_redis()
+    ids = deadletter.find_ids(
+        conn, event_type=event_type, destination=destination, error_class=error_class, limit=limit
+    )
+    return deadletter.get_many(conn, ids)
+
+
+@router.get(
+    "/dead-letters/stats",
+    dependencies=[Depends(require_role(Role.admin))],
+)
+def dead_letter_stats():
+    return deadletter.stats(_get_redis())
+
+
+@router.post(
+    "/dead-letters/replay",
+    dependencies=[Depends(require_role(Role.admin))],
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def replay_dead_letters(payload: DeadLetterReplayIn, background: BackgroundTasks):
+    """
+    Replay у фоні з обмеженням швидкості (rate_per_sec), щоб після падіння
+    вебхука не завалити отримувача всім беклогом одразу.
+    """
+    conn = _get_redis()
+    ids = payload.ids or deadletter.find_ids(
+        conn,
+        event_type=payload.event_type,
+        destination=payload.destination,
+        error_class=payload.error_class,
+        limit=payload.limit,
+    )
+    background.add_task(deadletter.replay, conn, ids, enqueue, rate_per_sec=payload.rate_per_sec)
+    return {"ok": True, "scheduled": len(ids), "rate_per_sec": payload.rate_per_sec}
+
+
+@router.get(
+    "/notifications/lanes",
+    dependencies=[Depends(require_role(Role.admin))],
+)
+def notification_lanes():
+    """Глибина / вік найстарішого job-а / затримка по пріоритетних лейнах."""
+    return lane_stats()
+
+
+@router.get(
+    "/cache/stats",
+    dependencies=[Depends(require_role(Role.admin))],
+)
+def cache_stats():
+    """Hit ratio кешу читання: цей процес + сума по всіх (cache:stats у Redis)."""
+    try:
+        cluster = cache.cluster_stats()
+    except Exception:
+        cluster = None
+    return {"process": cache.stats(), "cluster": cluster}
+
+
+@router.get(
+    "/admission",
+    dependencies=[Depends(require_role(Role.admin))],
+)
+def admission_state():
+    """Ліміти / in-flight / черга / відмови по класах і EWMA очікування на пул (цей процес)."""
+    return admission.snapshot()
@@ -15,6 +15,7 @@ from app.services.auth import (
     serialize_user,
     make_token_for_user,
 )
+from app.core.cache import invalidate
 from app.core.security import hash_password, verify_password
 from app.api.deps import get_current_user
 
@@ -142,6 +143,8 @@ async def register_user(payload: RegisterIn, db: AsyncSession = DBDep):
     db.add(u)
     await db.commit()
     await db.refresh(u)
+    # новий користувач — рядок у admin stats
+    await invalidate("reports")
 
     tok = make_token_for_user(u)
     return TokenOut(access_token=tok, user=UserOut(**serialize_user(u)))
@@ -174,6 +177,7 @@ async def register_operator(payload: RegisterOperatorIn, db: AsyncSession = DBDe
     )
     db.add(t)
     await db.commit()
+    await invalidate("reports")
     return {"ok": True, "message": "Заявку надіслано адміністратору."}
 
 
@@ -234,6 +238,7 @@ async def password_recovery_request(
     db.add(t)
     await db.commit()
     await db.refresh(t)
+    await invalidate("reports")
 
     return {"ok": True}
 
@@ -330,6 +335,8 @@ async def send_recovery_link(
     db.add(t)
     await db.commit()
     await db.refresh(t)
+    # статус (і version) змінено — кешовані деталі заявки з її ETag застаріли
+    await invalidate(f"ticket:{t.id}", "reports")
 
     return SendRecoveryLinkOut(reset_url=reset_url)
 
@@ -351,6 +358,7 @@ async def reset_password_api(payload: ResetPasswordIn, db: AsyncSession = DBDep)
     user.password_hash = hash_password(payload.password)
     db.add(user)
     await db.commit()
+    await invalidate(f"user:{user.id}")
 
     return {"ok": True}
 
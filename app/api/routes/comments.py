@@ -4,38 +4,64 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from ..deps import get_current_user, DBDep, require_role
-from app.db.models import Ticket, Comment, Role, User
+from app.db.models import Ticket, Comment, CommentVisibilityEnum, Role, TicketStatusEnum, User
 from app.schemas.comments import CommentCreate, CommentOut
+from app.services.archive import get_archived, list_archived_comments
 
 router = APIRouter()
 UserDep = Annotated[User, Depends(get_current_user)]
 
-@router.post("/{ticket_id}/comments", response_model=CommentOut, status_code=status.HTTP_201_CREATED)
-async def add_comment(ticket_id: int, payload: CommentCreate, db: DBDep, current: UserDep):
+
+def _out(c) -> CommentOut:
+    # у моделі — visibility (public/internal), в API — is_internal
+    return CommentOut(
+        id=c.id, ticket_id=c.ticket_id, author_id=c.author_id, body=c.body,
+        is_internal=c.visibility == CommentVisibilityEnum.internal, created_at=c.created_at,
+    )
+
+
+async def _ticket_or_archived(db: AsyncSession, ticket_id: int, current: User) -> tuple[Ticket, bool]:
+    """Заявка з гарячої таблиці або з архіву; друге значення — чи вона в холодному архіві."""
     t = (await db.execute(select(Ticket).where(Ticket.id == ticket_id))).scalar_one_or_none()
+    cold = t is None
+    if cold:
+        t = await get_archived(db, ticket_id)
     if not t:
         raise HTTPException(status_code=404, detail="Ticket not found")
     if current.role == Role.user and t.author_id != current.id:
         raise HTTPException(status_code=403, detail="Forbidden")
+    return t, cold
+
+
+@router.post("/{ticket_id}/comments", response_model=CommentOut, status_code=status.HTTP_201_CREATED)
+async def add_comment(ticket_id: int, payload: CommentCreate, db: DBDep, current: UserDep):
+    t, _ = await _ticket_or_archived(db, ticket_id, current)
+    if t.status == TicketStatusEnum.archived:
+        raise HTTPException(status_code=409, detail="Ticket is archived")
     if payload.is_internal and current.role == Role.user:
         raise HTTPException(status_code=403, detail="Internal comments only for agent/admin")
 
-    c = Comment(ticket_id=ticket_id, author_id=current.id, body=payload.body, is_internal=payload.is_internal)
+    c = Comment(
+        ticket_id=ticket_id,
+        author_id=current.id,
+        body=payload.body,
+        visibility=CommentVisibilityEnum.internal if payload.is_internal else CommentVisibilityEnum.public,
+    )
     db.add(c)
     await db.commit()
     await db.refresh(c)
-    return c
+    return _out(c)
 
 @router.get("/{ticket_id}/comments", response_model=list[CommentOut])
 async def list_comments(ticket_id: int, db: DBDep, current: UserDep):
-    t = (await db.execute(select(Ticket).where(Ticket.id == ticket_id))).scalar_one_or_none()
-    if not t:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-    if current.role == Role.user and t.author_id != current.id:
-        raise HTTPException(status_code=403, detail="Forbidden")
+    _, cold = await _ticket_or_archived(db, ticket_id, current)
+    if cold:
+        # заявка вже в холодному архіві — коментарі разом з нею в comments_archive
+        rows = await list_archived_comments(db, ticket_id, include_internal=current.role != Role.user)
+        return [_out(c) for c in rows]
 
     q = select(Comment).where(Comment.ticket_id == ticket_id)
     if current.role == Role.user:
-        q = q.where(Comment.is_internal == False)  # noqa: E712
-    rows = (await db.execute(q)).scalars().all()
-    return rows
+        q = q.where(Comment.visibility == CommentVisibilityEnum.public)
+    rows = (await db.execute(q.order_by(Comment.id))).scalars().all()
+    return [_out(c) for c in rows]
@@ -0,0 +1,123 @@
+# app/api/routes/operator_dashboard.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from fastapi import APIRouter, Depends, Query
+from pydantic import BaseModel
+from sqlalchemy import func, select
+
+from ..deps import DBDep, get_current_user, require_role
+from app.core.config import settings
+from app.db.models import SLA_OPEN_STATUSES, OperatorFeedback, Question, QuestionStatusEnum, Ticket
+from app.db.session import AsyncSessionLocal
+from app.schemas.tickets import TICKET_SUMMARY_FIELDS, TicketSparseOut
+
+try:
+    from app.db.models import RoleEnum as Role
+except Exception:
+    from app.db.models import Role  # fallback
+
+try:
+    from app.db.models import TicketStatusEnum as Status
+except Exception:
+    from app.db.models import Status
+
+router = APIRouter()
+
+# «перша сторінка роботи» — те саме, що показує список, плюс дедлайни
+_WORK_FIELDS = (*TICKET_SUMMARY_FIELDS, "response_due_at", "resolve_due_at")
+
+
+class OperatorDashboardOut(BaseModel):
+    assigned_by_status: dict[str, int]
+    queue: dict[str, int]            # непризначені new / triage
+    unread_feedback: int
+    unanswered_questions: int
+    work: list[TicketSparseOut]
+
+
+# спільний на процес ліміт конектів під fan-out: N одночасних дашбордів не
+# забирають 4 × N конектів interactive-пулу, решта чекає тут, а не в пулі
+_fanout = asyncio.Semaphore(max(1, settings.db_dashboard_fanout))
+
+
+async def _run(stmt) -> list[Any]:
+    # окрема сесія = окремий конект з пулу: запити дашборду йдуть паралельно
+    async with _fanout:
+        async with AsyncSessionLocal() as s:
+            return (await s.execute(stmt)).all()
+
+
+async def _run_all(db, stmts: list) -> list[list[Any]]:
+    if db.bind.dialect.name == "sqlite":
+        # in-memory SQLite — один конект на процес, і його вже тримає сесія запиту
+        return [(await db.execute(stmt)).all() for stmt in stmts]
+    # конект сесії запиту (після SELECT користувача в auth) повертаємо в пул до fan-out,
+    # щоб запит не тримав свій конект, чекаючи на чужі
+    await db.close()
+    return list(await asyncio.gather(*(_run(stmt) for stmt in stmts)))
+
+
+def _by_status(rows) -> dict[str, int]:
+    return {getattr(s, "value", str(s)): int(c) for s, c in rows}
+
+
+@router.get(
+    "/dashboard",
+    response_model=OperatorDashboardOut,
+    response_model_exclude_unset=True,
+    dependencies=[Depends(require_role(Role.operator, Role.admin))],
+)
+async def operator_dashboard(
+    db: DBDep,
+    current=Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Усе для кабінету оператора одним запитом: чотири незалежні SELECT-и
+    паралельно (кожен на своєму конекті з пулу, не більше db_dashboard_fanout
+    на процес) замість каскаду запитів з фронту.
+
+    GET /api/operator/dashboard
+    """
+    assigned = (
+        select(Ticket.status, func.count())
+        .where(Ticket.assignee_id == current.id)
+        .group_by(Ticket.status)
+    )
+    # ix_tickets_unassigned_queue (status, ...) WHERE assignee_id IS NULL
+    queue = (
+        select(Ticket.status, func.count())
+        .where(Ticket.assignee_id.is_(None))
+        .where(Ticket.status.in_((Status.new, Status.triage)))
+        .group_by(Ticket.status)
+    )
+    counters = select(
+        select(func.count())
+        .select_from(OperatorFeedback)
+        .where(OperatorFeedback.operator_id == current.id, OperatorFeedback.is_read == False)  # noqa: E712
+        .scalar_subquery(),
+        select(func.count())
+        .select_from(Question)
+        .where(Question.status == QuestionStatusEnum.new)
+        .scalar_subquery(),
+    )
+    work = (
+        select(*[getattr(Ticket, c) for c in _WORK_FIELDS])
+        .where(Ticket.assignee_id == current.id)
+        .where(Ticket.status.in_(SLA_OPEN_STATUSES))
+        .order_by(Ticket.resolve_due_at.asc().nulls_last(), Ticket.created_at.asc())
+        .limit(limit)
+    )
+
+    assigned_rows, queue_rows, counter_rows, work_rows = await _run_all(db, [assigned, queue, counters, work])
+    unread, unanswered = counter_rows[0]
+    return {
+        "assigned_by_status": _by_status(assigned_rows),
+        "queue": {s.value: 0 for s in (Status.new, Status.triage)} | _by_status(queue_rows),
+        "unread_feedback": int(unread or 0),
+        "unanswered_questions": int(unanswered or 0),
+        "work": [dict(r._mapping) for r in work_rows],
+    }
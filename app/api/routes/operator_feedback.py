@@ -7,6 +7,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy import select
+from sqlalchemy.orm import aliased
 
 from ..deps import DBDep, get_current_user, require_role
 from app.db.models import User, OperatorFeedback, RoleEnum as Role
@@ -50,35 +51,26 @@ async def list_my_feedback(
     if current.role != Role.operator:
         raise HTTPException(status_code=403, detail="Only operator can view feedback")
 
-    # тягнемо всі фідбеки для цього оператора
+    # тягнемо всі фідбеки для цього оператора; e-mail автора — тим самим запитом
+    # (LEFT JOIN замість окремого SELECT users на кожен рядок)
+    Author = aliased(User)
     rows = (
         await db.execute(
-            select(OperatorFeedback)
+            select(OperatorFeedback, Author.email)
+            .outerjoin(Author, Author.id == OperatorFeedback.author_id)
             .where(OperatorFeedback.operator_id == current.id)
             .order_by(OperatorFeedback.created_at.desc())
         )
-    ).scalars().all()
+    ).all()
 
     out: list[OperatorFeedbackOut] = []
 
-    for fb in rows:
-        operator_email = current.email
-        author_email: Optional[str] = None
-
-        if fb.author_id:
-            author = (
-                await db.execute(
-                    select(User).where(User.id == fb.author_id)
-                )
-            ).scalar_one_or_none()
-            if author:
-                author_email = author.email
-
+    for fb, author_email in rows:
         out.append(
             OperatorFeedbackOut(
                 id=fb.id,
                 operator_id=fb.operator_id,
-                operator_email=operator_email,
+                operator_email=current.email,
                 author_id=fb.author_id,
                 author_email=author_email,
                 message=fb.message,
@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 
 from app.api.deps import get_current_user, DBDep
+from app.core.cache import cached, invalidate
 from app.db.models import User, Question, Answer, QuestionStatusEnum, RoleEnum as Role
 from app.schemas.questions import QuestionCreate, QuestionOut, AnswerCreate, AnswerOut
 
@@ -17,8 +18,9 @@ UserDep = Depends(get_current_user)
 async def create_question(body: QuestionCreate, db: DBDep, current: User = UserDep):
     q = Question(author_id=current.id, title=body.title, content=body.content)
     db.add(q)
+    # eager_defaults: id/created_at/updated_at приходять з INSERT ... RETURNING
     await db.commit()
-    await db.refresh(q)
+    await invalidate("reports")
     return q
 
 
@@ -49,16 +51,25 @@ async def list_questions(
     return (await db.execute(stmt)).scalars().all()
 
 
-@router.get("/{qid}/answers", response_model=list[AnswerOut])
-async def list_answers(qid: int, db: DBDep, current: User = UserDep):
+@cached("questions.answers", tags=("question:{qid}",))
+async def _answers(db: DBDep, qid: int) -> dict | None:
+    """Автор питання (для перевірки прав у роуті) + відповіді, спільні для всіх ролей."""
     q = await db.get(Question, qid)
     if not q:
+        return None
+    stmt = select(Answer).where(Answer.question_id == qid).order_by(Answer.created_at.asc())
+    answers = (await db.execute(stmt)).scalars().all()
+    return {"author_id": q.author_id, "answers": [AnswerOut.model_validate(a) for a in answers]}
+
+
+@router.get("/{qid}/answers", response_model=list[AnswerOut])
+async def list_answers(qid: int, db: DBDep, current: User = UserDep):
+    d = await _answers(db, qid)
+    if d is None:
         raise HTTPException(status_code=404, detail="Question not found")
-    if current.role == Role.user and q.author_id != current.id:
+    if current.role == Role.user and d["author_id"] != current.id:
         raise HTTPException(status_code=403, detail="Forbidden")
-
-    stmt = select(Answer).where(Answer.question_id == qid).order_by(Answer.created_at.asc())
-    return (await db.execute(stmt)).scalars().all()
+    return d["answers"]
 
 
 @router.post("/{qid}/answer", response_model=AnswerOut)
@@ -66,32 +77,44 @@ async def answer(qid: int, body: AnswerCreate, db: DBDep, current: User = UserDe
     if current.role not in {Role.operator, Role.admin}:
         raise HTTPException(status_code=403, detail="Only operator/admin can answer")
 
-    q = await db.get(Question, qid)
-    if not q:
+    # UPDATE ... RETURNING замість SELECT + UPDATE: заодно перевірка існування
+    found = (
+        await db.execute(
+            update(Question)
+            .where(Question.id == qid)
+            .values(status=QuestionStatusEnum.answered, updated_at=func.now())
+            .returning(Question.id)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalar_one_or_none()
+    if found is None:
         raise HTTPException(status_code=404, detail="Question not found")
 
-    a = Answer(question_id=qid, operator_id=current.id, content=body.content)
+    a = Answer(question_id=qid, operator_id=current.id, content=body.content, operator=current)
     db.add(a)
-
-    q.status = QuestionStatusEnum.answered
-    q.updated_at = func.now()
-
     await db.commit()
-    await db.refresh(a)
+    await invalidate(f"question:{qid}", "reports")
     return a
 
 
 @router.patch("/{qid}/close", response_model=QuestionOut)
 async def close(qid: int, db: DBDep, current: User = UserDep):
-    q = await db.get(Question, qid)
-    if not q:
-        raise HTTPException(status_code=404, detail="Question not found")
-
-    if current.role != Role.admin and q.author_id != current.id:
+    # права — у WHERE; SELECT лише щоб відрізнити 404 від 403
+    stmt = update(Question).where(Question.id == qid)
+    if current.role != Role.admin:
+        stmt = stmt.where(Question.author_id == current.id)
+    q = (
+        await db.execute(
+            stmt.values(status=QuestionStatusEnum.closed, updated_at=func.now())
+            .returning(Question)
+            .execution_options(synchronize_session=False)
+        )
+    ).scalar_one_or_none()
+    if q is None:
+        await db.rollback()
+        if await db.get(Question, qid) is None:
+            raise HTTPException(status_code=404, detail="Question not found")
         raise HTTPException(status_code=403, detail="Forbidden")
-
-    q.status = QuestionStatusEnum.closed
-    q.updated_at = func.now()
     await db.commit()
-    await db.refresh(q)
+    await invalidate(f"question:{qid}", "reports")
     return q
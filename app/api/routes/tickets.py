@@ -1,16 +1,20 @@
 # app/api/routes/tickets.py
 from __future__ import annotations
 
-from typing import Annotated, Any
+from typing import Annotated, Any, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from fastapi.responses import Response
-from sqlalchemy import select, func
+from sqlalchemy import case, or_, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.exc import StaleDataError
 from sqlalchemy import update, select  # (можна залишити як є, хоча select тут вдруге)
 from app.services.notifications import notify_operator_approved, notify_admin_approved
 
 from ..deps import get_current_user, DBDep
-from app.db.models import Ticket, User
+from app.db.models import AuditLog, Ticket, User
+from app.services.archive import get_archived, ticket_source
 
 # Role (operator || agent)
 try:
@@ -33,8 +37,21 @@ try:
 except Exception:
     from app.db.models import Priority
 
-from app.schemas.tickets import TicketCreate, TicketUpdate, TicketOut
-from ...services.notifications import enqueue
+from app.schemas.tickets import (
+    TICKET_SUMMARY_FIELDS,
+    TicketCreate,
+    TicketDetailOut,
+    TicketListExpandedOut,
+    TicketOut,
+    TicketSparseOut,
+    TicketUpdate,
+    TimelineEntryOut,
+    UserSummaryOut,
+)
+from app.core.cache import cached, invalidate
+from app.core.config import settings
+from app.services import audit, sla, workload
+from app.services.outbox import add_event
 
 router = APIRouter()
 UserDep = Annotated[User, Depends(get_current_user)]
@@ -58,6 +75,10 @@ def can_edit_fields(user_role: Role, is_author: bool, status_: Status) -> bool:
     is_admin = (user_role == getattr(Role, "admin"))
     return ((status_ in {Status.new, Status.triage} and is_author) or is_operator or is_admin)
 
+def _with_author():
+    """Заявка + e-mail автора одним запитом (отримувач нотифікацій у payload події)."""
+    return select(Ticket, User.email).outerjoin(User, User.id == Ticket.author_id)
+
 @router.post("", response_model=TicketOut, status_code=status.HTTP_201_CREATED)
 async def create_ticket(payload: TicketCreate, db: DBDep, current: UserDep):
     t = Ticket(
@@ -75,13 +96,135 @@ async def create_ticket(payload: TicketCreate, db: DBDep, current: UserDep):
         work_email=payload.work_email,
         backup_email=payload.backup_email,
     )
+    sla.stamp(t)
+    # авто-призначення: найменш завантажений оператор з живого індексу (services/workload.py)
+    if settings.auto_assign_enabled and t.topic != "operator_signup":
+        t.assignee_id = await workload.claim()
     db.add(t)
+    try:
+        await db.flush()  # потрібен t.id для події
+        # подія пишеться в outbox у тій самій транзакції
+        add_event(db, "ticket_created", {
+            "ticket_id": t.id,
+            "author": current.email,
+            "priority": getattr(t.priority, "value", str(t.priority)),
+        }, ticket_id=t.id)
+        await db.commit()
+    except Exception:
+        if t.assignee_id is not None:
+            await workload.unclaim(t.assignee_id)
+        raise
+    await invalidate("reports")
+    # refresh не потрібен: серверні значення прийшли з INSERT ... RETURNING (eager_defaults)
+    return t
+
+# порядок, у якому оператор отримує заявки з черги
+NEXT_PRIORITY_ORDER = (Priority.high, Priority.medium, Priority.normal, Priority.low)
+
+
+@router.post("/next", response_model=TicketOut)
+async def claim_next_ticket(db: DBDep, current: UserDep):
+    """Атомарно бере найпріоритетнішу найстарішу непризначену new-заявку.
+
+    Один запит на рівень пріоритету: WHERE status/priority/assignee_id IS NULL
+    ORDER BY created_at LIMIT 1 FOR UPDATE SKIP LOCKED — index seek по
+    ix_tickets_unassigned_queue. Рядки, які вже бере інший оператор, просто
+    пропускаються: ні очікування на локах, ні подвійної роботи.
+    204 — черга порожня.
+    """
+    if current.role not in {getattr(Role, "admin"), (RoleOperator or RoleAgent)}:
+        raise HTTPException(status_code=403, detail="Only operator/admin can take tickets")
+
+    row = None
+    for p in NEXT_PRIORITY_ORDER:
+        row = (
+            await db.execute(
+                _with_author()
+                .where(Ticket.status == Status.new)
+                .where(Ticket.priority == p)
+                .where(Ticket.assignee_id.is_(None))
+                .order_by(Ticket.created_at.asc(), Ticket.id.asc())
+                .limit(1)
+                .with_for_update(skip_locked=True, of=Ticket)
+            )
+        ).first()
+        if row is not None:
+            break
+    if row is None:
+        await db.rollback()
+        return Response(status_code=204)
+    t, author_email = row
+
+    t.assignee_id = current.id
+    t.status = Status.in_progress
+    sla.mark_responded(t)
+    t.updated_at = func.now()
+    add_event(db, "status_changed", {
+        "ticket_id": t.id,
+        "from": Status.new.value,
+        "to": Status.in_progress.value,
+        "priority": getattr(t.priority, "value", str(t.priority)),
+        "author": author_email,
+    }, ticket_id=t.id)
     await db.commit()
-    await db.refresh(t)
-    enqueue("ticket_created", {"ticket_id": t.id, "author": current.email})
+
+    await invalidate(f"ticket:{t.id}", "reports")
+    await workload.track(old_assignee=None, old_status=Status.new, new_assignee=t.assignee_id, new_status=t.status)
+    audit.record("ticket.claimed", actor_id=current.id, ticket_id=t.id, payload={"priority": t.priority.value})
     return t
 
-@router.get("", response_model=list[TicketOut])
+
+def _sparse_fields(fields: str | None, view: str | None) -> list[str] | None:
+    """fields=title,status / view=summary → список колонок; None — повний TicketOut."""
+    if fields:
+        wanted = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = sorted(set(wanted) - set(TicketSparseOut.model_fields))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    elif view == "summary":
+        wanted = list(TICKET_SUMMARY_FIELDS)
+    else:
+        return None
+    # id завжди — без нього рядок списку ні до чого не прив'язати
+    return ["id"] + [f for f in dict.fromkeys(wanted) if f != "id"]
+
+
+# expand=author,assignee: користувач підтягується LEFT JOIN-ом у тому ж запиті
+_EXPANDABLE = ("author", "assignee")
+_USER_SUMMARY_COLS = ("id", "email", "name", "role")
+
+
+def _expand_rels(expand: str | None) -> list[str]:
+    if not expand:
+        return []
+    wanted = {e.strip() for e in expand.split(",") if e.strip()}
+    unknown = sorted(wanted - set(_EXPANDABLE))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown expand: {', '.join(unknown)}")
+    return [r for r in _EXPANDABLE if r in wanted]
+
+
+def _join_users(q, T, rels: list[str]):
+    """LEFT JOIN users на кожен expand-зв'язок; колонки з префіксом '<rel>__'."""
+    for rel in rels:
+        U = aliased(User, name=f"{rel}_user")
+        q = q.outerjoin(U, U.id == getattr(T, f"{rel}_id")).add_columns(
+            *[getattr(U, c).label(f"{rel}__{c}") for c in _USER_SUMMARY_COLS]
+        )
+    return q
+
+
+def _user_from_row(m, rel: str) -> UserSummaryOut | None:
+    if m[f"{rel}__id"] is None:
+        return None
+    return UserSummaryOut(**{c: m[f"{rel}__{c}"] for c in _USER_SUMMARY_COLS})
+
+
+@router.get(
+    "",
+    response_model=list[TicketOut] | list[TicketSparseOut] | TicketListExpandedOut,
+    response_model_exclude_unset=True,
+)
 async def list_tickets(
     db: DBDep,
     current: UserDep,
@@ -91,37 +234,184 @@ async def list_tickets(
     author_id: int | None = None,
     limit: int = 50,
     offset: int = 0,
+    include_archived: bool = False,
+    fields: str | None = Query(default=None, description="колонки через кому, напр. title,status,priority"),
+    view: Literal["full", "summary"] | None = None,
+    expand: str | None = Query(default=None, description="author,assignee — {items, users}"),
 ):
-    q = select(Ticket)
+    # за замовчуванням — лише гаряча tickets; архів тільки на явний запит
+    T = ticket_source(include_archived)
+    columns = _sparse_fields(fields, view)
+    rels = _expand_rels(expand)
+    if columns:
+        # посилання в бічну таблицю users мають бути в рядку, навіть якщо їх не просили
+        columns += [f"{r}_id" for r in rels if f"{r}_id" not in columns]
+    # sparse: у SELECT лише запитані колонки (description / контакти не читаються з БД взагалі)
+    q = select(*[getattr(T, c) for c in columns]) if columns else select(T)
+    q = _join_users(q, T, rels)
     if current.role == getattr(Role, "user"):
-        q = q.where(Ticket.author_id == current.id)
+        q = q.where(T.author_id == current.id)
     if status_:
-        q = q.where(Ticket.status == status_)
+        q = q.where(T.status == status_)
     if priority:
-        q = q.where(Ticket.priority == priority)
+        q = q.where(T.priority == priority)
     if assignee_id is not None:
-        q = q.where(Ticket.assignee_id == assignee_id)
+        q = q.where(T.assignee_id == assignee_id)
     if author_id is not None and current.role != getattr(Role, "user"):
-        q = q.where(Ticket.author_id == author_id)
-
-    q = q.order_by(Ticket.created_at.desc()).limit(limit).offset(offset)
+        q = q.where(T.author_id == author_id)
+
+    q = q.order_by(T.created_at.desc()).limit(limit).offset(offset)
+    if rels:
+        # кожен користувач — один раз у users, скільки б заявок на нього не посилалось
+        items: list[Any] = []
+        users: dict[int, UserSummaryOut] = {}
+        for row in (await db.execute(q)).all():
+            m = row._mapping
+            for rel in rels:
+                u = _user_from_row(m, rel)
+                if u is not None:
+                    users.setdefault(u.id, u)
+            items.append({c: m[c] for c in columns} if columns else row[0])
+        return {"items": items, "users": users}
+    if columns:
+        return (await db.execute(q)).mappings().all()
     rows = (await db.execute(q)).scalars().all()
     return rows
 
-@router.get("/{ticket_id}", response_model=TicketOut)
-async def get_ticket(ticket_id: int, db: DBDep, current: UserDep):
-    t = (await db.execute(select(Ticket).where(Ticket.id == ticket_id))).scalar_one_or_none()
+def _detail_tags(d: dict[str, Any]) -> list[str]:
+    # expand тягне email/ім'я — зміна користувача має скинути і деталі його заявок
+    return [f"user:{u['id']}" for u in (d.get("author"), d.get("assignee")) if u]
+
+
+@cached("ticket.detail", tags=("ticket:{ticket_id}",), result_tags=_detail_tags)
+async def _ticket_detail(db: AsyncSession, ticket_id: int, rels: tuple[str, ...]) -> dict[str, Any] | None:
+    """TicketOut (+ вкладені author/assignee) як dict — спільний для всіх ролей, права перевіряє роут."""
+    row = (await db.execute(_join_users(select(Ticket).where(Ticket.id == ticket_id), Ticket, list(rels)))).first()
+    t = row[0] if row else None
+    nested = {rel: _user_from_row(row._mapping, rel) for rel in rels} if row else {}
+    if not t:
+        # пошук за PK — дешевий, тож архівну заявку показуємо і без include_archived
+        t = await get_archived(db, ticket_id)
+        if t and rels:
+            ids = {getattr(t, f"{rel}_id") for rel in rels} - {None}
+            found = {u.id: u for u in (await db.execute(select(User).where(User.id.in_(ids)))).scalars()}
+            nested = {
+                rel: UserSummaryOut.model_validate(found[uid]) if (uid := getattr(t, f"{rel}_id")) in found else None
+                for rel in rels
+            }
     if not t:
+        return None
+    return {**TicketOut.model_validate(t).model_dump(), **nested}
+
+
+@router.get("/{ticket_id}", response_model=TicketDetailOut, response_model_exclude_unset=True)
+async def get_ticket(
+    ticket_id: int,
+    db: DBDep,
+    current: UserDep,
+    response: Response,
+    expand: str | None = Query(default=None, description="author,assignee"),
+):
+    rels = _expand_rels(expand)
+    d = await _ticket_detail(db, ticket_id, tuple(rels))
+    if d is None:
         raise HTTPException(status_code=404, detail="Ticket not found")
-    if current.role == getattr(Role, "user") and t.author_id != current.id:
+    if current.role == getattr(Role, "user") and d["author_id"] != current.id:
         raise HTTPException(status_code=403, detail="Forbidden")
-    return t
+    response.headers["ETag"] = f'"{d["version"]}"'
+    # без expand — рівно TicketOut (author/assignee лишаються unset і не серіалізуються)
+    return TicketDetailOut.model_validate(d) if rels else TicketOut.model_validate(d)
+
+
+# --- optimistic concurrency: ETag = version, PATCH з If-Match -----------------
+
+# поля без побічних ефектів (SLA, аудит, workload) — їх можна писати одним умовним UPDATE
+_PLAIN_FIELDS = ("title", "description", "topic", "position", "phone", "work_email", "backup_email")
+
+
+def _etag(t: Ticket) -> str:
+    return f'"{t.version}"'
+
+
+def _expected_version(if_match: str | None) -> int | None:
+    """If-Match → очікувана версія; None — заголовка немає або '*'."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    raw = if_match.strip()
+    if raw.startswith("W/"):
+        raw = raw[2:]
+    try:
+        return int(raw.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=412, detail="Precondition Failed")
+
+
+def _version_conflict(expected: int | None) -> HTTPException:
+    """
+    Заявку змінили між нашим SELECT і UPDATE (version_id_col → StaleDataError).
+    412 — лише коли клієнт прислав If-Match (його передумова не справдилась);
+    без If-Match передумови немає — звичайний конфлікт, 409.
+    """
+    if expected is None:
+        return HTTPException(status_code=409, detail="Ticket was modified concurrently")
+    return HTTPException(status_code=412, detail="Ticket was modified concurrently")
+
+
+async def _patch_plain_fields(
+    db, ticket_id: int, values: dict[str, Any], expected: int, current: User,
+) -> Ticket:
+    """
+    Один UPDATE ... WHERE id = :id AND version = :v [AND права автора] RETURNING *.
+    Права й версія перевіряються в самому WHERE; SELECT — лише щоб пояснити відмову.
+    """
+    stmt = update(Ticket).where(Ticket.id == ticket_id, Ticket.version == expected)
+    if current.role == getattr(Role, "user"):
+        # can_edit_fields для автора: лише власна заявка на ранніх етапах
+        stmt = stmt.where(Ticket.author_id == current.id, Ticket.status.in_((Status.new, Status.triage)))
+    else:
+        values["responded_at"] = func.coalesce(Ticket.responded_at, func.now())
+    stmt = (
+        stmt.values(**values, version=Ticket.version + 1, updated_at=func.now())
+        .returning(Ticket)
+        .execution_options(synchronize_session=False)
+    )
+    t = (await db.execute(stmt)).scalar_one_or_none()
+    if t is not None:
+        await db.commit()
+        return t
+    await db.rollback()
+    cur = (await db.execute(select(Ticket.version).where(Ticket.id == ticket_id))).scalar_one_or_none()
+    if cur is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    if cur != expected:
+        raise HTTPException(status_code=412, detail="Ticket was modified concurrently")
+    raise HTTPException(status_code=403, detail="Not allowed to edit fields at this stage")
+
 
 @router.patch("/{ticket_id}", response_model=TicketOut)
-async def patch_ticket(ticket_id: int, payload: TicketUpdate, db: DBDep, current: UserDep):
-    t = (await db.execute(select(Ticket).where(Ticket.id == ticket_id))).scalar_one_or_none()
-    if not t:
+async def patch_ticket(
+    ticket_id: int,
+    payload: TicketUpdate,
+    db: DBDep,
+    current: UserDep,
+    response: Response,
+    if_match: str | None = Header(default=None),
+):
+    expected = _expected_version(if_match)
+    changes = {k: v for k, v in payload.model_dump().items() if v is not None}
+    if expected is not None and changes and set(changes) <= set(_PLAIN_FIELDS):
+        t = await _patch_plain_fields(db, ticket_id, changes, expected, current)
+        await invalidate(f"ticket:{t.id}")
+        response.headers["ETag"] = _etag(t)
+        return t
+
+    # e-mail автора — тим самим SELECT: отримувач для status_changed
+    row = (await db.execute(_with_author().where(Ticket.id == ticket_id))).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    t, author_email = row
+    if expected is not None and t.version != expected:
+        raise HTTPException(status_code=412, detail="Ticket was modified concurrently")
 
     is_author = (t.author_id == current.id)
 
@@ -158,6 +448,12 @@ async def patch_ticket(ticket_id: int, payload: TicketUpdate, db: DBDep, current
             t.work_email = payload.work_email
         if getattr(payload, "backup_email", None) is not None:
             t.backup_email = payload.backup_email
+        # політика SLA залежить від priority/dept — перераховуємо дедлайни від created_at
+        if payload.priority is not None or getattr(payload, "dept", None) is not None:
+            sla.stamp(t)
+
+    # для аудиту — стан до змін
+    old_status, old_assignee = t.status, t.assignee_id
 
     # --- призначення ---
     if payload.assignee_id is not None:
@@ -199,17 +495,60 @@ async def patch_ticket(ticket_id: int, payload: TicketUpdate, db: DBDep, current
             if t.status in {Status.in_progress, Status.done, Status.canceled, Status.blocked}:
                 t.assignee_id = current.id
 
-        enqueue("status_changed", {
+        add_event(db, "status_changed", {
             "ticket_id": t.id,
             "from": getattr(old, "value", str(old)),
             "to": getattr(t.status, "value", str(t.status)),
-        })
+            "priority": getattr(t.priority, "value", str(t.priority)),
+            "author": author_email,
+        }, ticket_id=t.id)
 
+    if current.role != getattr(Role, "user"):
+        sla.mark_responded(t)
     t.updated_at = func.now()
-    await db.commit()
-    await db.refresh(t)
+    try:
+        # version_id_col: UPDATE ... WHERE version = :old; 0 рядків → StaleDataError
+        await db.commit()
+    except StaleDataError:
+        await db.rollback()
+        raise _version_conflict(expected)
+    response.headers["ETag"] = _etag(t)
+    await invalidate(f"ticket:{t.id}", "reports")
+
+    await workload.track(
+        old_assignee=old_assignee, old_status=old_status, new_assignee=t.assignee_id, new_status=t.status,
+    )
+    if t.status != old_status:
+        audit.record("ticket.status_changed", actor_id=current.id, ticket_id=t.id, payload={
+            "from": getattr(old_status, "value", str(old_status)),
+            "to": getattr(t.status, "value", str(t.status)),
+        })
+    if t.assignee_id != old_assignee:
+        audit.record("ticket.assigned", actor_id=current.id, ticket_id=t.id, payload={
+            "from": old_assignee,
+            "to": t.assignee_id,
+        })
     return t
 
+
+@router.get("/{ticket_id}/timeline", response_model=list[TimelineEntryOut])
+async def ticket_timeline(ticket_id: int, db: DBDep, current: UserDep, limit: int = 200):
+    """Історія заявки з audit_log (індекс ticket_id, created_at)."""
+    t = await db.get(Ticket, ticket_id) or await get_archived(db, ticket_id)
+    if not t:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    if current.role == getattr(Role, "user") and t.author_id != current.id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    rows = (
+        await db.execute(
+            select(AuditLog)
+            .where(AuditLog.ticket_id == ticket_id)
+            .order_by(AuditLog.created_at.asc(), AuditLog.id.asc())
+            .limit(limit)
+        )
+    ).scalars().all()
+    return rows
+
 # === HARD DELETE (admin/operator завжди; user — тільки свою і лише new/canceled) ===
 @router.delete("/{ticket_id}", status_code=204)
 async def delete_ticket(ticket_id: int, db: DBDep, current: UserDep):
@@ -230,8 +569,11 @@ async def delete_ticket(ticket_id: int, db: DBDep, current: UserDep):
         if str(t.status) not in ("new", "canceled"):
             raise HTTPException(status_code=409, detail="Only 'new' or 'canceled' tickets can be deleted by author")
 
+    old_status, old_assignee = t.status, t.assignee_id
     await db.delete(t)
     await db.commit()
+    await invalidate(f"ticket:{ticket_id}", "reports")
+    await workload.track(old_assignee=old_assignee, old_status=old_status, new_assignee=None, new_status=None)
     return Response(status_code=204)
 
 def _actor_payload(u: User) -> dict[str, Any]:
@@ -264,40 +606,104 @@ def _ticket_payload(t: Ticket, author_email: str | None = None) -> dict[str, Any
 # --- OPERATOR APPROVE ---------------------------------------------------------
 
 @router.post("/{ticket_id}/operator-approve")
-async def operator_approve(ticket_id: int, db: DBDep, current: UserDep):
+async def operator_approve(
+    ticket_id: int, db: DBDep, current: UserDep, if_match: str | None = Header(default=None),
+):
     """Погодження оператором:
        - тільки operator або admin
        - якщо статус сирий (new|triage) → ставимо in_progress
-       - якщо виконавець не призначений → ставимо поточного користувача
-       - шлемо подію 'operator_approved'
+       - якщо виконавець не призначений → ставимо поточного користувача;
+         заявку, яку вже веде інший оператор, оператор не перехоплює (409)
+       - шлемо подію 'ticket.operator_approved'
+
+    Без локів: один умовний UPDATE ... WHERE id AND version AND (assignee_id
+    IS NULL OR assignee_id = :me) RETURNING. З двох паралельних approve
+    виграє один, другий отримує 0 рядків і 409, а не чекає в черзі на лок.
     """
     role = getattr(current, "role", None)
     is_operator = role in {getattr(Role, "operator", None), getattr(Role, "agent", None)}
     is_admin = role == getattr(Role, "admin", None)
     if not (is_operator or is_admin):
         raise HTTPException(status_code=403, detail="Only operator/admin can approve")
-
-    t = (await db.execute(select(Ticket).where(Ticket.id == ticket_id))).scalar_one_or_none()
-    if not t:
-        raise HTTPException(status_code=404, detail="Ticket not found")
-
-    # e-mail автора для нотифікації
-    author_email = (await db.execute(select(User.email).where(User.id == t.author_id))).scalar_one_or_none()
-
-    # м’яке оновлення статусу: якщо заявка ще не в роботі — переведемо в in_progress
-    if t.status in {Status.new, Status.triage}:
-        t.status = Status.in_progress
-
-    # авто-призначення
-    if t.assignee_id is None:
-        t.assignee_id = current.id
-
-    await db.commit()
-    await db.refresh(t)
-
-    enqueue("operator_approved", {
+    expected = _expected_version(if_match)
+
+    # старі статус/виконавець (для workload і аудиту) і e-mail автора (для події);
+    # version з того ж знімка — UPDATE не пройде, якщо заявку встигли змінити
+    prev = (
+        select(
+            Ticket.id,
+            Ticket.version.label("old_version"),
+            Ticket.status.label("old_status"),
+            Ticket.assignee_id.label("old_assignee"),
+            User.email.label("author_email"),
+        )
+        .outerjoin(User, User.id == Ticket.author_id)
+        .where(Ticket.id == ticket_id)
+    )
+    stmt = update(Ticket).values(
+        # м’яке оновлення статусу: якщо заявка ще не в роботі — переведемо в in_progress
+        status=case((Ticket.status.in_((Status.new, Status.triage)), Status.in_progress), else_=Ticket.status),
+        # авто-призначення
+        assignee_id=func.coalesce(Ticket.assignee_id, current.id),
+        responded_at=func.coalesce(Ticket.responded_at, func.now()),
+        version=Ticket.version + 1,
+        updated_at=func.now(),
+    )
+    if expected is not None:
+        stmt = stmt.where(Ticket.version == expected)
+    if not is_admin:
+        stmt = stmt.where(or_(Ticket.assignee_id.is_(None), Ticket.assignee_id == current.id))
+    opts = {"synchronize_session": False, "populate_existing": True}
+
+    if db.bind.dialect.name == "postgresql":
+        # UPDATE ... FROM (SELECT старих значень) RETURNING — один стейтмент
+        prev = prev.subquery("prev")
+        row = (
+            await db.execute(
+                stmt.where(Ticket.id == prev.c.id, Ticket.version == prev.c.old_version)
+                .returning(Ticket, prev.c.old_status, prev.c.old_assignee, prev.c.author_email)
+                .execution_options(**opts)
+            )
+        ).first()
+    else:
+        # SQLite не пускає FROM-таблиці в RETURNING: старі значення окремим SELECT
+        old = (await db.execute(prev)).first()
+        row = old and (
+            await db.execute(
+                stmt.where(Ticket.id == ticket_id, Ticket.version == old.old_version)
+                .returning(Ticket)
+                .execution_options(**opts)
+            )
+        ).first()
+        if row:
+            row = (row[0], old.old_status, old.old_assignee, old.author_email)
+
+    if not row:
+        # UPDATE нічого не змінив — розбираємось чому (без rollback: він би expire-нув current)
+        cur = (
+            await db.execute(select(Ticket.assignee_id, Ticket.version).where(Ticket.id == ticket_id))
+        ).first()
+        if cur is None:
+            raise HTTPException(status_code=404, detail="Ticket not found")
+        if expected is not None and cur.version != expected:
+            raise HTTPException(status_code=412, detail="Ticket was modified concurrently")
+        if not is_admin and cur.assignee_id not in (None, current.id):
+            raise HTTPException(status_code=409, detail="Ticket is already assigned to another operator")
+        raise _version_conflict(expected)
+    t, old_status, old_assignee, author_email = row
+
+    add_event(db, "ticket.operator_approved", {
         "ticket": _ticket_payload(t, author_email),
         "actor": _actor_payload(current),
+    }, ticket_id=t.id)
+    await db.commit()
+    await invalidate(f"ticket:{t.id}", "reports")
+    await workload.track(
+        old_assignee=old_assignee, old_status=old_status, new_assignee=t.assignee_id, new_status=t.status,
+    )
+    audit.record("ticket.operator_approved", actor_id=current.id, ticket_id=t.id, payload={
+        "status": getattr(t.status, "value", str(t.status)),
+        "assignee_id": t.assignee_id,
     })
 
     return {"ok": True, "ticket": _ticket_payload(t, author_email)}
@@ -306,36 +712,59 @@ async def operator_approve(ticket_id: int, db: DBDep, current: UserDep):
 # --- ADMIN APPROVE ------------------------------------------------------------
 
 @router.post("/{ticket_id}/admin-approve")
-async def admin_approve(ticket_id: int, db: DBDep, current: UserDep):
+async def admin_approve(
+    ticket_id: int, db: DBDep, current: UserDep, if_match: str | None = Header(default=None),
+):
     """Погодження адміністратором (фінальне):
        - тільки admin
        - статус → done
        - якщо виконавець не призначений → ставимо поточного користувача
-       - шлемо подію 'admin_approved'
+       - шлемо подію 'ticket.admin_approved'
     """
     if getattr(current, "role", None) != getattr(Role, "admin", None):
         raise HTTPException(status_code=403, detail="Only admin can approve")
+    expected = _expected_version(if_match)
 
-    t = (await db.execute(select(Ticket).where(Ticket.id == ticket_id))).scalar_one_or_none()
-    if not t:
+    # без локів: паралельний PATCH / approve ловиться version_id_col на flush
+    row = (await db.execute(_with_author().where(Ticket.id == ticket_id))).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Ticket not found")
+    t, author_email = row
+    if expected is not None and t.version != expected:
+        raise HTTPException(status_code=412, detail="Ticket was modified concurrently")
 
-    author_email = (await db.execute(select(User.email).where(User.id == t.author_id))).scalar_one_or_none()
+    old_status, old_assignee = t.status, t.assignee_id
 
     # фіналізація
     t.status = Status.done
     if t.assignee_id is None:
         t.assignee_id = current.id
+    sla.mark_responded(t)
     # SLA: фіксуємо час рішення, якщо ще не був
     if t.resolved_at is None:
         t.resolved_at = func.now()
 
-    await db.commit()
-    await db.refresh(t)
+    # flush до commit: UPDATE ... RETURNING (eager_defaults) повертає серверні значення
+    # (updated_at тощо) для payload, а сама подія комітиться разом зі зміною заявки
+    try:
+        # version_id_col: UPDATE ... WHERE version = :old; 0 рядків → StaleDataError
+        await db.flush()
+    except StaleDataError:
+        await db.rollback()
+        raise _version_conflict(expected)
 
-    enqueue("admin_approved", {
+    add_event(db, "ticket.admin_approved", {
         "ticket": _ticket_payload(t, author_email),
         "actor": _actor_payload(current),
+    }, ticket_id=t.id)
+    await db.commit()
+    await invalidate(f"ticket:{t.id}", "reports")
+    await workload.track(
+        old_assignee=old_assignee, old_status=old_status, new_assignee=t.assignee_id, new_status=t.status,
+    )
+    audit.record("ticket.admin_approved", actor_id=current.id, ticket_id=t.id, payload={
+        "status": getattr(t.status, "value", str(t.status)),
+        "assignee_id": t.assignee_id,
     })
 
     return {"ok": True, "ticket": _ticket_payload(t, author_email)}
@@ -4,9 +4,10 @@ from __future__ import annotations
 from typing import Annotated, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import cached, invalidate
 from app.db.session import get_session
 from app.api.deps import get_current_user, require_admin, require_operator
 from app.services.auth import serialize_user, hash_password
@@ -45,8 +46,9 @@ async def update_me(payload: UserUpdateSelf, db: AsyncSession = DBDep, current =
         return UserOut(**serialize_user(current))
 
     current.updated_at = func.now()
+    # один UPDATE ... RETURNING (eager_defaults), без refresh після commit
     await db.commit()
-    await db.refresh(current)
+    await invalidate(f"user:{current.id}")
     return UserOut(**serialize_user(current))
 
 # ---------- OPERATOR / ADMIN ----------
@@ -86,6 +88,7 @@ async def list_users(
     )
 
 @router.get("/{user_id}", response_model=UserOut, dependencies=[Depends(require_operator())])
+@cached("users.detail", tags=("user:{user_id}",))
 async def get_user(user_id: int, db: AsyncSession = DBDep):
     u = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
     if not u:
@@ -94,33 +97,39 @@ async def get_user(user_id: int, db: AsyncSession = DBDep):
 
 @router.patch("/{user_id}", response_model=UserOut, dependencies=[Depends(require_admin())])
 async def admin_update_user(user_id: int, payload: UserAdminUpdate, db: AsyncSession = DBDep):
-    u = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
-    if not u:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    changed = False
+    values: dict = {}
 
     if payload.name is not None:
-        u.name = payload.name
-        changed = True
+        values["name"] = payload.name
 
     if payload.is_active is not None:
-        u.is_active = payload.is_active
-        changed = True
+        values["is_active"] = payload.is_active
 
     if payload.role is not None:
         # конвертуємо рядок у Enum, якщо треба
         try:
-            new_role = getattr(Role, payload.role)
+            values["role"] = getattr(Role, payload.role)
         except Exception:
-            new_role = payload.role
-        u.role = new_role
-        changed = True
-
-    if not changed:
-        return UserOut(**serialize_user(u))
-
-    u.updated_at = func.now()
+            values["role"] = payload.role
+
+    if not values:
+        u = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    else:
+        # UPDATE ... RETURNING: один стейтмент замість SELECT + UPDATE + refresh.
+        # populate_existing: адмін, що править себе, уже є в identity map (get_current_user) —
+        # без нього RETURNING віддав би той самий об'єкт зі старими значеннями
+        u = (
+            await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .values(**values, updated_at=func.now())
+                .returning(User)
+                .execution_options(synchronize_session=False, populate_existing=True)
+            )
+        ).scalar_one_or_none()
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
     await db.commit()
-    await db.refresh(u)
+    if values:
+        await invalidate(f"user:{user_id}", "reports")
     return UserOut(**serialize_user(u))
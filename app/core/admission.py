@@ -0,0 +1,213 @@
+# app/core/admission.py
+"""
+Admission control: ліміт одночасних запитів на клас роутів, щоб при
+насиченому пулі БД запити не стояли в черзі SQLAlchemy до таймауту, а
+важка аналітика не з'їдала місце логіну й створенню заявок.
+
+  auth   — /api/auth/*                      (логін, реєстрація, відновлення)
+  write  — не-GET під /api/*                 (створення / зміни)
+  admin  — GET /api/admin/*                  (звіти, статистика, productivity)
+  read   — решта GET під /api/*
+
+У кожного класу — ліміт in-flight, обмежена черга очікування
+(admission_queue_size) і максимальний час у ній (admission_queue_timeout_s).
+Черга повна або час вийшов → одразу 503 + Retry-After, без походу в БД.
+
+Ліміти admin і read адаптивні (AIMD раз на admission_adapt_interval_s) за
+EWMA очікування на конект (app.db.session.POOL_WAIT): admin — за analytics-
+пулом (роутер /api/admin), read — за interactive. Вище
+admission_pool_wait_target_ms → ліміт × 0.75; коли чекає interactive, а admin
+ще не на мінімумі, урізається спершу admin; нижче половини цілі → +1 до
+налаштованого максимуму. auth і write не урізаються — саме їх і захищаємо.
+
+Ліміти — на процес (кожен uvicorn-воркер має свій пул).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+from collections import Counter, deque
+from typing import Any
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.session import POOL_WAIT
+
+# шляхи поза контролем: health-check балансувальника не має отримувати 503,
+# а стан самого admission має бути видно й тоді, коли клас admin насичений
+_EXEMPT = ("/api/health", "/api/admin/admission")
+
+
+def classify(method: str, path: str) -> str | None:
+    if not path.startswith("/api/") or path.startswith(_EXEMPT):
+        return None
+    if path.startswith("/api/auth/"):
+        return "auth"
+    if method not in ("GET", "HEAD"):
+        return "write"
+    if path.startswith("/api/admin/"):
+        return "admin"
+    return "read"
+
+
+class _Gate:
+    """Семафор зі змінним лімітом і обмеженою FIFO-чергою очікування."""
+
+    def __init__(self, name: str, limit: int) -> None:
+        self.name = name
+        self.max_limit = max(1, limit)
+        self.limit = self.max_limit
+        self.inflight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+        self.stats: Counter[str] = Counter()
+
+    async def acquire(self) -> bool:
+        if self.inflight < self.limit and not self.waiters:
+            self.inflight += 1
+            self.stats["admitted"] += 1
+            return True
+        if len(self.waiters) >= settings.admission_queue_size:
+            self.stats["rejected_queue_full"] += 1
+            return False
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        self.stats["queued"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), settings.admission_queue_timeout_s)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # слот видали в ту ж мить, коли вийшов час — беремо його
+                self.stats["admitted"] += 1
+                return True
+            fut.cancel()
+            self._remove(fut)
+            self.stats["rejected_timeout"] += 1
+            return False
+        except BaseException:
+            if fut.done() and not fut.cancelled():
+                self.release()  # слот уже наш — повертаємо
+            else:
+                fut.cancel()
+                self._remove(fut)
+            raise
+        self.stats["admitted"] += 1
+        return True
+
+    def release(self) -> None:
+        self.inflight -= 1
+        self._wake()
+
+    def set_limit(self, limit: int) -> None:
+        self.limit = max(settings.admission_min_limit, min(self.max_limit, limit))
+        self._wake()
+
+    def _wake(self) -> None:
+        # слот передається першому живому в черзі (inflight не зменшується для нього)
+        while self.waiters and self.inflight < self.limit:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                self.inflight += 1
+                fut.set_result(None)
+
+    def _remove(self, fut: asyncio.Future) -> None:
+        try:
+            self.waiters.remove(fut)
+        except ValueError:
+            pass
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "max_limit": self.max_limit,
+            "inflight": self.inflight,
+            "waiting": len(self.waiters),
+            **self.stats,
+        }
+
+
+class Admission:
+    def __init__(self) -> None:
+        # адаптивні (adapt) — лише read і admin
+        self.gates = {
+            "auth": _Gate("auth", settings.admission_auth_limit),
+            "write": _Gate("write", settings.admission_write_limit),
+            "read": _Gate("read", settings.admission_read_limit),
+            "admin": _Gate("admin", settings.admission_admin_limit),
+        }
+        self._adapted_at = 0.0
+
+    def adapt(self) -> None:
+        """AIMD за EWMA очікування на пул; викликається не частіше за інтервал."""
+        now = time.monotonic()
+        if now - self._adapted_at < settings.admission_adapt_interval_s:
+            return
+        self._adapted_at = now
+        target = settings.admission_pool_wait_target_ms
+        admin, read = self.gates["admin"], self.gates["read"]
+        analytics_ms = POOL_WAIT["analytics"].current_ms()
+        interactive_ms = POOL_WAIT["interactive"].current_ms()
+
+        if analytics_ms > target:
+            admin.set_limit(math.floor(admin.limit * 0.75))
+        elif analytics_ms < target / 2 and interactive_ms < target / 2 and admin.limit < admin.max_limit:
+            admin.set_limit(admin.limit + 1)
+
+        if interactive_ms > target:
+            # спершу аналітика (на SQLite пули спільні); read — коли admin уже на мінімумі
+            if admin.limit > settings.admission_min_limit:
+                admin.set_limit(math.floor(admin.limit * 0.75))
+            else:
+                read.set_limit(math.floor(read.limit * 0.75))
+        elif interactive_ms < target / 2 and read.limit < read.max_limit:
+            read.set_limit(read.limit + 1)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "pool_wait_ms": {w: round(p.current_ms(), 2) for w, p in POOL_WAIT.items()},
+            "classes": {name: g.snapshot() for name, g in self.gates.items()},
+        }
+
+
+admission = Admission()
+
+
+class AdmissionMiddleware:
+    """Чистий ASGI: слот класу тримається до кінця відповіді (включно з тілом)."""
+
+    def __init__(self, app: ASGIApp, controller: Admission | None = None) -> None:
+        self.app = app
+        self.controller = controller or admission
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.admission_enabled:
+            return await self.app(scope, receive, send)
+        cls = classify(scope["method"], scope["path"])
+        if cls is None:
+            return await self.app(scope, receive, send)
+        self.controller.adapt()
+        gate = self.controller.gates[cls]
+        if not await gate.acquire():
+            return await _reject(send, cls)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+async def _reject(send: Send, cls: str) -> None:
+    body = json.dumps({"detail": "Сервер перевантажений, спробуйте пізніше", "class": cls}, ensure_ascii=False).encode()
+    retry_after = max(1, math.ceil(settings.admission_queue_timeout_s))
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
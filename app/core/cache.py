@@ -0,0 +1,517 @@
+# app/core/cache.py
+"""
+Спільний кеш читання: L1 у процесі → Redis (L2) → функція.
+
+    @cached("admin.stats", tags=("reports",))
+    async def admin_stats(db: DBDep, include_archived: bool = False): ...
+
+    @cached("ticket.detail", tags=("ticket:{ticket_id}",), result_tags=lambda r: [f"user:{r['author_id']}"])
+    async def load_ticket(db, ticket_id: int): ...
+
+    await cache.invalidate(f"ticket:{t.id}", "reports")   # після commit
+
+Ключ — простір імен + примітивні аргументи виклику (сесія БД, Response,
+поточний користувач тощо у ключ не потрапляють). Значення зберігається як
+JSON (jsonable_encoder), тож на хіт повертається dict/list — response_model
+FastAPI валідує його так само, як ORM-об'єкт.
+
+Теги — Redis SET-и cache:tag:{тег} → ключі. invalidate() одним Lua видаляє
+ключі тегу і публікує теги в cache:invalidate; кожен процес (run_listener у
+lifespan) викидає свої L1-записи з цими тегами. L1 живе недовго
+(cache_l1_ttl_s): pub/sub не гарантує доставку, тож це межа застарівання.
+
+Застарілий fill: обчислення, під час якого тег інвалідували, не кешується.
+Інвалідація робить INCR cache:ver:{тег}; _fill читає версії статичних тегів
+до походу в БД, а _STORE_LUA відмовляється писати, якщо хоч одна змінилась —
+це працює між процесами (у процесі те саме дешевше ловить _tag_epoch, зокрема
+коли Redis недоступний). Теги з результату (result_tags) до обчислення
+невідомі — їх цей захист не покриває, межа — TTL запису.
+
+Stampede: в межах процесу — single-flight (один обчислювач на ключ, решта
+чекають його Future); між процесами — короткий SET NX lock, «програвші»
+опитують ключ до cache_lock_wait_s, потім рахують самі.
+
+Усе «м'яке»: помилка Redis → лог, лічильник errors і пауза
+cache_redis_backoff_s без походів у Redis; запит обслуговується з L1/БД.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import enum
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
+
+import redis
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+from app.services.notifications import _get_redis
+
+log = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+KEY_PREFIX = "cache:"
+TAG_PREFIX = "cache:tag:"
+LOCK_PREFIX = "cache:lock:"
+VERSION_PREFIX = "cache:ver:"
+STATS_KEY = "cache:stats"
+
+# лічильник версії тегу живе довше за будь-який fill; TTL оновлюється на кожен INCR
+_VERSION_TTL_MS = 24 * 3600 * 1000
+
+# свої ж pub/sub-повідомлення listener пропускає — L1 уже очищено в invalidate()
+_PROCESS_ID = f"{os.getpid()}:{os.urandom(4).hex()}"
+
+# KEYS = [ключ, lock, теги..., версії статичних тегів...]
+# ARGV = [значення, ttl_ms, токен lock-а, к-сть тегів, версії, прочитані до fill...]
+# версія змінилась (тег інвалідували, поки рахували) → 0, нічого не пишемо
+_STORE_LUA = """
+local ntags = tonumber(ARGV[4])
+for i = 3 + ntags, #KEYS do
+  if (redis.call('GET', KEYS[i]) or '0') ~= ARGV[i - ntags + 2] then
+    if redis.call('GET', KEYS[2]) == ARGV[3] then redis.call('DEL', KEYS[2]) end
+    return 0
+  end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+for i = 3, 2 + ntags do
+  redis.call('SADD', KEYS[i], KEYS[1])
+  if redis.call('PTTL', KEYS[i]) < tonumber(ARGV[2]) then
+    redis.call('PEXPIRE', KEYS[i], ARGV[2])
+  end
+end
+if redis.call('GET', KEYS[2]) == ARGV[3] then redis.call('DEL', KEYS[2]) end
+return 1
+"""
+
+# KEYS = [теги..., версії тегів...], ARGV = [ttl версії, мс] → видалити всі ключі
+# тегів і самі SET-и, підняти версії (fill, що почався до цього, уже не запишеться)
+_INVALIDATE_LUA = """
+local n = 0
+local ntags = #KEYS / 2
+for i = 1, ntags do
+  local members = redis.call('SMEMBERS', KEYS[i])
+  for _, k in ipairs(members) do n = n + redis.call('DEL', k) end
+  redis.call('DEL', KEYS[i])
+  redis.call('INCR', KEYS[ntags + i])
+  redis.call('PEXPIRE', KEYS[ntags + i], ARGV[1])
+end
+return n
+"""
+
+_UNLOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+# ---------- L1 ----------
+
+
+class _L1:
+    """LRU у процесі: ключ → (термін, JSON, теги) + зворотний індекс тег → ключі."""
+
+    def __init__(self) -> None:
+        self.entries: OrderedDict[str, tuple[float, str, tuple[str, ...]]] = OrderedDict()
+        self.by_tag: dict[str, set[str]] = {}
+
+    def get(self, key: str) -> str | None:
+        e = self.entries.get(key)
+        if e is None:
+            return None
+        if e[0] < time.monotonic():
+            self._drop(key)
+            return None
+        self.entries.move_to_end(key)
+        return e[1]
+
+    def put(self, key: str, raw: str, tags: tuple[str, ...], ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._drop(key)
+        self.entries[key] = (time.monotonic() + ttl, raw, tags)
+        for t in tags:
+            self.by_tag.setdefault(t, set()).add(key)
+        while len(self.entries) > settings.cache_l1_max_entries:
+            self._drop(next(iter(self.entries)))
+
+    def drop_tags(self, tags: Iterable[str]) -> None:
+        for t in tags:
+            for key in self.by_tag.pop(t, ()):
+                self._drop(key)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.by_tag.clear()
+
+    def _drop(self, key: str) -> None:
+        e = self.entries.pop(key, None)
+        if e is None:
+            return
+        for t in e[2]:
+            keys = self.by_tag.get(t)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_tag[t]
+
+
+_l1 = _L1()
+_inflight: dict[str, asyncio.Future] = {}
+# лічильник інвалідацій по тегу: обчислення, під час якого тег інвалідували, не кешується
+_tag_epoch: Counter[str] = Counter()
+_redis_down_until = 0.0
+
+# ---------- метрики ----------
+
+_stats: Counter[tuple[str, str]] = Counter()     # (простір, подія) → к-сть
+_unflushed: Counter[tuple[str, str]] = Counter()  # дельти для cache:stats у Redis
+
+
+def _count(ns: str, event: str) -> None:
+    _stats[(ns, event)] += 1
+    _unflushed[(ns, event)] += 1
+
+
+def _summarize(counts: dict[tuple[str, str], int]) -> dict[str, dict[str, Any]]:
+    out: dict[str, dict[str, Any]] = {}
+    for (ns, event), n in counts.items():
+        out.setdefault(ns, {})[event] = n
+    for row in out.values():
+        hits = row.get("hit_l1", 0) + row.get("hit_l2", 0) + row.get("coalesced", 0) + row.get("lock_waited", 0)
+        total = hits + row.get("miss", 0)
+        row["hit_ratio"] = round(hits / total, 4) if total else None
+    return dict(sorted(out.items()))
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    """Лічильники цього процесу: {простір: {hit_l1, hit_l2, miss, store, ..., hit_ratio}}."""
+    return _summarize(_stats)
+
+
+def cluster_stats(conn: redis.Redis | None = None) -> dict[str, dict[str, Any]]:
+    """Сума по всіх процесах (run_listener періодично скидає дельти в cache:stats)."""
+    raw = (conn or _get_redis()).hgetall(STATS_KEY)
+    counts: dict[tuple[str, str], int] = {}
+    for field, n in raw.items():
+        f = field.decode() if isinstance(field, bytes) else field
+        ns, _, event = f.rpartition("|")
+        counts[(ns, event)] = int(n)
+    return _summarize(counts)
+
+
+def _flush_stats(conn: redis.Redis, deltas: dict[tuple[str, str], int]) -> None:
+    pipe = conn.pipeline(transaction=False)
+    for (ns, event), n in deltas.items():
+        pipe.hincrby(STATS_KEY, f"{ns}|{event}", n)
+    pipe.execute()
+
+
+# ---------- Redis (синхронний клієнт → to_thread, як у workload) ----------
+
+
+def _redis_available() -> bool:
+    return time.monotonic() >= _redis_down_until
+
+
+def _redis_failed(ns: str, op: str) -> None:
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + settings.cache_redis_backoff_s
+    _count(ns, "errors")
+    log.warning("cache_redis_failed", extra={"op": op}, exc_info=log.isEnabledFor(logging.DEBUG))
+
+
+async def _redis_call(ns: str, op: str, fn: Callable[..., Any], *args: Any) -> Any:
+    if not _redis_available():
+        return None
+    try:
+        return await asyncio.to_thread(fn, *args)
+    except redis.RedisError:
+        _redis_failed(ns, op)
+        return None
+
+
+def _versions(conn: redis.Redis, tags: tuple[str, ...]) -> dict[str, str]:
+    """Поточні версії тегів (відсутній лічильник — '0', як у Lua)."""
+    if not tags:
+        return {}
+    vals = conn.mget([VERSION_PREFIX + t for t in tags])
+    return {t: (v.decode() if isinstance(v, bytes) else v) or "0" for t, v in zip(tags, vals)}
+
+
+def _store(
+    conn: redis.Redis, key: str, raw: str, tags: tuple[str, ...], ttl_ms: int, token: str, versions: dict[str, str],
+) -> bool:
+    """False — версія тегу змінилась після читання (запис не зроблено)."""
+    return bool(conn.eval(
+        _STORE_LUA, 2 + len(tags) + len(versions),
+        key, LOCK_PREFIX + key, *[TAG_PREFIX + t for t in tags], *[VERSION_PREFIX + t for t in versions],
+        raw, ttl_ms, token, len(tags), *versions.values(),
+    ))
+
+
+def _invalidate(conn: redis.Redis, tags: tuple[str, ...], origin: str | None = _PROCESS_ID) -> None:
+    pipe = conn.pipeline(transaction=False)
+    pipe.eval(
+        _INVALIDATE_LUA, 2 * len(tags),
+        *[TAG_PREFIX + t for t in tags], *[VERSION_PREFIX + t for t in tags], _VERSION_TTL_MS,
+    )
+    pipe.publish(settings.cache_channel, json.dumps({"origin": origin, "tags": list(tags)}))
+    pipe.execute()
+
+
+# ---------- ключ і теги ----------
+
+
+def _plain(v: Any) -> bool:
+    if v is None or isinstance(v, (str, int, float, bool, enum.Enum)):
+        return True
+    return isinstance(v, (tuple, list, frozenset)) and all(_plain(i) for i in v)
+
+
+def make_key(ns: str, args: dict[str, Any]) -> str:
+    parts = {k: v for k, v in args.items() if _plain(v)}
+    digest = hashlib.blake2b(
+        json.dumps(jsonable_encoder(parts), sort_keys=True).encode(), digest_size=12
+    ).hexdigest()
+    return f"{KEY_PREFIX}{ns}:{digest}"
+
+
+def _decode(raw: str) -> Any:
+    return json.loads(raw)["value"]
+
+
+def _encode(value: Any, tags: tuple[str, ...]) -> str:
+    """value — вже після jsonable_encoder."""
+    # теги їдуть разом зі значенням: процес, що підхопив запис з L2, знає всі його теги для L1
+    return json.dumps({"tags": list(tags), "value": value})
+
+
+def _from_l2(raw: str | bytes) -> tuple[str, tuple[str, ...]]:
+    raw = raw.decode() if isinstance(raw, bytes) else raw
+    return raw, tuple(json.loads(raw)["tags"])
+
+
+# ---------- декоратор ----------
+
+
+def cached(
+    namespace: str,
+    *,
+    tags: Iterable[str] = (),
+    result_tags: Callable[[Any], Iterable[str]] | None = None,
+    ttl: int | None = None,
+) -> Callable[[F], F]:
+    """
+    Кешує async-функцію (ендпоінт чи сервіс). tags — шаблони str.format з
+    аргументів виклику ("ticket:{ticket_id}"); result_tags — теги з результату
+    (напр. user:{author_id}). None-результат не кешується.
+    """
+    tag_templates = tuple(tags)
+
+    def deco(fn: F) -> F:
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not settings.cache_enabled:
+                return await fn(*args, **kwargs)
+            bound = sig.bind(*args, **kwargs)
+            bound.apply_defaults()
+            call_args = dict(bound.arguments)
+            key = make_key(namespace, call_args)
+            static_tags = tuple(t.format(**call_args) for t in tag_templates)
+
+            raw = _l1.get(key)
+            if raw is not None:
+                _count(namespace, "hit_l1")
+                return _decode(raw)
+
+            pending = _inflight.get(key)
+            if pending is not None:
+                _count(namespace, "coalesced")
+                try:
+                    return _decode(await asyncio.shield(pending))
+                except asyncio.CancelledError:
+                    if not pending.cancelled():
+                        raise
+                    # обчислювача скасували (клієнт відвалився) — рахуємо самі
+                    return await fn(*args, **kwargs)
+
+            fut: asyncio.Future = asyncio.get_running_loop().create_future()
+            _inflight[key] = fut
+            try:
+                raw = await _fill(namespace, key, static_tags, result_tags, ttl, fn, args, kwargs)
+                fut.set_result(raw)
+            except asyncio.CancelledError:
+                fut.cancel()
+                raise
+            except Exception as e:
+                fut.set_exception(e)
+                fut.exception()  # щоб asyncio не скаржився, якщо ніхто не чекав
+                raise
+            finally:
+                _inflight.pop(key, None)
+            return _decode(raw)
+
+        return wrapper  # type: ignore[return-value]
+
+    return deco
+
+
+async def _fill(
+    ns: str,
+    key: str,
+    static_tags: tuple[str, ...],
+    result_tags: Callable[[Any], Iterable[str]] | None,
+    ttl: int | None,
+    fn: Callable[..., Awaitable[Any]],
+    args: tuple,
+    kwargs: dict,
+) -> str:
+    """L2 → (lock) → функція → L2 + L1. Повертає JSON-рядок."""
+    conn = _get_redis()
+    raw = await _redis_call(ns, "get", conn.get, key)
+    if raw is not None:
+        raw, tags = _from_l2(raw)
+        _count(ns, "hit_l2")
+        _l1.put(key, raw, tags, settings.cache_l1_ttl_s)
+        return raw
+
+    token = os.urandom(8).hex()
+    lock_ms = int(settings.cache_lock_ttl_s * 1000)
+    # True — lock наш, False — зайнятий, None — Redis недоступний (рахуємо без lock-а)
+    locked = await _redis_call(ns, "lock", lambda: bool(conn.set(LOCK_PREFIX + key, token, nx=True, px=lock_ms)))
+    if locked is False:
+        # інший процес уже рахує — чекаємо його результат
+        deadline = time.monotonic() + settings.cache_lock_wait_s
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            raw = await _redis_call(ns, "get", conn.get, key)
+            if raw is not None:
+                raw, tags = _from_l2(raw)
+                _count(ns, "lock_waited")
+                _l1.put(key, raw, tags, settings.cache_l1_ttl_s)
+                return raw
+        _count(ns, "lock_timeout")
+
+    _count(ns, "miss")
+    epochs = {t: _tag_epoch[t] for t in static_tags}
+    # версії в Redis — до походу в БД: інвалідація з іншого процесу між цим читанням
+    # і записом не дасть _STORE_LUA покласти застаріле значення
+    versions = await _redis_call(ns, "versions", _versions, conn, static_tags)
+    try:
+        value = await fn(*args, **kwargs)
+    except BaseException:
+        if locked:
+            await _redis_call(ns, "unlock", conn.eval, _UNLOCK_LUA, 1, LOCK_PREFIX + key, token)
+        raise
+    value = jsonable_encoder(value)
+    # result_tags бачить те саме, що повернеться з кешу: dict/list, а не pydantic/ORM
+    all_tags = static_tags + tuple(result_tags(value) if result_tags and value is not None else ())
+    raw = _encode(value, all_tags)
+    stale = any(_tag_epoch[t] != e for t, e in epochs.items())
+    if value is None or stale:
+        if stale:
+            _count(ns, "skipped_stale")
+        if locked:
+            await _redis_call(ns, "unlock", conn.eval, _UNLOCK_LUA, 1, LOCK_PREFIX + key, token)
+        return raw
+
+    ttl_ms = int((ttl or settings.cache_ttl_s) * 1000)
+    if versions is not None:
+        stored = await _redis_call(ns, "store", _store, conn, key, raw, all_tags, ttl_ms, token, versions)
+        if stored is False:
+            _count(ns, "skipped_stale")
+            return raw
+    elif locked:
+        # без версій у L2 не пишемо — лише L1 під захистом _tag_epoch
+        await _redis_call(ns, "unlock", conn.eval, _UNLOCK_LUA, 1, LOCK_PREFIX + key, token)
+    _l1.put(key, raw, all_tags, min(settings.cache_l1_ttl_s, ttl_ms / 1000))
+    _count(ns, "store")
+    return raw
+
+
+# ---------- інвалідація ----------
+
+
+def _apply_local(tags: Iterable[str]) -> None:
+    tags = list(tags)
+    for t in tags:
+        _tag_epoch[t] += 1
+    _l1.drop_tags(tags)
+
+
+async def invalidate(*tags: str) -> None:
+    """Викликати після commit: L1 цього процесу одразу, Redis + pub/sub для решти."""
+    tags = tuple(dict.fromkeys(t for t in tags if t))
+    if not tags or not settings.cache_enabled:
+        return
+    _apply_local(tags)
+    _count("_invalidate", "calls")
+    await _redis_call("_invalidate", "invalidate", _invalidate, _get_redis(), tags)
+
+
+def invalidate_sync(conn: redis.Redis, *tags: str) -> None:
+    """
+    Для воркерів і скриптів (maintenance, archive_tickets): лише Redis + pub/sub.
+    Без origin — L1 скидає і listener цього ж процесу (maintenance може жити
+    поруч з API, а L1 з чужого потоку не чіпаємо).
+    """
+    tags = tuple(dict.fromkeys(t for t in tags if t))
+    if not tags or not settings.cache_enabled:
+        return
+    try:
+        _invalidate(conn, tags, origin=None)
+    except redis.RedisError:
+        log.warning("cache_invalidate_failed", exc_info=log.isEnabledFor(logging.DEBUG))
+
+
+async def run_listener() -> None:
+    """
+    Background task у lifespan: pub/sub → L1 цього процесу + періодичний
+    скид метрик у cache:stats. Після обриву з'єднання L1 очищується повністю —
+    інвалідації за час простою втрачено.
+    """
+    last_flush = time.monotonic()
+    while True:
+        pubsub = None
+        try:
+            pubsub = _get_redis().pubsub(ignore_subscribe_messages=True)
+            await asyncio.to_thread(pubsub.subscribe, settings.cache_channel)
+            while True:
+                msg = await asyncio.to_thread(pubsub.get_message, timeout=1.0)
+                if msg and msg.get("type") == "message":
+                    data = json.loads(msg["data"])
+                    if data.get("origin") != _PROCESS_ID:
+                        _apply_local(data.get("tags") or ())
+                if time.monotonic() - last_flush >= settings.cache_stats_flush_s and _unflushed:
+                    deltas = dict(_unflushed)
+                    _unflushed.clear()
+                    last_flush = time.monotonic()
+                    try:
+                        await asyncio.to_thread(_flush_stats, _get_redis(), deltas)
+                    except redis.RedisError:
+                        _unflushed.update(deltas)
+                        raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.warning("cache_listener_failed", exc_info=log.isEnabledFor(logging.DEBUG))
+            _l1.clear()
+            await asyncio.sleep(settings.cache_redis_backoff_s)
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
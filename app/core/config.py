@@ -9,6 +9,20 @@ class Settings(BaseSettings):
     database_url: str = "postgresql+asyncpg://app:app@db:5432/helpdesk"
     redis_url: str = "redis://redis:6379/0"
 
+    # ==== Пули БД за класом навантаження (app/db/session.py), на процес ====
+    # statement_timeout ставиться на кожному новому конекті (лише Postgres; 0 = без ліміту)
+    db_interactive_pool_size: int = 10
+    db_interactive_max_overflow: int = 5
+    db_interactive_statement_timeout_ms: int = 5000
+    db_analytics_pool_size: int = 3      # адмін-звіти / статистика: не більше стількох конектів
+    db_analytics_max_overflow: int = 0
+    db_analytics_statement_timeout_ms: int = 60000
+    db_background_pool_size: int = 2     # outbox relay, аудит, maintenance
+    db_background_max_overflow: int = 2
+    db_background_statement_timeout_ms: int = 30000
+    db_pool_timeout_s: float = 10.0      # очікування на конект з пулу, далі TimeoutError
+    db_dashboard_fanout: int = 4         # паралельних SELECT-ів дашборду оператора на процес (усі запити разом)
+
     # ==== Безпека / Auth ====
     jwt_secret: str = "changeme"
     jwt_alg: str = "HS256"
@@ -44,6 +58,83 @@ class Settings(BaseSettings):
     # ==== UI build (опційно перевизначити директорію зі SPA) ====
     ui_dist_dir: Optional[str] = None
 
+    # ==== Вебхуки нотифікацій (воркер) ====
+    webhook_secret: Optional[str] = None            # HMAC-SHA256 підпис тіла
+    webhook_operator_approved: Optional[str] = None
+    webhook_admin_approved: Optional[str] = None
+
+    # ==== Пошта (воркер нотифікацій) ====
+    mail_backend: str = "log"            # log | smtp | digest
+    smtp_host: str = "localhost"
+    smtp_port: int = 25
+    smtp_user: Optional[str] = None
+    smtp_password: Optional[str] = None
+    smtp_starttls: bool = False
+    smtp_from: str = "DeskLite <noreply@desklite.local>"
+    smtp_pool_size: int = 2              # живих SMTP-з'єднань на процес воркера
+    mail_batch_size: int = 50            # листів на одне з'єднання за раз
+    mail_flush_interval_s: float = 2.0   # smtp: буфер листів іде пачкою не пізніше ніж за N сек
+    mail_digest_interval_s: int = 900    # digest: зведення не частіше ніж раз на 15 хв
+
+    # ==== Maintenance-задачі у воркері ====
+    maintenance_enabled: bool = True
+    maintenance_interval_s: int = 3600
+    maintenance_chunk_size: int = 500    # рядків на транзакцію (FOR UPDATE SKIP LOCKED)
+    archive_done_after_days: int = 30    # done → archived; 0 = вимкнено
+    close_answered_after_days: int = 14  # answered → closed; 0 = вимкнено
+
+    # ==== Outbox (події по заявках → RQ) ====
+    outbox_relay_enabled: bool = True   # relay як background task в API-процесі
+    outbox_batch_size: int = 100
+    outbox_poll_interval: float = 1.0   # секунди між проходами, коли outbox порожній
+
+    # ==== SLA ====
+    sla_policies: Optional[str] = None   # JSON {"high": [реакція_хв, рішення_хв], "mgmt:high": [...]}
+    sla_check_interval_s: int = 60       # як часто воркер шукає близькі прострочення
+    sla_warning_lead_s: int = 900        # попереджати за 15 хв до дедлайну
+
+    # ==== Авто-призначення (найменш завантажений оператор) ====
+    auto_assign_enabled: bool = False    # нова заявка одразу отримує виконавця
+    workload_reconcile_interval_s: int = 300  # перебудова індексу з БД (страховка від дрейфу)
+
+    # ==== Аудит (буферизований запис у audit_log) ====
+    audit_enabled: bool = True
+    audit_flush_interval_s: float = 1.0  # як часто writer скидає буфер у БД
+    audit_batch_size: int = 500          # рядків на один multi-row INSERT
+    audit_buffer_max: int = 20000        # понад це нові записи відкидаються (з лічильником)
+    audit_partitions_ahead: int = 2      # скільки місячних партицій тримати наперед (Postgres)
+    audit_retention_months: int = 12     # старші партиції DROP-аються; 0 = зберігати все
+
+    # ==== Кеш читання (Redis + L1 у процесі, app/core/cache.py) ====
+    cache_enabled: bool = True
+    cache_ttl_s: int = 60                # TTL запису в Redis за замовчуванням
+    cache_l1_ttl_s: float = 5.0          # L1 — межа застарівання, якщо pub/sub-повідомлення загубилось
+    cache_l1_max_entries: int = 2048     # LRU на процес
+    cache_lock_ttl_s: float = 10.0       # lock обчислювача (stampede між процесами)
+    cache_lock_wait_s: float = 2.0       # скільки «програвші» чекають чужий результат
+    cache_redis_backoff_s: float = 5.0   # після помилки Redis — пауза без походів у нього
+    cache_stats_flush_s: float = 10.0    # як часто лічильники процесу скидаються в cache:stats
+    cache_channel: str = "cache:invalidate"
+
+    # ==== Idempotency-Key для створюючих POST-ів (app/core/idempotency.py) ====
+    idempotency_enabled: bool = True
+    idempotency_ttl_s: int = 60 * 60 * 24   # скільки пам'ятати відповідь
+    idempotency_lock_ttl_s: float = 30.0    # pending-запис, якщо процес упав посеред запиту
+    idempotency_wait_s: float = 5.0         # паралельний дубль чекає відповідь першого
+    idempotency_redis_backoff_s: float = 5.0
+
+    # ==== Admission control (app/core/admission.py), ліміти на процес ====
+    admission_enabled: bool = True
+    admission_auth_limit: int = 8        # одночасних запитів /api/auth/*
+    admission_write_limit: int = 16      # не-GET
+    admission_read_limit: int = 32       # GET (адаптивний)
+    admission_admin_limit: int = 4       # GET /api/admin/* (адаптивний, урізається першим)
+    admission_min_limit: int = 1
+    admission_queue_size: int = 64      # очікувачів на клас; понад — одразу 503
+    admission_queue_timeout_s: float = 2.0
+    admission_pool_wait_target_ms: float = 50.0  # EWMA очікування на конект пулу
+    admission_adapt_interval_s: float = 1.0
+
     # ==== Логування / Оточення ====
     env: str = "dev"          # dev|staging|prod
     log_level: str = "INFO"   # DEBUG|INFO|WARNING|ERROR
@@ -0,0 +1,214 @@
+# app/core/idempotency.py
+"""
+Idempotency-Key для POST-ів, що створюють рядки (заявки, питання, реєстрація,
+відновлення паролю): повтор з тим самим ключем повертає збережену відповідь,
+хендлер удруге не виконується.
+
+  idem:{sha256(метод|шлях|Authorization|ключ)} — JSON у Redis:
+    {"state": "pending", "fp": ...}                       поки перший запит виконується
+    {"state": "done", "fp": ..., "status", "headers", "body"}   після відповіді (TTL idempotency_ttl_s)
+
+fp — sha256 тіла запиту: той самий ключ з іншим тілом → 422.
+Перший запит ставить pending через SET NX (легкий lock); паралельний
+дубль чекає до idempotency_wait_s, поки з'явиться done, і отримує ту саму
+відповідь, інакше — 409 + Retry-After. Відповіді 5xx не зберігаються
+(ключ знімається — повтор виконається заново), 2xx/4xx — зберігаються.
+
+Ключ прив'язаний до Authorization: чужий токен з тим самим ключем
+відповідь не отримає. Redis недоступний → запит іде як без заголовка.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Iterable
+
+import redis
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.services.notifications import _get_redis
+
+log = logging.getLogger(__name__)
+
+HEADER = "idempotency-key"
+KEY_PREFIX = "idem:"
+MAX_KEY_LEN = 255
+# заголовки відповіді, які віддаються і на повтор (решту ставлять зовнішні middleware)
+_REPLAY_HEADERS = {b"content-type", b"etag", b"location"}
+
+_redis_down_until = 0.0
+
+
+def _redis_key(method: str, path: str, auth: bytes, key: str) -> str:
+    h = hashlib.sha256(b"|".join([method.encode(), path.encode(), auth, key.encode()])).hexdigest()
+    return KEY_PREFIX + h
+
+
+async def _redis(fn, *args: Any, **kwargs: Any) -> Any:
+    """Виклик синхронного клієнта в треді; RedisError → backoff, як у app/core/cache.py."""
+    global _redis_down_until
+    try:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    except redis.RedisError:
+        _redis_down_until = time.monotonic() + settings.idempotency_redis_backoff_s
+        log.warning("idempotency_redis_failed", exc_info=log.isEnabledFor(logging.DEBUG))
+        raise
+
+
+async def _plain_response(send: Send, status: int, detail: str, headers: Iterable[tuple[bytes, bytes]] = ()) -> None:
+    body = json.dumps({"detail": detail}, ensure_ascii=False).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send: Send, rec: dict[str, Any]) -> None:
+    body = base64.b64decode(rec["body"])
+    headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in rec["headers"]]
+    headers += [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+    await send({"type": "http.response.start", "status": rec["status"], "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    Чистий ASGI (без BaseHTTPMiddleware — тіло запиту читаємо самі і
+    віддаємо хендлеру через підмінений receive).
+
+        app.add_middleware(IdempotencyMiddleware, routes={("POST", "/api/tickets"), ...})
+    """
+
+    def __init__(self, app: ASGIApp, routes: Iterable[tuple[str, str]]) -> None:
+        self.app = app
+        self.routes = {(m.upper(), p.rstrip("/")) for m, p in routes}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.idempotency_enabled:
+            return await self.app(scope, receive, send)
+        method, path = scope["method"], scope["path"].rstrip("/")
+        if (method, path) not in self.routes:
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        raw_key = headers.get(HEADER.encode())
+        if raw_key is None or time.monotonic() < _redis_down_until:
+            return await self.app(scope, receive, send)
+        key = raw_key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LEN:
+            return await _plain_response(send, 400, f"Idempotency-Key: 1..{MAX_KEY_LEN} символів")
+
+        # тіло повністю (тут лише невеликі JSON-и) — для fingerprint і для хендлера
+        chunks, more = [], True
+        while more:
+            msg = await receive()
+            if msg["type"] == "http.disconnect":
+                return
+            chunks.append(msg.get("body", b""))
+            more = msg.get("more_body", False)
+        body = b"".join(chunks)
+        fp = hashlib.sha256(body).hexdigest()
+        rkey = _redis_key(method, path, headers.get(b"authorization", b""), key)
+
+        sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        conn = _get_redis()
+        try:
+            acquired = await _redis(
+                conn.set, rkey, json.dumps({"state": "pending", "fp": fp}),
+                nx=True, px=int(settings.idempotency_lock_ttl_s * 1000),
+            )
+        except redis.RedisError:
+            return await self.app(scope, replay_receive, send)
+
+        if not acquired:
+            return await self._existing(conn, rkey, fp, send)
+
+        # перший запит з цим ключем — виконуємо й запам'ятовуємо відповідь
+        start: Message | None = None
+        out: list[bytes] = []
+
+        async def capture(msg: Message) -> None:
+            nonlocal start
+            if msg["type"] == "http.response.start":
+                start = msg
+            elif msg["type"] == "http.response.body":
+                out.append(msg.get("body", b""))
+            try:
+                await send(msg)
+            except Exception:
+                # клієнт відвалився по таймауту — саме той випадок, заради якого ключ:
+                # відповідь усе одно зберігаємо, повтор її отримає
+                pass
+
+        try:
+            await self.app(scope, replay_receive, capture)
+        except BaseException:
+            await self._release(conn, rkey)
+            raise
+        status = start["status"] if start else 500
+        if status >= 500:
+            await self._release(conn, rkey)
+            return
+        rec = {
+            "state": "done",
+            "fp": fp,
+            "status": status,
+            "headers": [
+                (k.decode("latin-1"), v.decode("latin-1"))
+                for k, v in start.get("headers", [])
+                if k.lower() in _REPLAY_HEADERS
+            ],
+            "body": base64.b64encode(b"".join(out)).decode(),
+        }
+        try:
+            await _redis(conn.set, rkey, json.dumps(rec), ex=settings.idempotency_ttl_s)
+        except redis.RedisError:
+            pass
+
+    async def _existing(self, conn: redis.Redis, rkey: str, fp: str, send: Send) -> None:
+        """Ключ уже є: готова відповідь → повтор; pending → чекати; інше тіло → 422."""
+        deadline = time.monotonic() + settings.idempotency_wait_s
+        while True:
+            try:
+                raw = await _redis(conn.get, rkey)
+            except redis.RedisError:
+                raw = None
+            rec = json.loads(raw) if raw else None
+            if rec is None:
+                # перший запит завершився 5xx і зняв ключ — повтор виконається заново
+                return await _plain_response(
+                    send, 409, "Попередній запит з цим Idempotency-Key не вдався, повторіть",
+                    [(b"retry-after", b"0")],
+                )
+            if rec.get("fp") != fp:
+                return await _plain_response(send, 422, "Idempotency-Key уже використано з іншим тілом запиту")
+            if rec.get("state") == "done":
+                return await _replay(send, rec)
+            if time.monotonic() >= deadline:
+                # перший запит ще виконується (або впав, і pending доживає lock TTL)
+                return await _plain_response(
+                    send, 409, "Запит з цим Idempotency-Key ще виконується",
+                    [(b"retry-after", b"1")],
+                )
+            await asyncio.sleep(0.05)
+
+    async def _release(self, conn: redis.Redis, rkey: str) -> None:
+        try:
+            await _redis(conn.delete, rkey)
+        except redis.RedisError:
+            pass
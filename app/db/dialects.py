@@ -0,0 +1,92 @@
+# app/db/dialects.py
+"""
+Діалектно-переносимі SQL-вирази.
+
+Моделі та роутери пишемо під Postgres, але частина виразів (date_trunc,
+INTERVAL, EXTRACT(EPOCH ...)) не існує в SQLite. Тут — невеликі
+конструкції, що компілюються окремо під кожен діалект, щоб увесь API
+можна було підняти in-process на sqlite+aiosqlite (бенчмарки, CI, локальні
+прогони без сервера БД).
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import JSON, DateTime, Float, literal
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# JSON-колонка: JSONB у Postgres, звичайний JSON (TEXT) деінде
+JSONVariant = JSON().with_variant(JSONB(), "postgresql")
+
+
+def is_sqlite_url(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+class day_trunc(FunctionElement):
+    """Обрізає timestamp до початку доби (аналог date_trunc('day', x))."""
+
+    type = DateTime(timezone=True)
+    name = "day_trunc"
+    inherit_cache = True
+
+
+@compiles(day_trunc)
+def _day_trunc_default(element, compiler, **kw):
+    return "date_trunc('day', %s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_trunc, "sqlite")
+def _day_trunc_sqlite(element, compiler, **kw):
+    return "datetime(%s, 'start of day')" % compiler.process(element.clauses, **kw)
+
+
+class days_ago(FunctionElement):
+    """now() мінус N днів (N — bind-параметр, тож кеш запитів працює)."""
+
+    type = DateTime(timezone=True)
+    name = "days_ago"
+    inherit_cache = True
+
+    def __init__(self, days: int):
+        super().__init__(literal(int(days)))
+
+
+@compiles(days_ago)
+def _days_ago_default(element, compiler, **kw):
+    return "now() - make_interval(days => %s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(days_ago, "sqlite")
+def _days_ago_sqlite(element, compiler, **kw):
+    return "datetime('now', '-' || %s || ' days')" % compiler.process(element.clauses, **kw)
+
+
+class epoch_diff(FunctionElement):
+    """Різниця двох timestamp у секундах (EXTRACT(EPOCH FROM a - b))."""
+
+    type = Float()
+    name = "epoch_diff"
+    inherit_cache = True
+
+    def __init__(self, end, start):
+        super().__init__(end, start)
+
+
+@compiles(epoch_diff)
+def _epoch_diff_default(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return "EXTRACT(EPOCH FROM %s - %s)" % (
+        compiler.process(end, **kw),
+        compiler.process(start, **kw),
+    )
+
+
+@compiles(epoch_diff, "sqlite")
+def _epoch_diff_sqlite(element, compiler, **kw):
+    end, start = list(element.clauses)
+    return "((julianday(%s) - julianday(%s)) * 86400.0)" % (
+        compiler.process(end, **kw),
+        compiler.process(start, **kw),
+    )
@@ -0,0 +1,61 @@
+# app/db/migrations/_concurrent.py
+"""
+Спільне для міграцій, що будують/видаляють індекси CONCURRENTLY.
+
+CREATE/DROP INDEX CONCURRENTLY не працює в транзакції — усе йде в
+autocommit-блоці alembic. statement_timeout ролі на час блоку знімається
+(побудова на великій таблиці може йти довше) і повертається після нього —
+однаково для upgrade і downgrade.
+
+Якщо побудову перервано, Postgres лишає INVALID-індекс: create_concurrently
+його прибирає й будує заново, валідний наявний — пропускає.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Iterator, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+@contextmanager
+def concurrent_ddl() -> Iterator[None]:
+    """Autocommit-блок без statement_timeout."""
+    with op.get_context().autocommit_block():
+        op.execute("SET statement_timeout = 0")
+        try:
+            yield
+        finally:
+            op.execute("RESET statement_timeout")
+
+
+def index_state(name: str) -> bool | None:
+    """None — індексу немає; True — валідний; False — INVALID (перерваний CONCURRENTLY)."""
+    if op.get_context().as_sql:
+        return None  # offline (--sql): стану БД не знаємо
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :n"
+        ),
+        {"n": name},
+    ).scalar()
+
+
+def create_concurrently(name: str, table: str, columns: Sequence[str], where: str | None = None) -> None:
+    state = index_state(name)
+    if state is True:
+        return
+    if state is False:
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    op.create_index(
+        name, table, list(columns), unique=False,
+        postgresql_concurrently=True,
+        postgresql_where=sa.text(where) if where else None,
+    )
+
+
+def drop_concurrently(name: str, table: str) -> None:
+    op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,76 @@
+"""cold storage tables for archived tickets
+
+Revision ID: 8d2f3b1c5e21
+Revises: 7c1e2a9d4b10
+Create Date: 2026-10-19 10:00:00.000000
+
+Лише DDL нових таблиць — гаряча tickets не блокується. Наявні archived-рядки
+переносить maintenance-задача move_archived_tickets (або
+`python -m app.scripts.archive_tickets`) чанками з SKIP LOCKED.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2f3b1c5e21'
+down_revision = '7c1e2a9d4b10'
+branch_labels = None
+depends_on = None
+
+
+def _enum(name):
+    return postgresql.ENUM(name=name, create_type=False)
+
+
+def upgrade():
+    op.create_table('tickets_archive',
+    sa.Column('dept', sa.String(length=32), nullable=True),
+    sa.Column('topic', sa.String(length=255), nullable=True),
+    sa.Column('position', sa.String(length=255), nullable=True),
+    sa.Column('phone', sa.String(length=32), nullable=True),
+    sa.Column('work_email', sa.String(length=255), nullable=True),
+    sa.Column('backup_email', sa.String(length=255), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('assignee_id', sa.Integer(), nullable=True),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('category', sa.String(length=64), nullable=True),
+    sa.Column('priority', _enum('priority_enum'), nullable=False),
+    sa.Column('status', _enum('ticket_status_enum'), nullable=False),
+    sa.Column('resolved_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_tickets_archive'))
+    )
+    op.create_index('ix_tickets_archive_author_id', 'tickets_archive', ['author_id'], unique=False)
+    op.create_index('ix_tickets_archive_created_at', 'tickets_archive', ['created_at'], unique=False)
+
+    op.create_table('comments_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('ticket_id', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('visibility', _enum('comment_visibility_enum'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_comments_archive'))
+    )
+    op.create_index('ix_comments_archive_ticket_id', 'comments_archive', ['ticket_id'], unique=False)
+
+    # аудит має пережити перенос заявки в архів, тож FK (ON DELETE SET NULL) прибираємо
+    op.execute("ALTER TABLE audit_log DROP CONSTRAINT IF EXISTS audit_log_ticket_id_fkey")
+    op.execute("ALTER TABLE audit_log DROP CONSTRAINT IF EXISTS fk_audit_log_ticket_id_tickets")
+
+
+def downgrade():
+    op.create_foreign_key(
+        'audit_log_ticket_id_fkey', 'audit_log', 'tickets', ['ticket_id'], ['id'], ondelete='SET NULL'
+    )
+    op.drop_index('ix_comments_archive_ticket_id', table_name='comments_archive')
+    op.drop_table('comments_archive')
+    op.drop_index('ix_tickets_archive_created_at', table_name='tickets_archive')
+    op.drop_index('ix_tickets_archive_author_id', table_name='tickets_archive')
+    op.drop_table('tickets_archive')
@@ -0,0 +1,93 @@
+"""audit_log partitioned by month
+
+Revision ID: 9a4c6e2f7b30
+Revises: 8d2f3b1c5e21
+Create Date: 2026-10-19 11:00:00.000000
+
+audit_log → RANGE (created_at) по місяцях; PK (id, created_at), бо ключ
+партиціонування має входити в PK. Наявні рядки копіюються, партиції
+створюються від найстарішого запису до поточного місяця + 2 наперед;
+далі їх підтримує maintenance-задача (app/services/audit.py).
+"""
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c6e2f7b30'
+down_revision = '8d2f3b1c5e21'
+branch_labels = None
+depends_on = None
+
+
+def _month(d, shift=0):
+    m = d.year * 12 + (d.month - 1) + shift
+    return datetime(m // 12, m % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def upgrade():
+    op.execute("""
+        CREATE TABLE audit_log_new (
+            id integer NOT NULL,
+            actor_id integer REFERENCES users (id) ON DELETE SET NULL,
+            action varchar(64) NOT NULL,
+            ticket_id integer,
+            payload jsonb,
+            created_at timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT pk_audit_log PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE TABLE audit_log_default PARTITION OF audit_log_new DEFAULT")
+
+    oldest = op.get_bind().execute(sa.text("SELECT min(created_at) FROM audit_log")).scalar()
+    now = datetime.now(timezone.utc)
+    start = _month(oldest or now)
+    while start < _month(now, 3):
+        end = _month(start, 1)
+        op.execute(
+            f"CREATE TABLE audit_log_y{start.year:04d}m{start.month:02d} PARTITION OF audit_log_new "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+
+    op.execute("""
+        INSERT INTO audit_log_new (id, actor_id, action, ticket_id, payload, created_at)
+        SELECT id, actor_id, action, ticket_id, payload, created_at FROM audit_log
+    """)
+    # sequence id переживає drop старої таблиці
+    op.execute("ALTER SEQUENCE audit_log_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE audit_log")
+    op.execute("ALTER TABLE audit_log_new RENAME TO audit_log")
+    op.execute("ALTER TABLE audit_log ALTER COLUMN id SET DEFAULT nextval('audit_log_id_seq')")
+    op.execute("ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log.id")
+
+    op.create_index('ix_audit_log_actor_id', 'audit_log', ['actor_id'], unique=False)
+    op.create_index('ix_audit_log_ticket_id_created_at', 'audit_log', ['ticket_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    op.execute("""
+        CREATE TABLE audit_log_old (
+            id integer NOT NULL,
+            actor_id integer REFERENCES users (id) ON DELETE SET NULL,
+            action varchar(64) NOT NULL,
+            ticket_id integer,
+            payload jsonb,
+            created_at timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT audit_log_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("""
+        INSERT INTO audit_log_old (id, actor_id, action, ticket_id, payload, created_at)
+        SELECT id, actor_id, action, ticket_id, payload, created_at FROM audit_log
+    """)
+    op.execute("ALTER SEQUENCE audit_log_id_seq OWNED BY NONE")
+    op.execute("DROP TABLE audit_log CASCADE")
+    op.execute("ALTER TABLE audit_log_old RENAME TO audit_log")
+    op.execute("ALTER TABLE audit_log ALTER COLUMN id SET DEFAULT nextval('audit_log_id_seq')")
+    op.execute("ALTER SEQUENCE audit_log_id_seq OWNED BY audit_log.id")
+    op.create_index('ix_audit_log_actor_id', 'audit_log', ['actor_id'], unique=False)
+    op.create_index('ix_audit_log_ticket_id', 'audit_log', ['ticket_id'], unique=False)
@@ -0,0 +1,68 @@
+"""ticket SLA deadlines + partial indexes over open tickets
+
+Revision ID: a1b7d3e9c4f2
+Revises: 9a4c6e2f7b30
+Create Date: 2026-10-19 12:00:00.000000
+
+Backfill дедлайнів для відкритих заявок — за дефолтною політикою
+(app/services/sla.py DEFAULT_POLICIES); dept-перевизначення з SLA_POLICIES
+застосуються при наступній зміні priority/dept.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1b7d3e9c4f2'
+down_revision = '9a4c6e2f7b30'
+branch_labels = None
+depends_on = None
+
+OPEN = "'new', 'triage', 'in_progress', 'pending_admin', 'blocked'"
+
+# priority → (реакція, рішення), хвилини
+DEFAULTS = {
+    'high': (60, 480),
+    'medium': (240, 1440),
+    'normal': (480, 4320),
+    'low': (1440, 10080),
+}
+
+
+def upgrade():
+    for table in ('tickets', 'tickets_archive'):
+        op.add_column(table, sa.Column('responded_at', sa.DateTime(timezone=True), nullable=True))
+        op.add_column(table, sa.Column('response_due_at', sa.DateTime(timezone=True), nullable=True))
+        op.add_column(table, sa.Column('resolve_due_at', sa.DateTime(timezone=True), nullable=True))
+
+    # заявки, які вже взяли в роботу, вважаємо такими, що отримали реакцію
+    op.execute(
+        "UPDATE tickets SET responded_at = updated_at "
+        "WHERE status <> 'new' OR assignee_id IS NOT NULL"
+    )
+    for priority, (response_min, resolve_min) in DEFAULTS.items():
+        op.execute(
+            f"UPDATE tickets SET "
+            f"response_due_at = created_at + make_interval(mins => {response_min}), "
+            f"resolve_due_at = created_at + make_interval(mins => {resolve_min}) "
+            f"WHERE priority = '{priority}' AND status IN ({OPEN})"
+        )
+
+    op.create_index(
+        'ix_tickets_response_due_open', 'tickets', ['response_due_at'], unique=False,
+        postgresql_where=sa.text(f"responded_at IS NULL AND status IN ({OPEN})"),
+    )
+    op.create_index(
+        'ix_tickets_resolve_due_open', 'tickets', ['resolve_due_at'], unique=False,
+        postgresql_where=sa.text(f"status IN ({OPEN})"),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_tickets_resolve_due_open', table_name='tickets')
+    op.drop_index('ix_tickets_response_due_open', table_name='tickets')
+    for table in ('tickets_archive', 'tickets'):
+        op.drop_column(table, 'resolve_due_at')
+        op.drop_column(table, 'response_due_at')
+        op.drop_column(table, 'responded_at')
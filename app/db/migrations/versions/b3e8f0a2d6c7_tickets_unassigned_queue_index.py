@@ -0,0 +1,27 @@
+"""partial index for the operator "next ticket" queue
+
+Revision ID: b3e8f0a2d6c7
+Revises: a1b7d3e9c4f2
+Create Date: 2026-10-19 13:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8f0a2d6c7'
+down_revision = 'a1b7d3e9c4f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_tickets_unassigned_queue', 'tickets', ['status', 'priority', 'created_at'], unique=False,
+        postgresql_where=sa.text('assignee_id IS NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_tickets_unassigned_queue', table_name='tickets')
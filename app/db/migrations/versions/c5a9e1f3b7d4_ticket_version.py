@@ -0,0 +1,27 @@
+"""ticket version column for optimistic concurrency
+
+Revision ID: c5a9e1f3b7d4
+Revises: b3e8f0a2d6c7
+Create Date: 2026-10-19 14:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a9e1f3b7d4'
+down_revision = 'b3e8f0a2d6c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NOT NULL + константний DEFAULT — у Postgres 11+ без переписування таблиці
+    for table in ('tickets', 'tickets_archive'):
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in ('tickets_archive', 'tickets'):
+        op.drop_column(table, 'version')
@@ -0,0 +1,47 @@
+"""missing hot-path indexes, built with CREATE INDEX CONCURRENTLY
+
+Revision ID: d9e4a7c1f0b8
+Revises: c5a9e1f3b7d4
+Create Date: 2026-10-19 16:00:00.000000
+
+Кожен індекс будується CONCURRENTLY в autocommit-блоці (поза транзакцією
+міграції, app/db/migrations/_concurrent.py): таблиця лишається доступною на
+запис, поки індекс будується.
+Якщо побудову перервано, Postgres лишає INVALID-індекс — повторний прогін
+міграції його прибирає й будує заново; валідний наявний — пропускає.
+
+ix_questions_author_id повністю покривається новим (author_id, created_at)
+і видаляється (DROP INDEX CONCURRENTLY) — мінус один індекс на кожен INSERT.
+"""
+
+from app.db.migrations._concurrent import concurrent_ddl, create_concurrently, drop_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9e4a7c1f0b8'
+down_revision = 'c5a9e1f3b7d4'
+branch_labels = None
+depends_on = None
+
+
+# (ім'я, таблиця, колонки, WHERE часткового індексу)
+INDEXES = [
+    ('ix_questions_author_id_created_at', 'questions', ['author_id', 'created_at'], None),
+    ('ix_tickets_topic_status_created', 'tickets', ['topic', 'status', 'created_at'], 'topic IS NOT NULL'),
+    ('ix_tickets_assignee_status', 'tickets', ['assignee_id', 'status'], None),
+    ('ix_tickets_resolved_at', 'tickets', ['resolved_at', 'assignee_id'], 'resolved_at IS NOT NULL'),
+]
+
+
+def upgrade():
+    with concurrent_ddl():
+        for name, table, columns, where in INDEXES:
+            create_concurrently(name, table, columns, where)
+        drop_concurrently('ix_questions_author_id', 'questions')
+
+
+def downgrade():
+    with concurrent_ddl():
+        create_concurrently('ix_questions_author_id', 'questions', ['author_id'])
+        for name, table, _, _ in reversed(INDEXES):
+            drop_concurrently(name, table)
@@ -0,0 +1,40 @@
+"""indexes for password-recovery listing and admin stats, CONCURRENTLY
+
+Revision ID: e3b6c2d8a4f1
+Revises: d9e4a7c1f0b8
+Create Date: 2026-10-19 18:00:00.000000
+
+Список заявок на відновлення паролю сортує за id DESC — ix_tickets_topic_status_created
+(topic, status, created_at) такого порядку не дає, тож окремий (topic, id).
+Admin stats фільтрує users за role і сортує за email — (role, email).
+Будуються так само, як у d9e4a7c1f0b8 (app/db/migrations/_concurrent.py):
+CONCURRENTLY в autocommit-блоці, INVALID-залишок перерваної побудови перебудовується.
+"""
+
+from app.db.migrations._concurrent import concurrent_ddl, create_concurrently, drop_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b6c2d8a4f1'
+down_revision = 'd9e4a7c1f0b8'
+branch_labels = None
+depends_on = None
+
+
+# (ім'я, таблиця, колонки, WHERE часткового індексу)
+INDEXES = [
+    ('ix_tickets_topic_id', 'tickets', ['topic', 'id'], 'topic IS NOT NULL'),
+    ('ix_users_role_email', 'users', ['role', 'email'], None),
+]
+
+
+def upgrade():
+    with concurrent_ddl():
+        for name, table, columns, where in INDEXES:
+            create_concurrently(name, table, columns, where)
+
+
+def downgrade():
+    with concurrent_ddl():
+        for name, table, _, _ in reversed(INDEXES):
+            drop_concurrently(name, table)
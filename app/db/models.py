@@ -6,6 +6,8 @@ from datetime import datetime
 from typing import List, Optional
 
 from sqlalchemy import (
+    Column,
+    Table,
     String,
     Text,
     Integer,
@@ -15,11 +17,12 @@ from sqlalchemy import (
     ForeignKey,
     func,
     Index,
+    text,
 )
-from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
+from app.db.dialects import JSONVariant
 
 # ==== Енуми (python + sqlalchemy) ====
 
@@ -48,6 +51,17 @@ class TicketStatusEnum(str, enum.Enum):
     archived = "archived"
 
 
+# статуси, в яких SLA ще «тикає» (предикат часткових індексів і SLA-скану)
+SLA_OPEN_STATUSES = (
+    TicketStatusEnum.new,
+    TicketStatusEnum.triage,
+    TicketStatusEnum.in_progress,
+    TicketStatusEnum.pending_admin,
+    TicketStatusEnum.blocked,
+)
+_SLA_OPEN_SQL = ", ".join(f"'{s.value}'" for s in SLA_OPEN_STATUSES)
+
+
 class CommentVisibilityEnum(str, enum.Enum):
     public = "public"
     internal = "internal"
@@ -75,6 +89,9 @@ class TimestampMixin:
 
 class User(TimestampMixin, Base):
     __tablename__ = "users"
+    # серверні значення (created_at/updated_at) повертаються через RETURNING
+    # у самому INSERT/UPDATE — без окремого refresh після commit
+    __mapper_args__ = {"eager_defaults": True}
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
@@ -97,6 +114,11 @@ class User(TimestampMixin, Base):
     )
     comments: Mapped[List["Comment"]] = relationship(back_populates="author")
 
+    __table_args__ = (
+        # admin stats: WHERE role=? [AND is_active] ORDER BY email — без скану всіх users
+        Index("ix_users_role_email", "role", "email"),
+    )
+
     def __repr__(self) -> str:
         return f"<User id={self.id} email={self.email} role={self.role}>"
 
@@ -140,6 +162,14 @@ class Ticket(TimestampMixin, Base):
         nullable=True,
     )
 
+    # optimistic concurrency: ORM-UPDATE-и йдуть з WHERE version = :old (ETag / If-Match)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, server_default="1")
+
+    # SLA (див. app/services/sla.py)
+    responded_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    response_due_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    resolve_due_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
     # relationships
     author: Mapped["User"] = relationship(
         back_populates="tickets_authored",
@@ -157,7 +187,58 @@ class Ticket(TimestampMixin, Base):
     __table_args__ = (
         Index("ix_tickets_status_priority", "status", "priority"),
         Index("ix_tickets_created_at", "created_at"),
-    )
+        # черга «наступна заявка»: WHERE status=? AND priority=? AND assignee_id IS NULL ORDER BY created_at
+        Index(
+            "ix_tickets_unassigned_queue",
+            "status",
+            "priority",
+            "created_at",
+            postgresql_where=text("assignee_id IS NULL"),
+            sqlite_where=text("assignee_id IS NULL"),
+        ),
+        # часткові індекси лише по відкритих заявках — SLA-скан діапазоном дедлайнів
+        Index(
+            "ix_tickets_response_due_open",
+            "response_due_at",
+            postgresql_where=text(f"responded_at IS NULL AND status IN ({_SLA_OPEN_SQL})"),
+            sqlite_where=text(f"responded_at IS NULL AND status IN ({_SLA_OPEN_SQL})"),
+        ),
+        Index(
+            "ix_tickets_resolve_due_open",
+            "resolve_due_at",
+            postgresql_where=text(f"status IN ({_SLA_OPEN_SQL})"),
+            sqlite_where=text(f"status IN ({_SLA_OPEN_SQL})"),
+        ),
+        # службові заявки (operator_signup / password_recovery): WHERE topic=? [AND status=?] ORDER BY created_at
+        Index(
+            "ix_tickets_topic_status_created",
+            "topic",
+            "status",
+            "created_at",
+            postgresql_where=text("topic IS NOT NULL"),
+            sqlite_where=text("topic IS NOT NULL"),
+        ),
+        # список заявок на відновлення паролю: WHERE topic=? ORDER BY id DESC
+        Index(
+            "ix_tickets_topic_id",
+            "topic",
+            "id",
+            postgresql_where=text("topic IS NOT NULL"),
+            sqlite_where=text("topic IS NOT NULL"),
+        ),
+        # статистика операторів: JOIN по assignee_id + розклад за статусом
+        Index("ix_tickets_assignee_status", "assignee_id", "status"),
+        # продуктивність: resolved_at >= :since, GROUP BY assignee_id — index-only по вирішених
+        Index(
+            "ix_tickets_resolved_at",
+            "resolved_at",
+            "assignee_id",
+            postgresql_where=text("resolved_at IS NOT NULL"),
+            sqlite_where=text("resolved_at IS NOT NULL"),
+        ),
+    )
+
+    __mapper_args__ = {"version_id_col": version, "eager_defaults": True}
 
     def __repr__(self) -> str:
         return f"<Ticket id={self.id} status={self.status} priority={self.priority}>"
@@ -192,8 +273,52 @@ class Comment(Base):
     author: Mapped["User"] = relationship(back_populates="comments")
 
 
+# ==== Холодне сховище: заархівовані заявки ====
+
+
+def _mirror_table(src: Table, name: str, *extra) -> Table:
+    """
+    Таблиця з тими самими колонками, що й src, але без FK/дефолтів:
+    рядки туди лише переносяться з «гарячої» таблиці. Нові колонки
+    гарячої таблиці автоматично з'являються і тут (міграцію — не забути).
+    """
+    cols = [
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+        for c in src.columns
+    ]
+    return Table(name, Base.metadata, *cols, *extra)
+
+
+class TicketArchive(Base):
+    """Заявки зі статусом archived (переносить maintenance-задача)."""
+
+    __table__ = _mirror_table(
+        Ticket.__table__,
+        "tickets_archive",
+        Index("ix_tickets_archive_author_id", "author_id"),
+        Index("ix_tickets_archive_created_at", "created_at"),
+    )
+
+
+class CommentArchive(Base):
+    __table__ = _mirror_table(
+        Comment.__table__,
+        "comments_archive",
+        Index("ix_comments_archive_ticket_id", "ticket_id"),
+    )
+
+
 class AuditLog(Base):
+    """
+    Журнал дій. У Postgres таблиця партиціонована по місяцях (RANGE created_at,
+    PK (id, created_at)) — див. міграцію 9a4c6e2f7b30 і services/audit.py.
+    """
+
     __tablename__ = "audit_log"
+    __table_args__ = (
+        # таймлайн заявки: WHERE ticket_id = ? ORDER BY created_at
+        Index("ix_audit_log_ticket_id_created_at", "ticket_id", "created_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     actor_id: Mapped[Optional[int]] = mapped_column(
@@ -202,12 +327,9 @@ class AuditLog(Base):
         index=True,
     )
     action: Mapped[str] = mapped_column(String(64))
-    ticket_id: Mapped[Optional[int]] = mapped_column(
-        ForeignKey("tickets.id", ondelete="SET NULL"),
-        nullable=True,
-        index=True,
-    )
-    payload: Mapped[Optional[dict]] = mapped_column(JSONB, nullable=True)
+    # без FK: заявка може переїхати в tickets_archive, а аудит лишається
+    ticket_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    payload: Mapped[Optional[dict]] = mapped_column(JSONVariant, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -249,6 +371,7 @@ class QuestionStatusEnum(str, enum.Enum):
 
 class Question(Base):
     __tablename__ = "questions"
+    __mapper_args__ = {"eager_defaults": True}
 
     id: SAMapped[int] = sa_mapped_column(primary_key=True)
     author_id: SAMapped[int] = sa_mapped_column(
@@ -273,6 +396,13 @@ class Question(Base):
         nullable=False,
     )
 
+    __table_args__ = (
+        Index("ix_questions_status", "status"),
+        Index("ix_questions_created_at", "created_at"),
+        # list_questions автора: WHERE author_id=? ORDER BY created_at DESC
+        Index("ix_questions_author_id_created_at", "author_id", "created_at"),
+    )
+
     author: SAMapped["User"] = sa_relationship(backref="questions", lazy="joined")
     answers: SAMapped[list["Answer"]] = sa_relationship(
         back_populates="question",
@@ -282,6 +412,7 @@ class Question(Base):
 
 class Answer(Base):
     __tablename__ = "answers"
+    __mapper_args__ = {"eager_defaults": True}
 
     id: SAMapped[int] = sa_mapped_column(primary_key=True)
     question_id: SAMapped[int] = sa_mapped_column(
@@ -384,3 +515,27 @@ class OperatorFeedback(Base):
 
     operator: Mapped["User"] = relationship("User", foreign_keys=[operator_id])
     author: Mapped[Optional["User"]] = relationship("User", foreign_keys=[author_id])
+
+
+# --- NEW: transactional outbox для подій по заявках ---
+
+
+class OutboxEvent(Base):
+    """
+    Подія, записана в тій самій транзакції, що й зміна заявки.
+    Relay (app/services/outbox.py) пакетно перекладає їх у RQ і видаляє.
+    """
+
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    ticket_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    event_type: Mapped[str] = mapped_column(String(64), nullable=False)
+    payload: Mapped[Optional[dict]] = mapped_column(JSONVariant, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
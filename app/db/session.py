@@ -1,10 +1,138 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.db.dialects import is_sqlite_url
+
+
+class PoolWaitStats:
+    """EWMA очікування на конект з пулу — сигнал насичення для admission control."""
+
+    alpha = 0.2
+    # без нових checkout-ів довше за це — пул вільний, стара оцінка не діє
+    stale_after_s = 5.0
+
+    def __init__(self) -> None:
+        self.ewma_s = 0.0
+        self.last_at = 0.0
+        self.checkouts = 0
+
+    def observe(self, seconds: float) -> None:
+        self.ewma_s += self.alpha * (seconds - self.ewma_s)
+        self.last_at = time.monotonic()
+        self.checkouts += 1
+
+    def current_ms(self) -> float:
+        if time.monotonic() - self.last_at > self.stale_after_s:
+            return 0.0
+        return self.ewma_s * 1000
+
+
+# ==== пули за класом навантаження ====
+# interactive — CRUD заявок/питань, auth; analytics — адмін-звіти, статистика,
+# productivity (роутер /api/admin); background — outbox relay, аудит, maintenance.
+# Окремі пули: повільна аналітика тримає лише свої конекти, а statement_timeout
+# (SET на кожному новому конекті) обриває запит, що вийшов за бюджет класу.
+WORKLOADS = ("interactive", "analytics", "background")
+
+POOL_WAIT: dict[str, PoolWaitStats] = {w: PoolWaitStats() for w in WORKLOADS}
+pool_wait = POOL_WAIT["interactive"]
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, що міряє час checkout-у (очікування в черзі пулу)."""
+
+    stats: PoolWaitStats = pool_wait
+
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.stats.observe(time.perf_counter() - t0)
+
+
+def _timed_pool(workload: str) -> type[TimedQueuePool]:
+    # клас, а не атрибут інстансу: pool.recreate() після dispose створює новий інстанс
+    return type(f"TimedQueuePool_{workload}", (TimedQueuePool,), {"stats": POOL_WAIT[workload]})
+
+
+def _engine_kwargs(url: str, workload: str) -> dict:
+    # sqlite+aiosqlite (бенчмарки/CI): in-memory БД живе лише в одному
+    # з'єднанні — пул рівно з одного конекту, сесії чекають на нього по черзі
+    # (StaticPool тут не годиться: конкурентні сесії змішали б транзакції)
+    if is_sqlite_url(url):
+        kw: dict = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" in url or url.rstrip("/").endswith("sqlite+aiosqlite:"):
+            kw.update(poolclass=_timed_pool(workload), pool_size=1, max_overflow=0)
+        return kw
+    return {
+        "poolclass": _timed_pool(workload),
+        "pool_size": getattr(settings, f"db_{workload}_pool_size"),
+        "max_overflow": getattr(settings, f"db_{workload}_max_overflow"),
+        "pool_timeout": settings.db_pool_timeout_s,
+        "pool_pre_ping": True,
+    }
+
+
+def _set_statement_timeout(eng: AsyncEngine, ms: int) -> None:
+    @event.listens_for(eng.sync_engine, "connect")
+    def _on_connect(dbapi_conn, _record) -> None:
+        cur = dbapi_conn.cursor()
+        cur.execute(f"SET statement_timeout = {int(ms)}")
+        cur.close()
+
+
+def make_engine(url: str | None = None, workload: str = "interactive", **kw) -> AsyncEngine:
+    """
+    Async-engine з урахуванням діалекту (окремі процеси/потоки: воркер, maintenance).
+    workload — розмір пулу й statement_timeout з settings.db_<workload>_*.
+    """
+    url = url or settings.database_url
+    eng = create_async_engine(url, echo=False, future=True, **{**_engine_kwargs(url, workload), **kw})
+    timeout_ms = getattr(settings, f"db_{workload}_statement_timeout_ms")
+    if eng.dialect.name == "postgresql" and timeout_ms:
+        _set_statement_timeout(eng, timeout_ms)
+    return eng
+
+
+engine = make_engine()
+if engine.dialect.name == "sqlite":
+    # один файл / одна in-memory БД — окремі engine-и бачили б різні бази
+    engines: dict[str, AsyncEngine] = {w: engine for w in WORKLOADS}
+else:
+    engines = {"interactive": engine, **{w: make_engine(workload=w) for w in WORKLOADS if w != "interactive"}}
+
+SESSIONMAKERS = {w: sessionmaker(e, class_=AsyncSession, expire_on_commit=False) for w, e in engines.items()}
+AsyncSessionLocal = SESSIONMAKERS["interactive"]
+BackgroundSessionLocal = SESSIONMAKERS["background"]
+
+# клас поточного запиту — ставить dependency роутера (app.api.deps.use_workload)
+current_workload: ContextVar[str] = ContextVar("current_workload", default="interactive")
+
+
+async def dispose_all() -> None:
+    for e in {id(e): e for e in engines.values()}.values():
+        await e.dispose()
+
+
+async def create_all_if_sqlite() -> None:
+    """
+    Alembic-міграції написані під Postgres; для sqlite-профілю схему
+    створюємо прямо з метаданих моделей.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    from app.db.models import Base  # локально, щоб уникнути циклічного імпорту
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 async def get_session() -> AsyncSession:
-    async with AsyncSessionLocal() as session:
+    async with SESSIONMAKERS[current_workload.get()]() as session:
         yield session
@@ -1,8 +1,10 @@
 # app/main.py
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.staticfiles import StaticFiles
 from starlette.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
@@ -16,22 +18,89 @@ from app.api.routes import (
     admin,
     questions,
     operator_feedback,   # 👈 додали
+    operator_dashboard,
 )
 
+from app.core import cache
+from app.core.admission import AdmissionMiddleware
 from app.core.config import settings
+from app.core.idempotency import IdempotencyMiddleware
 from app.core.logging import setup_logging, RequestIdMiddleware
+from app.api.deps import use_workload
+from app.db.session import BackgroundSessionLocal, create_all_if_sqlite
+from app.services import audit
+from app.services.outbox import run_relay
 
 setup_logging(settings.log_level)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # sqlite-профіль (DATABASE_URL=sqlite+aiosqlite://...) — схема без alembic
+    await create_all_if_sqlite()
+
+    # outbox relay: події по заявках → RQ поза HTTP-запитами
+    relay = (
+        asyncio.create_task(run_relay(BackgroundSessionLocal))
+        if settings.outbox_relay_enabled
+        else None
+    )
+    # аудит: буфер у процесі → multi-row INSERT-и поза запитами
+    audit_writer = (
+        asyncio.create_task(audit.run_writer(BackgroundSessionLocal))
+        if settings.audit_enabled
+        else None
+    )
+    # кеш читання: pub/sub-інвалідація L1 від інших процесів
+    cache_listener = (
+        asyncio.create_task(cache.run_listener())
+        if settings.cache_enabled
+        else None
+    )
+    try:
+        yield
+    finally:
+        if relay is not None:
+            relay.cancel()
+        if cache_listener is not None:
+            cache_listener.cancel()
+        if audit_writer is not None:
+            audit_writer.cancel()
+            # дочекатися фінального flush
+            await asyncio.gather(audit_writer, return_exceptions=True)
+
+
 app = FastAPI(
     title="Helpdesk Lite",
     version="0.1.0",
     docs_url="/api/docs",
     redoc_url=None,
     openapi_url="/api/openapi.json",
+    lifespan=lifespan,
 )
 
 # ==== Middlewares ====
+# Starlette: останній доданий — зовнішній. Тож спершу внутрішні (admission,
+# idempotency), потім CORS і request-id — їхні заголовки мають і 503 від
+# admission, і відповіді-повтори idempotency.
+# Порядок ззовні: RequestId → CORS → Idempotency → Admission → роутер.
+
+# ліміти одночасних запитів на клас роутів: переповнення → 503 + Retry-After
+app.add_middleware(AdmissionMiddleware)
+
+# повтор POST-а з тим самим Idempotency-Key → збережена відповідь, без дубля в БД
+app.add_middleware(
+    IdempotencyMiddleware,
+    routes={
+        ("POST", "/api/tickets"),
+        ("POST", "/api/questions"),
+        ("POST", "/api/auth/register"),
+        ("POST", "/api/auth/register-operator"),
+        ("POST", "/api/auth/password-recovery-request"),
+        ("POST", "/api/auth/password/recovery"),
+    },
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
@@ -48,8 +117,11 @@ app.include_router(auth.router,      prefix="/api/auth",   tags=["auth"])
 app.include_router(users.router,     prefix="/api/users",  tags=["users"])
 app.include_router(tickets.router,   prefix="/api/tickets", tags=["tickets"])
 app.include_router(comments.router,  prefix="/api/tickets", tags=["comments"])
-app.include_router(admin.router,     prefix="/api/admin",  tags=["admin"])
+# адмінка (звіти, статистика, productivity) — на окремому analytics-пулі
+app.include_router(admin.router,     prefix="/api/admin",  tags=["admin"],
+                   dependencies=[Depends(use_workload("analytics"))])
 app.include_router(operator_feedback.router, prefix="/api/operator", tags=["operator"])
+app.include_router(operator_dashboard.router, prefix="/api/operator", tags=["operator"])
 
 
 
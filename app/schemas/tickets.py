@@ -16,6 +16,11 @@ try:
 except Exception:
     from app.db.models import Status  # старе ім'я
 
+try:
+    from app.db.models import RoleEnum as Role
+except Exception:
+    from app.db.models import Role  # старе ім'я
+
 
 Dept = Literal['dev', 'impl', 'info', 'mgmt']  # зберігаємо як короткі коди
 
@@ -74,5 +79,78 @@ class TicketOut(BaseModel):
     work_email: Optional[str] = None
     backup_email: Optional[str] = None
 
+    version: int = 1  # те саме значення віддається в ETag
+
+    # SLA-дедлайни
+    response_due_at: Optional[datetime] = None
+    resolve_due_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+# view=summary у списках: те, що реально показує список (без description і контактів)
+TICKET_SUMMARY_FIELDS = ("id", "title", "status", "priority", "created_at", "updated_at")
+
+
+class TicketSparseOut(BaseModel):
+    """
+    Рядок списку з fields= / view=summary: лише запитані колонки
+    (решта не потрапляє ні в SELECT, ні у відповідь — response_model_exclude_unset).
+    """
+    id: int
+    title: Optional[str] = None
+    description: Optional[str] = None
+    priority: Optional[Priority] = None
+    status: Optional[Status] = None
+    author_id: Optional[int] = None
+    assignee_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    dept: Optional[Dept] = None
+    topic: Optional[str] = None
+    position: Optional[str] = None
+    phone: Optional[str] = None
+    work_email: Optional[str] = None
+    backup_email: Optional[str] = None
+    version: Optional[int] = None
+    response_due_at: Optional[datetime] = None
+    resolve_due_at: Optional[datetime] = None
+
+
+class UserSummaryOut(BaseModel):
+    """Компактний користувач для expand=author,assignee."""
+    id: int
+    email: str
+    name: Optional[str] = None
+    role: Role
+
+    class Config:
+        from_attributes = True
+
+
+class TicketDetailOut(TicketOut):
+    """GET /api/tickets/{id}?expand=... — вкладені автор / виконавець."""
+    author: Optional[UserSummaryOut] = None
+    assignee: Optional[UserSummaryOut] = None
+
+
+class TicketListExpandedOut(BaseModel):
+    """
+    Список з expand=...: заявки посилаються на author_id / assignee_id,
+    а самі користувачі — один раз у бічній таблиці users (ключ — id).
+    """
+    items: list[TicketOut] | list[TicketSparseOut]
+    users: dict[int, UserSummaryOut]
+
+
+class TimelineEntryOut(BaseModel):
+    """Запис audit_log у таймлайні заявки."""
+    id: int
+    action: str
+    actor_id: Optional[int] = None
+    payload: Optional[dict] = None
+    created_at: datetime
+
     class Config:
         from_attributes = True
@@ -0,0 +1,44 @@
+"""
+Разовий перенос archived-заявок у холодні таблиці (tickets_archive / comments_archive).
+
+Те саме робить maintenance-задача move_archived_tickets, але тут — одразу
+й до кінця, напр. одразу після міграції 8d2f3b1c5e21 на базі з історією:
+
+    python -m app.scripts.archive_tickets --chunk 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.db.session import make_engine
+from app.services.archive import move_archived
+
+
+async def _run(chunk: int) -> None:
+    # як maintenance: background-пул зі своїм statement_timeout, а не interactive
+    engine = make_engine(workload="background")
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    t0 = time.perf_counter()
+    try:
+        async with sessions() as db:
+            n = await move_archived(db, chunk=chunk)
+    finally:
+        await engine.dispose()
+    print(f"[archive] перенесено {n} заявок за {time.perf_counter() - t0:.1f}s")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="archived → tickets_archive, чанками з SKIP LOCKED")
+    p.add_argument("--chunk", type=int, default=settings.maintenance_chunk_size)
+    args = p.parse_args()
+    asyncio.run(_run(args.chunk))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Бенчмарк SMTP-відправки проти локального aiosmtpd (stand-in замість реального MTA).
+
+Порівнює:
+  - per-message — нове SMTP-з'єднання на кожен лист (як було б «в лоб»);
+  - pooled      — app.services.mail.send_many через SMTPPool;
+  - queued      — шлях воркера в MAIL_BACKEND=smtp: кожен лист окремим викликом
+                  queue_mail (буфер у Redis), пачка йде через send_queued,
+                  щойно набралось mail_batch_size, залишок — flush_outbox.
+
+Запуск (pip install aiosmtpd; Redis з REDIS_URL, без нього — fakeredis, якщо є):
+    python -m app.scripts.bench_mail -n 2000
+    python -m app.scripts.bench_mail -n 500 --rtt-ms 2   # MTA не на localhost
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import smtplib
+import time
+
+import redis
+
+from app.core.config import settings
+from app.services.mail import SMTPPool, _message, flush_outbox, queue_mail, send_many, send_queued
+
+try:
+    from aiosmtpd.controller import Controller  # type: ignore
+except Exception:  # опційна залежність лише для бенчмарку
+    Controller = None  # type: ignore
+
+
+class _CountingHandler:
+    def __init__(self, rtt_ms: float = 0.0) -> None:
+        self.received = 0
+        self.rtt_s = rtt_ms / 1000
+
+    async def handle_NOOP(self, server, session, envelope, arg):
+        # перевірка живості з'єднання в SMTPPool — раз на взяття конекту з пулу
+        await asyncio.sleep(self.rtt_s)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.rtt_s)
+        self.received += 1
+        return "250 OK"
+
+
+def _mails(n: int) -> list[tuple[str, str, str]]:
+    return [(f"user{i}@example.com", f"Ticket #{i} created", "Your request was registered.") for i in range(n)]
+
+
+def bench_per_message(host: str, port: int, n: int) -> float:
+    t0 = time.perf_counter()
+    for to, subject, body in _mails(n):
+        with smtplib.SMTP(host, port) as conn:
+            conn.send_message(_message(to, subject, body))
+    return n / (time.perf_counter() - t0)
+
+
+def bench_pooled(host: str, port: int, n: int, pool_size: int) -> float:
+    pool = SMTPPool(host, port, size=pool_size)
+    t0 = time.perf_counter()
+    send_many(_mails(n), pool=pool)
+    rate = n / (time.perf_counter() - t0)
+    pool.close()
+    return rate
+
+
+def bench_queued(host: str, port: int, n: int, pool_size: int, conn: redis.Redis) -> float:
+    pool = SMTPPool(host, port, size=pool_size)
+    conn.delete("mail:outbox", "mail:outbox:due")
+    t0 = time.perf_counter()
+    for to, subject, body in _mails(n):
+        size, _ = queue_mail(conn, to, subject, body)
+        if size >= settings.mail_batch_size:
+            send_queued(conn, batches=1, pool=pool)
+    flush_outbox(conn, now=time.time() + settings.mail_flush_interval_s, pool=pool)
+    rate = n / (time.perf_counter() - t0)
+    pool.close()
+    return rate
+
+
+def _redis() -> tuple[redis.Redis, str]:
+    conn = redis.from_url(settings.redis_url)
+    try:
+        conn.ping()
+        return conn, settings.redis_url
+    except redis.RedisError:
+        try:
+            import fakeredis  # type: ignore
+        except Exception:
+            raise SystemExit(f"Redis недоступний ({settings.redis_url}), fakeredis не встановлено")
+        return fakeredis.FakeRedis(), "fakeredis"
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="SMTP: per-message vs pooled, msgs/sec")
+    p.add_argument("-n", "--messages", type=int, default=2000)
+    p.add_argument("--pool-size", type=int, default=2)
+    p.add_argument("--port", type=int, default=8025)
+    p.add_argument("--rtt-ms", type=float, default=0.0, help="затримка stand-in на NOOP/DATA (мережа до MTA)")
+    args = p.parse_args()
+
+    if Controller is None:
+        raise SystemExit("Потрібен aiosmtpd: pip install aiosmtpd")
+
+    conn, redis_label = _redis()
+    handler = _CountingHandler(args.rtt_ms)
+    ctrl = Controller(handler, hostname="127.0.0.1", port=args.port)
+    ctrl.start()
+    try:
+        per_msg = bench_per_message("127.0.0.1", args.port, args.messages)
+        pooled = bench_pooled("127.0.0.1", args.port, args.messages, args.pool_size)
+        queued = bench_queued("127.0.0.1", args.port, args.messages, args.pool_size, conn)
+    finally:
+        ctrl.stop()
+
+    print(f"per-message: {per_msg:8.0f} msgs/s")
+    print(f"pooled:      {pooled:8.0f} msgs/s   (x{pooled / per_msg:.1f})")
+    print(f"queued:      {queued:8.0f} msgs/s   (x{queued / per_msg:.1f}, Redis: {redis_label})")
+    print(f"received by stand-in: {handler.received} / {3 * args.messages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Бенчмарк бекендів нотифікацій: RQ vs Redis Streams (consumer group).
+
+Для кожного бекенда: кладемо N подій status_changed одним pipeline,
+потім дренуємо їх в одному процесі (RQ SimpleWorker у burst-режимі /
+stream_worker.run(burst=True)) і міряємо events/sec окремо для enqueue
+та обробки. Обробник той самий (EVENT_HANDLERS), тож різниця — це
+накладні витрати транспорту.
+
+Запуск (потрібен Redis; використовує окремі ключі, робочі черги не чіпає):
+    python -m app.scripts.bench_notifications -n 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+
+import redis
+from rq import Queue, SimpleWorker
+
+from app.core.config import settings
+from app.services.notifications import HANDLER_PATH, _stream_fields
+from app.workers import stream_worker
+
+BENCH_QUEUE = "bench:notifications"
+BENCH_STREAM = "bench:notifications:stream"
+BENCH_GROUP = "bench-workers"
+
+
+def _events(n: int) -> list[tuple[str, dict]]:
+    return [("status_changed", {"ticket_id": i, "from": "new", "to": "triage"}) for i in range(n)]
+
+
+def bench_rq(conn: redis.Redis, n: int) -> tuple[float, float]:
+    q = Queue(BENCH_QUEUE, connection=conn)
+    q.empty()
+    datas = [Queue.prepare_data(HANDLER_PATH, args=(et, p), result_ttl=0) for et, p in _events(n)]
+
+    t0 = time.perf_counter()
+    q.enqueue_many(datas)
+    t_enq = time.perf_counter() - t0
+
+    worker = SimpleWorker([q], connection=conn)
+    t0 = time.perf_counter()
+    worker.work(burst=True, logging_level="WARNING")
+    t_work = time.perf_counter() - t0
+    return n / t_enq, n / t_work
+
+
+def bench_streams(conn: redis.Redis, n: int) -> tuple[float, float]:
+    conn.delete(BENCH_STREAM)
+    stream_worker.ensure_group(conn, BENCH_STREAM, BENCH_GROUP)
+
+    t0 = time.perf_counter()
+    pipe = conn.pipeline(transaction=False)
+    for et, p in _events(n):
+        pipe.xadd(BENCH_STREAM, _stream_fields(et, p))
+    pipe.execute()
+    t_enq = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    done = stream_worker.run(conn, stream=BENCH_STREAM, group=BENCH_GROUP, consumer="bench", burst=True)
+    t_work = time.perf_counter() - t0
+    conn.delete(BENCH_STREAM)
+    return n / t_enq, done / t_work
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="RQ vs Redis Streams: events/sec")
+    p.add_argument("-n", "--events", type=int, default=5000)
+    p.add_argument("--redis-url", default=settings.redis_url)
+    args = p.parse_args()
+
+    # лог на кожну подію з'їв би весь бюджет — лишаємо лише попередження
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("worker.notifications").setLevel(logging.WARNING)
+
+    conn = redis.from_url(args.redis_url)
+    for name, fn in (("rq", bench_rq), ("streams", bench_streams)):
+        enq, work = fn(conn, args.events)
+        print(f"{name:8s} enqueue: {enq:10.0f} ev/s   process: {work:10.0f} ev/s   (n={args.events})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+CLI для dead-letter нотифікацій.
+
+    python -m app.scripts.dlq stats
+    python -m app.scripts.dlq list --type ticket.admin_approved --limit 20
+    python -m app.scripts.dlq replay --dest hooks.example.com --rate 5 --limit 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import datetime, timezone
+
+import redis
+
+from app.core.config import settings
+from app.services import deadletter
+from app.services.notifications import enqueue
+
+
+def _filters(args: argparse.Namespace) -> dict:
+    return {
+        "event_type": args.type,
+        "destination": args.dest,
+        "error_class": args.error,
+        "limit": args.limit,
+    }
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Dead-letter нотифікацій: перегляд і replay")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="к-сть падінь і записів у DLQ за типами")
+    for name in ("list", "replay"):
+        sp = sub.add_parser(name)
+        sp.add_argument("--type", help="event_type, напр. ticket.admin_approved")
+        sp.add_argument("--dest", help="адресат: host вебхука або mail")
+        sp.add_argument("--error", help="клас помилки, напр. ConnectionError")
+        sp.add_argument("--limit", type=int, default=100)
+        if name == "replay":
+            sp.add_argument("--rate", type=float, default=10.0, help="подій на секунду")
+    p.add_argument("--redis-url", default=settings.redis_url)
+    return p.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    conn = redis.from_url(args.redis_url)
+
+    if args.cmd == "stats":
+        print(json.dumps(deadletter.stats(conn), indent=2, ensure_ascii=False))
+        return
+
+    ids = deadletter.find_ids(conn, **_filters(args))
+    if args.cmd == "list":
+        for e in deadletter.get_many(conn, ids):
+            at = datetime.fromtimestamp(e["failed_at"], tz=timezone.utc).isoformat(timespec="seconds")
+            print(f"{e['id']}  {at}  {e['event_type']:28s} {e['destination']:24s} {e['error_class']}: {e['error'][:80]}")
+        return
+
+    print(f"[dlq] replay {len(ids)} подій, {args.rate}/s ...")
+    print(deadletter.replay(conn, ids, enqueue, rate_per_sec=args.rate))
+
+
+if __name__ == "__main__":
+    main()
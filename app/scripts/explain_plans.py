@@ -0,0 +1,248 @@
+"""
+Знімки планів гарячих запитів (EXPLAIN) — щоб пропущений індекс помітити до проду.
+
+Канонічний SQL не переписується вручну: гарячі роути (list_tickets з усіма
+комбінаціями фільтрів, admin_stats, operator_productivity,
+list_operator_signups, password-recovery-requests) ганяються через ASGI на
+наповненій БД (app.scripts.query_budget.seed), а SELECT-и, які вони реально
+виконують, перехоплюються разом з параметрами й проганяються через
+  Postgres:  EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)
+  SQLite:    EXPLAIN QUERY PLAN
+Від плану лишається «форма» — вузли + таблиці/індекси, без costs/rows/часу.
+
+Прапорці:
+  - seq scan (PG: Seq Scan, SQLite: SCAN без індексу) по таблиці, де рядків
+    >= --large;
+  - форма плану відрізняється від збереженої в query_plans.<діалект>.json
+    (регресія між релізами). --write — зберегти поточні форми.
+
+    python -m app.scripts.explain_plans                  # SQLite in-memory, 5000 рядків
+    HARNESS_DATABASE_URL=postgresql+asyncpg://.../scratch python -m app.scripts.explain_plans -v
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import re
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from app.scripts.query_budget import Ctx, Scenario, _s, call, login, seed  # noqa: I001  (env — у query_counts)
+
+import httpx
+from sqlalchemy import event, func, select
+
+from app.db.models import Base
+from app.db.session import dispose_all, engine, engines
+from app.main import app
+
+SNAPSHOT_DIR = Path(__file__).parent
+
+
+def _ticket_filters() -> list[Scenario]:
+    """list_tickets: кожна комбінація фільтрів оператора + погляд автора."""
+    filters = {
+        "status": lambda c: "status=in_progress",
+        "priority": lambda c: "priority=high",
+        "assignee": lambda c: f"assignee_id={c.ids['operator']}",
+        "author": lambda c: f"author_id={c.ids['user']}",
+    }
+    out = []
+    for k in range(len(filters) + 1):
+        for combo in itertools.combinations(filters, k):
+            name = "GET /api/tickets ?" + ("+".join(combo) or "all")
+            out.append(_s(
+                name,
+                lambda c, combo=combo: "/api/tickets?" + "&".join([filters[f](c) for f in combo] + ["limit=50"]),
+                "operator",
+            ))
+    out.append(_s("GET /api/tickets ?user", "/api/tickets?limit=50", "user"))
+    out.append(_s("GET /api/tickets ?user+status", "/api/tickets?status=new&limit=50", "user"))
+    out.append(_s("GET /api/tickets ?archived", "/api/tickets?include_archived=true&limit=50", "operator"))
+    return out
+
+
+HOT: list[Scenario] = [
+    *_ticket_filters(),
+    _s("GET /api/admin/stats", "/api/admin/stats"),
+    _s("GET /api/admin/operator-productivity", "/api/admin/operator-productivity"),
+    _s("GET /api/admin/operator-signups", "/api/admin/operator-signups"),
+    _s("GET /api/auth/password-recovery-requests", "/api/auth/password-recovery-requests"),
+]
+
+
+@contextmanager
+def capturing() -> Iterator[list[tuple[str, Any]]]:
+    """SELECT-и (текст драйвера + параметри), виконані всередині блоку."""
+    seen: list[tuple[str, Any]] = []
+
+    def _on(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            seen.append((statement, parameters))
+
+    # адмін-роути йдуть через analytics-пул — слухаємо всі engine-и
+    distinct = list({id(e): e for e in engines.values()}.values())
+    for e in distinct:
+        event.listen(e.sync_engine, "before_cursor_execute", _on)
+    try:
+        yield seen
+    finally:
+        for e in distinct:
+            event.remove(e.sync_engine, "before_cursor_execute", _on)
+
+
+# ---------- форма плану ----------
+
+
+def _pg_shape(node: dict, depth: int = 0) -> list[str]:
+    label = node["Node Type"]
+    target = node.get("Index Name") or node.get("Relation Name")
+    if target:
+        label += f" [{target}]"
+    out = ["  " * depth + label]
+    for child in node.get("Plans", []):
+        out += _pg_shape(child, depth + 1)
+    return out
+
+
+def _pg_seq_scans(node: dict) -> set[str]:
+    found = {node["Relation Name"]} if node["Node Type"] == "Seq Scan" else set()
+    for child in node.get("Plans", []):
+        found |= _pg_seq_scans(child)
+    return found
+
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+async def explain(conn, statement: str, params: Any) -> dict[str, Any]:
+    """{'shape': [...], 'seq_scans': {таблиці}, 'extra': сирі деталі для -v}."""
+    if conn.dialect.name == "postgresql":
+        raw = (
+            await conn.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, params)
+        ).scalar()
+        plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+        root = plan["Plan"]
+        return {
+            "shape": _pg_shape(root),
+            "seq_scans": _pg_seq_scans(root),
+            "extra": f"{plan.get('Execution Time', 0):.2f} ms, shared hit/read "
+                     f"{root.get('Shared Hit Blocks', 0)}/{root.get('Shared Read Blocks', 0)}",
+        }
+    rows = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, params)).all()
+    # (id, parent, notused, detail) → відступ за глибиною вузла
+    depth: dict[int, int] = {0: -1}
+    shape, seq = [], set()
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        shape.append("  " * depth[node_id] + detail)
+        m = _SQLITE_SCAN.match(detail)
+        if m:
+            seq.add(m.group(1))
+    return {"shape": shape, "seq_scans": seq, "extra": ""}
+
+
+async def _row_counts(conn) -> dict[str, int]:
+    return {
+        t.name: (await conn.execute(select(func.count()).select_from(t))).scalar_one()
+        for t in Base.metadata.sorted_tables
+    }
+
+
+async def collect(n: int) -> tuple[str, dict[str, list[tuple[str, Any]]], dict[str, int]]:
+    """Сценарій → перехоплені SELECT-и (без запиту автентифікації)."""
+    captured: dict[str, list[tuple[str, Any]]] = {}
+    async with app.router.lifespan_context(app):
+        ctx: Ctx = await seed(n)
+        # статистика для планувальника — інакше план на свіжих даних не показовий
+        async with engine.begin() as conn:
+            await conn.exec_driver_sql("ANALYZE")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://q") as c:
+            await login(c, ctx)
+            # текст SELECT-а get_current_user — той самий у кожному запиті, його відкидаємо
+            with capturing() as auth:
+                await c.get("/api/auth/me", headers=ctx.tokens["user"])
+            auth_sql = {s for s, _ in auth}
+            for sc in HOT:
+                with capturing() as seen:
+                    await call(c, ctx, sc)
+                captured[sc.name] = [(s, p) for s, p in seen if s not in auth_sql]
+        async with engine.connect() as conn:
+            counts = await _row_counts(conn)
+    return engine.dialect.name, captured, counts
+
+
+async def run(n: int) -> tuple[str, dict[str, dict[str, Any]], dict[str, int]]:
+    dialect, captured, counts = await collect(n)
+    plans: dict[str, dict[str, Any]] = {}
+    # EXPLAIN ANALYZE реально виконує запит — на пулі з найдовшим statement_timeout
+    async with engines["analytics"].connect() as conn:
+        for name, stmts in captured.items():
+            for i, (statement, params) in enumerate(stmts):
+                key = name if len(stmts) == 1 else f"{name} #{i + 1}"
+                plans[key] = {"sql": statement, **await explain(conn, statement, params)}
+        await conn.rollback()
+    await dispose_all()
+    return dialect, plans, counts
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="EXPLAIN-знімки гарячих запитів")
+    p.add_argument("-n", type=int, default=5000, help="рядків на таблицю при наповненні")
+    p.add_argument("--large", type=int, default=1000, help="seq scan по таблиці з >= стількох рядків — прапорець")
+    p.add_argument("--write", action="store_true", help="зберегти поточні форми планів як еталон")
+    p.add_argument("-v", "--verbose", action="store_true", help="SQL і план кожного запиту")
+    args = p.parse_args()
+
+    dialect, plans, counts = asyncio.run(run(args.n))
+    snapshot_file = SNAPSHOT_DIR / f"query_plans.{dialect}.json"
+    stored: dict[str, list[str]] = json.loads(snapshot_file.read_text()) if snapshot_file.exists() else {}
+    large = {t for t, c in counts.items() if c >= args.large}
+
+    problems: list[str] = []
+    for key, plan in plans.items():
+        flags = []
+        seq = sorted(plan["seq_scans"] & large)
+        if seq:
+            flags.append("seq scan: " + ", ".join(f"{t} ({counts[t]} rows)" for t in seq))
+        if key in stored and stored[key] != plan["shape"]:
+            flags.append("plan changed")
+        elif key not in stored and stored:
+            flags.append("new query")
+        print(f"{'!!' if flags else 'ok'}  {key}" + (f"   <-- {'; '.join(flags)}" if flags else ""))
+        if args.verbose or (flags and "plan changed" in flags):
+            if args.verbose:
+                print(f"      {plan['sql']}".replace("\n", " "))
+            for line in plan["shape"]:
+                print(f"      {line}")
+            if key in stored and stored[key] != plan["shape"]:
+                print("      -- було:")
+                for line in stored[key]:
+                    print(f"      {line}")
+            if plan["extra"]:
+                print(f"      ({plan['extra']})")
+        problems += [f"{key}: {f}" for f in flags if f != "new query"]
+
+    for key in sorted(set(stored) - set(plans)):
+        print(f"--  {key}   (у знімку, але запит більше не виконується)")
+
+    if args.write:
+        snapshot_file.write_text(
+            json.dumps({k: v["shape"] for k, v in plans.items()}, indent=2, ensure_ascii=False) + "\n"
+        )
+        print(f"\nзаписано {snapshot_file}")
+
+    if problems:
+        print(f"\n{len(problems)} проблем(и):")
+        for pr in problems:
+            print(f"  {pr}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
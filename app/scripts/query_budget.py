@@ -0,0 +1,376 @@
+"""
+Бюджет SQL-запитів на кожен роут — регресійний прогін проти N+1.
+
+Для кожного масштабу (за замовчуванням 10 і 1000 рядків на таблицю) БД
+наповнюється заново, усі сценарії з SCENARIOS проганяються через ASGI, а
+before_cursor_execute рахує стейтменти (як app.scripts.query_counts). Помилка:
+  - к-сть перевищує бюджет з query_budget.json;
+  - к-сть на більшому масштабі відрізняється від меншого — запити ростуть
+    разом з даними (O(rows)), навіть якщо бюджет ще не перевищено.
+
+Роути з app.routes без сценарію й без запису в бюджеті виводяться як
+«не покриті» (з --strict — теж помилка). Redis-роути (dead-letters, лейни)
+свідомо в SKIP.
+
+    python -m app.scripts.query_budget                    # 10 і 1000 рядків
+    python -m app.scripts.query_budget --sizes 10 5000 -v
+    python -m app.scripts.query_budget --write            # оновити query_budget.json
+    python -m pytest "tests /test_query_budget.py"        # те саме (10 і 1000) як тести
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+# env (in-memory SQLite, без relay/аудиту/авто-призначення) виставляє query_counts
+from app.scripts.query_counts import counting  # noqa: I001
+
+import httpx
+from sqlalchemy import insert
+
+from app.core.security import hash_password
+from app.db.models import (
+    Answer,
+    AuditLog,
+    Base,
+    OperatorFeedback,
+    PriorityEnum,
+    Question,
+    QuestionStatusEnum,
+    RoleEnum,
+    Ticket,
+    TicketStatusEnum,
+    User,
+)
+from app.db.session import AsyncSessionLocal, engine
+from app.main import app
+
+BUDGET_FILE = Path(__file__).with_name("query_budget.json")
+
+# без БД або з Redis — у harness не ганяємо
+SKIP = {
+    "GET /api/health",
+    "GET /api/admin/dead-letters",
+    "GET /api/admin/dead-letters/stats",
+    "POST /api/admin/dead-letters/replay",
+    "GET /api/admin/notifications/lanes",
+}
+
+
+@dataclass
+class Scenario:
+    name: str  # "METHOD /шаблон роуту" [+ " ?варіант"]
+    method: str
+    url: Callable[["Ctx"], str]
+    who: str = "admin"
+    json: Callable[["Ctx"], Any] | None = None
+    headers: Callable[["Ctx"], dict] | None = None
+
+    @property
+    def route(self) -> str:
+        return self.name.split(" ?", 1)[0]
+
+
+@dataclass
+class Ctx:
+    """id-шники, які сценарії беруть з наповненої БД."""
+    n: int
+    ids: dict[str, int] = field(default_factory=dict)
+    tokens: dict[str, dict] = field(default_factory=dict)
+
+
+def _s(name: str, url: str | Callable[[Ctx], str], who: str = "admin", **kw) -> Scenario:
+    method = name.split(" ", 1)[0]
+    return Scenario(name, method, url if callable(url) else (lambda c, u=url: u), who, **kw)
+
+
+SCENARIOS: list[Scenario] = [
+    # --- читання ---
+    _s("GET /api/auth/me", "/api/auth/me", "user"),
+    _s("GET /api/auth/check_email", "/api/auth/check_email?email=nobody@q.io", "user"),
+    _s("GET /api/auth/password-recovery-requests", "/api/auth/password-recovery-requests"),
+    _s("GET /api/users/me", "/api/users/me", "user"),
+    _s("GET /api/users", "/api/users?limit=200", "operator"),
+    _s("GET /api/users/{user_id}", lambda c: f"/api/users/{c.ids['user']}", "operator"),
+    _s("GET /api/tickets", "/api/tickets?limit=200", "operator"),
+    _s("GET /api/tickets ?user", "/api/tickets?limit=200", "user"),
+    _s("GET /api/tickets ?status", "/api/tickets?status=in_progress&limit=200", "operator"),
+    _s("GET /api/tickets ?priority", "/api/tickets?priority=high&limit=200", "operator"),
+    _s("GET /api/tickets ?assignee", lambda c: f"/api/tickets?assignee_id={c.ids['operator']}&limit=200", "operator"),
+    _s("GET /api/tickets ?archived", "/api/tickets?include_archived=true&limit=200", "operator"),
+    _s("GET /api/tickets ?summary", "/api/tickets?view=summary&limit=200", "operator"),
+    _s("GET /api/tickets ?expand", "/api/tickets?expand=author,assignee&limit=200", "operator"),
+    _s("GET /api/tickets/{ticket_id}", lambda c: f"/api/tickets/{c.ids['ticket']}", "operator"),
+    _s("GET /api/tickets/{ticket_id} ?expand", lambda c: f"/api/tickets/{c.ids['ticket']}?expand=author,assignee",
+       "operator"),
+    _s("GET /api/tickets/{ticket_id}/timeline", lambda c: f"/api/tickets/{c.ids['ticket']}/timeline", "operator"),
+    _s("GET /api/questions", "/api/questions?limit=200", "operator"),
+    _s("GET /api/questions/{qid}/answers", lambda c: f"/api/questions/{c.ids['question']}/answers", "operator"),
+    _s("GET /api/admin/users", "/api/admin/users"),
+    _s("GET /api/admin/reports/latest", "/api/admin/reports/latest"),
+    _s("GET /api/admin/stats", "/api/admin/stats"),
+    _s("GET /api/admin/operator-signups", "/api/admin/operator-signups"),
+    _s("GET /api/admin/operator-productivity", "/api/admin/operator-productivity"),
+    _s("GET /api/admin/operator-feedback", "/api/admin/operator-feedback"),
+    _s("GET /api/operator/feedback", "/api/operator/feedback", "operator"),
+    _s("GET /api/operator/dashboard", "/api/operator/dashboard", "operator"),
+    _s("GET /api/tickets/{ticket_id}/comments", lambda c: f"/api/tickets/{c.ids['ticket']}/comments", "user"),
+    _s("GET /api/admin/admission", "/api/admin/admission"),
+    _s("GET /api/admin/cache/stats", "/api/admin/cache/stats"),
+    # --- запис ---
+    _s("POST /api/auth/login", "/api/auth/login", "user", json=lambda c: {"username": "user@q.io", "password": "pw"}),
+    _s("POST /api/tickets", "/api/tickets", "user", json=lambda c: {"title": "t", "description": "d"}),
+    _s("POST /api/tickets/next", "/api/tickets/next", "operator"),
+    _s("POST /api/tickets/{ticket_id}/comments", lambda c: f"/api/tickets/{c.ids['ticket']}/comments", "operator",
+       json=lambda c: {"body": "b", "is_internal": True}),
+    _s(
+        "PATCH /api/tickets/{ticket_id} ?fields", lambda c: f"/api/tickets/{c.ids['own_new']}", "user",
+        json=lambda c: {"title": "t2"}, headers=lambda c: {"If-Match": '"1"'},
+    ),
+    _s("PATCH /api/tickets/{ticket_id}", lambda c: f"/api/tickets/{c.ids['ticket']}", "operator",
+       json=lambda c: {"status": "blocked"}),
+    _s("POST /api/tickets/{ticket_id}/operator-approve", lambda c: f"/api/tickets/{c.ids['ticket']}/operator-approve",
+       "operator"),
+    _s("POST /api/tickets/{ticket_id}/admin-approve", lambda c: f"/api/tickets/{c.ids['ticket']}/admin-approve"),
+    _s("DELETE /api/tickets/{ticket_id}", lambda c: f"/api/tickets/{c.ids['own_new']}", "operator"),
+    _s("POST /api/questions", "/api/questions", "user", json=lambda c: {"title": "qq", "content": "cc"}),
+    _s("POST /api/questions/{qid}/answer", lambda c: f"/api/questions/{c.ids['question']}/answer", "operator",
+       json=lambda c: {"content": "aa"}),
+    _s("PATCH /api/questions/{qid}/close", lambda c: f"/api/questions/{c.ids['question']}/close", "user"),
+    _s("POST /api/auth/register", "/api/auth/register", "anon", json=lambda c: {"email": "new@q.io", "password": "pw"}),
+    _s("POST /api/auth/register-operator", "/api/auth/register-operator", "anon",
+       json=lambda c: {"email": "new-op2@q.io", "phone": "1", "full_name": "Op"}),
+    _s("POST /api/auth/password-recovery-request", "/api/auth/password-recovery-request", "anon",
+       json=lambda c: {"email": "user@q.io"}),
+    _s("POST /api/auth/password/recovery", "/api/auth/password/recovery", "anon", json=lambda c: {"email": "user@q.io"}),
+    _s("POST /api/auth/password-recovery-requests/{ticket_id}/send-link",
+       lambda c: f"/api/auth/password-recovery-requests/{c.ids['recovery']}/send-link"),
+    _s("POST /api/auth/reset-password", "/api/auth/reset-password", "anon",
+       json=lambda c: {"email": "victim@q.io", "password": "pw2"}),
+    _s("PATCH /api/users/me", "/api/users/me", "user", json=lambda c: {"name": "N"}),
+    _s("PATCH /api/users/{user_id}", lambda c: f"/api/users/{c.ids['victim']}", json=lambda c: {"name": "V"}),
+    _s("POST /api/admin/operator-feedback", "/api/admin/operator-feedback",
+       json=lambda c: {"operator_id": c.ids["operator"], "message": "m"}),
+    _s("POST /api/admin/operator-signups/{ticket_id}/approve",
+       lambda c: f"/api/admin/operator-signups/{c.ids['signup']}/approve"),
+    _s("PATCH /api/admin/users/{user_id}/role", lambda c: f"/api/admin/users/{c.ids['victim']}/role",
+       json=lambda c: {"role": "operator"}),
+    _s("DELETE /api/admin/users/{user_id}", lambda c: f"/api/admin/users/{c.ids['victim']}"),
+]
+
+
+def _chunks(rows: list[dict], size: int = 500):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+async def seed(n: int) -> Ctx:
+    """n рядків на кожну «ростучу» таблицю; схема щоразу з нуля."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    ctx = Ctx(n=n)
+    pw = hash_password("pw")
+    now = datetime.now(timezone.utc)
+    statuses = [TicketStatusEnum.new, TicketStatusEnum.in_progress, TicketStatusEnum.done, TicketStatusEnum.blocked]
+    priorities = list(PriorityEnum)
+
+    async with AsyncSessionLocal() as db:
+        staff = {}
+        for key, role in (("admin", RoleEnum.admin), ("operator", RoleEnum.operator),
+                          ("user", RoleEnum.user), ("victim", RoleEnum.user)):
+            u = User(email=f"{key}@q.io", password_hash=pw, role=role, is_active=True)
+            db.add(u)
+            staff[key] = u
+        await db.flush()
+        ctx.ids.update({k: u.id for k, u in staff.items()})
+        op, me, admin = ctx.ids["operator"], ctx.ids["user"], ctx.ids["admin"]
+
+        extra = [{"email": f"u{i}@q.io", "password_hash": pw, "role": RoleEnum.user, "is_active": True}
+                 for i in range(n)]
+        for chunk in _chunks(extra):
+            await db.execute(insert(User.__table__), chunk)
+
+        def row(**kw) -> dict:
+            # multi-row INSERT: у всіх рядків однаковий набір ключів
+            return {"description": "d", "priority": PriorityEnum.normal, "author_id": me, "assignee_id": None,
+                    "topic": None, "work_email": None, "position": None, "phone": None,
+                    "created_at": now, "resolved_at": None, **kw}
+
+        tickets = []
+        for i in range(n):
+            st = statuses[i % len(statuses)]
+            created = now - timedelta(hours=i)
+            tickets.append(row(
+                title=f"t{i}", priority=priorities[i % len(priorities)], status=st, created_at=created,
+                assignee_id=op if st != TicketStatusEnum.new else None,
+                resolved_at=created + timedelta(minutes=30) if st == TicketStatusEnum.done else None,
+            ))
+            tickets.append(row(title=f"Password recovery: r{i}@q.io", status=TicketStatusEnum.new,
+                               topic="password_recovery", work_email=f"r{i}@q.io"))
+            tickets.append(row(title="Operator signup", status=TicketStatusEnum.pending_admin,
+                               topic="operator_signup", work_email=f"s{i}@q.io", position=f"S{i}", phone="1"))
+        for chunk in _chunks(tickets):
+            await db.execute(insert(Ticket.__table__), chunk)
+
+        main = Ticket(title="main", description="d", priority=PriorityEnum.high, status=TicketStatusEnum.triage,
+                      author_id=me)
+        own = Ticket(title="own", description="d", priority=PriorityEnum.low, status=TicketStatusEnum.new,
+                     author_id=me)
+        signup = Ticket(title="signup", description="d", priority=PriorityEnum.normal, author_id=me,
+                        status=TicketStatusEnum.pending_admin, topic="operator_signup", work_email="new-op@q.io")
+        recovery = Ticket(title="Password recovery: user@q.io", description="d", priority=PriorityEnum.normal,
+                          author_id=admin, status=TicketStatusEnum.pending_admin, topic="password_recovery",
+                          work_email="user@q.io")
+        db.add_all([main, own, signup, recovery])
+        await db.flush()
+        ctx.ids.update(ticket=main.id, own_new=own.id, signup=signup.id, recovery=recovery.id)
+
+        for chunk in _chunks([{"action": "ticket.status_changed", "actor_id": op, "ticket_id": main.id,
+                               "payload": {"i": i}, "created_at": now} for i in range(n)]):
+            await db.execute(insert(AuditLog.__table__), chunk)
+
+        questions = [{"author_id": me, "title": f"q{i}", "content": "c", "status": QuestionStatusEnum.new}
+                     for i in range(n)]
+        for chunk in _chunks(questions):
+            await db.execute(insert(Question.__table__), chunk)
+        q = Question(author_id=me, title="main", content="c")
+        db.add(q)
+        await db.flush()
+        ctx.ids["question"] = q.id
+        for chunk in _chunks([{"question_id": q.id, "operator_id": op, "content": f"a{i}"} for i in range(n)]):
+            await db.execute(insert(Answer.__table__), chunk)
+
+        for chunk in _chunks([{"operator_id": op, "author_id": admin, "message": f"m{i}", "is_read": False}
+                              for i in range(n)]):
+            await db.execute(insert(OperatorFeedback.__table__), chunk)
+        await db.commit()
+    return ctx
+
+
+async def login(c: httpx.AsyncClient, ctx: Ctx) -> None:
+    ctx.tokens["anon"] = {}
+    for who in ("admin", "operator", "user"):
+        r = await c.post("/api/auth/login", json={"username": f"{who}@q.io", "password": "pw"})
+        ctx.tokens[who] = {"Authorization": "Bearer " + r.json()["access_token"]}
+
+
+async def call(c: httpx.AsyncClient, ctx: Ctx, sc: Scenario) -> httpx.Response:
+    headers = {**ctx.tokens[sc.who], **(sc.headers(ctx) if sc.headers else {})}
+    kw = {"json": sc.json(ctx)} if sc.json else {}
+    r = await c.request(sc.method, sc.url(ctx), headers=headers, **kw)
+    if r.status_code >= 400:
+        raise SystemExit(f"[n={ctx.n}] {sc.name}: HTTP {r.status_code} {r.text[:200]}")
+    return r
+
+
+async def _run_scale(n: int, verbose: bool) -> dict[str, int]:
+    ctx = await seed(n)
+    results: dict[str, int] = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://q") as c:
+        await login(c, ctx)
+        for sc in SCENARIOS:
+            with counting() as cnt:
+                await call(c, ctx, sc)
+            results[sc.name] = cnt.n
+            if verbose:
+                print(f"-- [n={n}] {sc.name}")
+                for s in cnt.statements:
+                    print(f"     {s}")
+    return results
+
+
+def _app_routes() -> set[str]:
+    # з OpenAPI-схеми: у ній уже розгорнуті всі include_router з префіксами
+    return {
+        f"{m.upper()} {path}"
+        for path, ops in app.openapi()["paths"].items()
+        if path.startswith("/api")
+        for m in ops
+    }
+
+
+async def measure(sizes: list[int], verbose: bool = False) -> dict[int, dict[str, int]]:
+    by_size: dict[int, dict[str, int]] = {}
+    async with app.router.lifespan_context(app):
+        for n in sizes:
+            by_size[n] = await _run_scale(n, verbose)
+    return by_size
+
+
+def load_budget() -> dict[str, int]:
+    return json.loads(BUDGET_FILE.read_text()) if BUDGET_FILE.exists() else {}
+
+
+def problems(counts: list[int], limit: int | None) -> list[str]:
+    """Що не так зі сценарієм: к-сті по масштабах (за зростанням) проти бюджету."""
+    notes = []
+    if len(set(counts)) > 1:
+        notes.append("grows with rows")
+    if limit is not None and max(counts) > limit:
+        notes.append(f"over budget {limit}")
+    return notes
+
+
+def uncovered_routes() -> list[str]:
+    return sorted(_app_routes() - {sc.route for sc in SCENARIOS} - SKIP)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Бюджет SQL-стейтментів на роут (проти N+1)")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10, 1000], help="рядків на таблицю")
+    p.add_argument("--write", action="store_true", help="записати поточні к-сті в query_budget.json")
+    p.add_argument("--strict", action="store_true", help="непокриті роути — теж помилка")
+    p.add_argument("-v", "--verbose", action="store_true", help="показати самі стейтменти")
+    args = p.parse_args()
+
+    sizes = sorted(set(args.sizes))
+    by_size = asyncio.run(measure(sizes, args.verbose))
+    budget = load_budget()
+
+    failures: list[str] = []
+    print("  ".join(f"n={n:<5d}" for n in sizes) + "  budget  scenario")
+    for sc in SCENARIOS:
+        counts = [by_size[n][sc.name] for n in sizes]
+        limit = budget.get(sc.name)
+        notes = problems(counts, limit)
+        if limit is None and not args.write:
+            notes.append("no budget")
+        if notes:
+            failures.append(f"{sc.name}: {', '.join(notes)}")
+        print("  ".join(f"{c:<7d}" for c in counts) + f"  {'-' if limit is None else limit:<6}  {sc.name}"
+              + (f"   <-- {', '.join(notes)}" if notes else ""))
+
+    uncovered = uncovered_routes()
+    if uncovered:
+        print("\nне покриті сценаріями:")
+        for r in uncovered:
+            print(f"  {r}")
+        if args.strict:
+            failures += [f"{r}: no scenario" for r in uncovered]
+
+    if args.write:
+        BUDGET_FILE.write_text(
+            json.dumps({sc.name: max(by_size[n][sc.name] for n in sizes) for sc in SCENARIOS}, indent=2,
+                       ensure_ascii=False) + "\n"
+        )
+        print(f"\nзаписано {BUDGET_FILE}")
+        failures = [f for f in failures if "grows with rows" in f]
+
+    if failures:
+        print("\nFAIL:")
+        for f in failures:
+            print(f"  {f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
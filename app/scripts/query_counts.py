@@ -0,0 +1,158 @@
+"""
+К-сть SQL-запитів на кожен мутаційний ендпоінт (in-memory SQLite, без Postgres/Redis).
+
+Кожен запит ганяється через ASGI-транспорт, а listener before_cursor_execute
+рахує виконані SQL-стейтменти (BEGIN/COMMIT сюди не потрапляють). Один
+запит на автентифікацію (SELECT users за email з JWT) входить у кожне число.
+
+    python -m app.scripts.query_counts            # таблиця
+    python -m app.scripts.query_counts --check    # exit 1, якщо перевищено MAX_STATEMENTS
+    python -m pytest "tests /test_query_counts.py"  # те саме як тест на кожен ендпоінт
+
+Повний прогін усіх роутів на різних обсягах даних — app.scripts.query_budget.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from typing import Iterator
+
+# HARNESS_DATABASE_URL — окрема scratch-БД (схему harness перестворює!), напр. Postgres
+os.environ["DATABASE_URL"] = os.environ.get("HARNESS_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+os.environ.setdefault("AUDIT_ENABLED", "false")
+os.environ.setdefault("AUTO_ASSIGN_ENABLED", "false")
+os.environ.setdefault("CACHE_ENABLED", "false")  # рахуємо запити до БД, а не хіти кешу
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.core.security import hash_password  # noqa: E402
+from app.db.models import Base, RoleEnum, User  # noqa: E402
+from app.db.session import AsyncSessionLocal, engine, engines  # noqa: E402
+from app.main import app  # noqa: E402
+
+# auth SELECT + один стейтмент на запис (+ INSERT в outbox там, де є подія)
+MAX_STATEMENTS: dict[str, int] = {
+    "POST /api/tickets": 3,
+    "PATCH /api/tickets/{id} (fields, If-Match)": 2,
+    "PATCH /api/tickets/{id} (status)": 4,
+    "POST /api/tickets/{id}/operator-approve": 4,
+    "POST /api/tickets/{id}/admin-approve": 4,
+    "POST /api/questions": 2,
+    "POST /api/questions/{id}/answer": 3,
+    "PATCH /api/questions/{id}/close": 2,
+    "PATCH /api/users/me": 2,
+    "PATCH /api/users/{id}": 2,
+    # Postgres: UPDATE ... FROM ... RETURNING (2); SQLite — +SELECT старої ролі
+    "PATCH /api/admin/users/{id}/role": 3,
+    "DELETE /api/admin/users/{id}": 2,
+}
+
+
+class _Counter:
+    def __init__(self) -> None:
+        self.n = 0
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.n += 1
+        self.statements.append(statement.split("\n", 1)[0][:100])
+
+
+def _distinct_engines():
+    # на SQLite усі класи навантаження ділять один engine
+    return list({id(e): e for e in engines.values()}.values())
+
+
+@contextmanager
+def counting() -> Iterator[_Counter]:
+    c = _Counter()
+    for e in _distinct_engines():
+        event.listen(e.sync_engine, "before_cursor_execute", c)
+    try:
+        yield c
+    finally:
+        for e in _distinct_engines():
+            event.remove(e.sync_engine, "before_cursor_execute", c)
+
+
+async def _seed() -> None:
+    # схема з нуля: measure можна викликати кілька разів в одному процесі (pytest)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        for email, role in (("admin@q.io", RoleEnum.admin), ("op@q.io", RoleEnum.operator), ("u@q.io", RoleEnum.user)):
+            db.add(User(email=email, password_hash=hash_password("pw"), role=role, is_active=True))
+        db.add(User(email="victim@q.io", password_hash=hash_password("pw"), role=RoleEnum.user, is_active=True))
+        await db.commit()
+
+
+async def measure(verbose: bool = False) -> dict[str, int]:
+    results: dict[str, int] = {}
+    async with app.router.lifespan_context(app):
+        await _seed()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://q") as c:
+            tok = {}
+            for email in ("admin@q.io", "op@q.io", "u@q.io"):
+                r = await c.post("/api/auth/login", json={"username": email, "password": "pw"})
+                tok[email] = {"Authorization": "Bearer " + r.json()["access_token"]}
+            A, O, U = tok["admin@q.io"], tok["op@q.io"], tok["u@q.io"]
+
+            async def run(name: str, method: str, url: str, headers: dict, **kw) -> httpx.Response:
+                with counting() as cnt:
+                    r = await c.request(method, url, headers=headers, **kw)
+                if r.status_code >= 400:
+                    raise SystemExit(f"{name}: HTTP {r.status_code} {r.text[:200]}")
+                results[name] = cnt.n
+                if verbose:
+                    print(f"-- {name}")
+                    for s in cnt.statements:
+                        print(f"     {s}")
+                return r
+
+            t = (await run("POST /api/tickets", "POST", "/api/tickets", U, json={"title": "t", "description": "d"})).json()
+            await run(
+                "PATCH /api/tickets/{id} (fields, If-Match)", "PATCH", f"/api/tickets/{t['id']}",
+                {**U, "If-Match": f'"{t["version"]}"'}, json={"title": "t2"},
+            )
+            await run("PATCH /api/tickets/{id} (status)", "PATCH", f"/api/tickets/{t['id']}", O, json={"status": "triage"})
+            await run("POST /api/tickets/{id}/operator-approve", "POST", f"/api/tickets/{t['id']}/operator-approve", O)
+            await run("POST /api/tickets/{id}/admin-approve", "POST", f"/api/tickets/{t['id']}/admin-approve", A)
+
+            q = (await run("POST /api/questions", "POST", "/api/questions", U, json={"title": "qq", "content": "cc"})).json()
+            await run("POST /api/questions/{id}/answer", "POST", f"/api/questions/{q['id']}/answer", O, json={"content": "aa"})
+            await run("PATCH /api/questions/{id}/close", "PATCH", f"/api/questions/{q['id']}/close", U)
+
+            await run("PATCH /api/users/me", "PATCH", "/api/users/me", U, json={"name": "N"})
+            await run("PATCH /api/users/{id}", "PATCH", "/api/users/4", A, json={"name": "V"})
+            await run("PATCH /api/admin/users/{id}/role", "PATCH", "/api/admin/users/4/role", A, json={"role": "operator"})
+            await run("DELETE /api/admin/users/{id}", "DELETE", "/api/admin/users/4", A)
+    return results
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="SQL-стейтментів на мутаційний ендпоінт")
+    p.add_argument("--check", action="store_true", help="exit 1, якщо перевищено MAX_STATEMENTS")
+    p.add_argument("-v", "--verbose", action="store_true", help="показати самі стейтменти")
+    args = p.parse_args()
+
+    results = asyncio.run(measure(args.verbose))
+    over = []
+    for name, n in results.items():
+        limit = MAX_STATEMENTS.get(name)
+        mark = "" if limit is None or n <= limit else f"  > {limit}!"
+        if mark:
+            over.append(name)
+        print(f"{n:3d}  {name}{mark}")
+    if args.check and over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# app/services/archive.py
+"""
+Hot/cold розділення заявок.
+
+  tickets / comments                  — «гаряча» частина: усе, що ще живе;
+  tickets_archive / comments_archive  — «холодна»: заявки зі статусом archived.
+
+Звичайні списки та звіти читають лише гарячу таблицю, тож її індекси й
+кеш сторінок не розмиваються історією. Явний include_archived=true
+підставляє замість Ticket UNION ALL обох таблиць (ticket_source).
+
+Перенос — move_archived: чанками SELECT ... FOR UPDATE SKIP LOCKED,
+INSERT ... SELECT в архів, DELETE з гарячої, COMMIT. Це ж і онлайн-міграція
+наявних archived-рядків: таблиці створює звичайна alembic-міграція, а дані
+доносить maintenance-задача (або app.scripts.archive_tickets) без довгих локів.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import delete, insert, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.cache import invalidate_sync
+from app.db.models import (
+    Comment,
+    CommentArchive,
+    CommentVisibilityEnum,
+    Ticket,
+    TicketArchive,
+    TicketStatusEnum,
+)
+from app.services.notifications import _get_redis
+
+_TICKET_COLS = [c.name for c in Ticket.__table__.columns]
+_COMMENT_COLS = [c.name for c in Comment.__table__.columns]
+
+
+def ticket_source(include_archived: bool = False):
+    """
+    Ticket або його alias над UNION ALL гарячої й холодної таблиць —
+    атрибути ті самі (Src.status, Src.created_at ...), тож запити не змінюються.
+    """
+    if not include_archived:
+        return Ticket
+    hot, cold = Ticket.__table__, TicketArchive.__table__
+    both = union_all(
+        select(*[hot.c[n] for n in _TICKET_COLS]),
+        select(*[cold.c[n] for n in _TICKET_COLS]),
+    ).subquery("tickets_all")
+    return aliased(Ticket, both)
+
+
+async def get_archived(db: AsyncSession, ticket_id: int) -> Ticket | None:
+    """Заявка з архіву як (від'єднаний) Ticket — для детального перегляду."""
+    row = (
+        await db.execute(select(TicketArchive.__table__).where(TicketArchive.__table__.c.id == ticket_id))
+    ).mappings().first()
+    return Ticket(**row) if row else None
+
+
+async def list_archived_comments(
+    db: AsyncSession, ticket_id: int, *, include_internal: bool = True
+) -> list[CommentArchive]:
+    """Коментарі архівної заявки (ті самі поля, що й Comment)."""
+    q = select(CommentArchive).where(CommentArchive.ticket_id == ticket_id)
+    if not include_internal:
+        q = q.where(CommentArchive.visibility == CommentVisibilityEnum.public)
+    return list((await db.execute(q.order_by(CommentArchive.id))).scalars().all())
+
+
+async def move_archived(db: AsyncSession, *, chunk: int) -> int:
+    """Переносить archived-заявки (з коментарями) у холодні таблиці. Повертає к-сть."""
+    hot_t, hot_c = Ticket.__table__, Comment.__table__
+    cold_t, cold_c = TicketArchive.__table__, CommentArchive.__table__
+    total = 0
+    while True:
+        ids = (
+            await db.execute(
+                select(Ticket.id)
+                .where(Ticket.status == TicketStatusEnum.archived)
+                .order_by(Ticket.id)
+                .limit(chunk)
+                .with_for_update(skip_locked=True)
+            )
+        ).scalars().all()
+        if not ids:
+            break
+        await db.execute(
+            insert(cold_t).from_select(_TICKET_COLS, select(*[hot_t.c[n] for n in _TICKET_COLS]).where(hot_t.c.id.in_(ids)))
+        )
+        await db.execute(
+            insert(cold_c).from_select(
+                _COMMENT_COLS, select(*[hot_c.c[n] for n in _COMMENT_COLS]).where(hot_c.c.ticket_id.in_(ids))
+            )
+        )
+        # коментарі явно: на SQLite FK ON DELETE CASCADE без PRAGMA не спрацює
+        await db.execute(delete(hot_c).where(hot_c.c.ticket_id.in_(ids)))
+        await db.execute(delete(hot_t).where(hot_t.c.id.in_(ids)))
+        await db.commit()
+        # заявки зникли з гарячої таблиці — кешовані деталі й звіти перечитуються
+        invalidate_sync(_get_redis(), *[f"ticket:{i}" for i in ids], "reports")
+        total += len(ids)
+        if len(ids) < chunk:
+            break
+    await db.commit()
+    return total
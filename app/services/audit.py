@@ -0,0 +1,224 @@
+# app/services/audit.py
+"""
+Аудит дій (зміни статусу, призначення, ролі, погодження).
+
+Роутери НЕ пишуть в audit_log у своїй транзакції: record() лише кладе запис
+у буфер процесу (після успішного commit). Фоновий writer (run_writer,
+стартує в lifespan) раз на audit_flush_interval_s або при заповненні батчу
+скидає буфер multi-row INSERT-ами по audit_batch_size рядків.
+
+Компроміс: записи, що не встигли скинутись до падіння процесу, втрачаються;
+при переповненні буфера (audit_buffer_max) нові записи відкидаються й
+рахуються в dropped — запит від цього не гальмує.
+
+Postgres: audit_log партиціонована по місяцях. ensure_partitions створює
+партиції наперед, drop_expired_partitions прибирає старші за
+audit_retention_months — ретеншн через DROP TABLE, а не DELETE-скани.
+Обидві запускає maintenance-планувальник воркера.
+
+audit_log_default ловить рядки, для яких партиції ще немає (maintenance
+відстав). Postgres не дасть створити партицію, поки такі рядки лежать у
+DEFAULT, тож ensure_partitions для цього місяця відчіпляє DEFAULT, переносить
+рядки в нову партицію й чіпляє DEFAULT назад — і сам знаходить місяці, що
+осіли в DEFAULT, щоб їх теж можна було прибрати DROP-ом.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, Mapping
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.db.models import AuditLog
+
+log = logging.getLogger(__name__)
+
+_buffer: list[dict[str, Any]] = []
+_wakeup: asyncio.Event | None = None
+dropped = 0
+
+_PARTITION_RE = re.compile(r"^audit_log_y(\d{4})m(\d{2})$")
+
+
+def record(
+    action: str,
+    *,
+    actor_id: int | None = None,
+    ticket_id: int | None = None,
+    payload: Mapping[str, Any] | None = None,
+) -> None:
+    """Неблокуючий запис у буфер. created_at — момент дії, а не момент flush."""
+    global dropped
+    if not settings.audit_enabled:
+        return
+    if len(_buffer) >= settings.audit_buffer_max:
+        dropped += 1
+        if dropped % 1000 == 1:
+            log.warning("audit_buffer_full", extra={"dropped": dropped})
+        return
+    _buffer.append({
+        "action": action,
+        "actor_id": actor_id,
+        "ticket_id": ticket_id,
+        "payload": dict(payload) if payload is not None else None,
+        "created_at": datetime.now(timezone.utc),
+    })
+    if _wakeup is not None and len(_buffer) >= settings.audit_batch_size:
+        _wakeup.set()
+
+
+async def flush(db: AsyncSession) -> int:
+    """Скидає весь поточний буфер пачками. Повертає к-сть записаних рядків."""
+    global _buffer
+    if not _buffer:
+        return 0
+    rows, _buffer = _buffer, []
+    written = 0
+    try:
+        for i in range(0, len(rows), settings.audit_batch_size):
+            chunk = rows[i:i + settings.audit_batch_size]
+            await db.execute(insert(AuditLog.__table__).values(chunk))
+            written += len(chunk)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        # незаписане повертаємо в голову буфера — спробуємо наступного разу
+        _buffer[:0] = rows[: settings.audit_buffer_max]
+        raise
+    return written
+
+
+async def run_writer(
+    session_factory: async_sessionmaker[AsyncSession],
+    interval: float | None = None,
+) -> None:
+    """Фоновий writer: flush раз на interval або коли набрався батч."""
+    global _wakeup
+    interval = settings.audit_flush_interval_s if interval is None else interval
+    _wakeup = asyncio.Event()
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            try:
+                async with session_factory() as db:
+                    await flush(db)
+            except Exception:
+                log.exception("audit_flush_failed", extra={"pending": len(_buffer)})
+    finally:
+        # на зупинці — останній flush того, що лишилось
+        _wakeup = None
+        try:
+            async with session_factory() as db:
+                await asyncio.shield(flush(db))
+        except Exception:
+            log.exception("audit_final_flush_failed", extra={"pending": len(_buffer)})
+
+
+# ---------- партиції (Postgres) ----------
+
+
+def _month(d: datetime, shift: int = 0) -> datetime:
+    m = d.year * 12 + (d.month - 1) + shift
+    return datetime(m // 12, m % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"audit_log_y{month.year:04d}m{month.month:02d}"
+
+
+_COLUMNS = "id, actor_id, action, ticket_id, payload, created_at"
+
+
+async def _create_partition(db: AsyncSession, start: datetime) -> None:
+    end = _month(start, 1)
+    name = partition_name(start)
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    spilled = (await db.execute(
+        text(
+            "SELECT to_regclass('audit_log_default') IS NOT NULL AND EXISTS ("
+            "SELECT 1 FROM audit_log_default WHERE created_at >= :s AND created_at < :e)"
+        ),
+        {"s": start, "e": end},
+    )).scalar()
+    if not spilled:
+        await db.execute(text(f"CREATE TABLE {name} PARTITION OF audit_log {bounds}"))
+        return
+    # рядки місяця вже в DEFAULT: відчепити, перенести, причепити назад
+    await db.execute(text("ALTER TABLE audit_log DETACH PARTITION audit_log_default"))
+    await db.execute(text(f"CREATE TABLE {name} PARTITION OF audit_log {bounds}"))
+    moved = await db.execute(
+        text(
+            f"WITH m AS (DELETE FROM audit_log_default WHERE created_at >= :s AND created_at < :e "
+            f"RETURNING {_COLUMNS}) INSERT INTO {name} ({_COLUMNS}) SELECT {_COLUMNS} FROM m"
+        ),
+        {"s": start, "e": end},
+    )
+    await db.execute(text("ALTER TABLE audit_log ATTACH PARTITION audit_log_default DEFAULT"))
+    log.warning("audit_partition_backfilled", extra={"partition": name, "rows": moved.rowcount})
+
+
+async def ensure_partitions(db: AsyncSession, *, months_ahead: int) -> int:
+    """
+    Створює партиції від поточного місяця на months_ahead наперед, а також
+    для місяців, рядки яких осіли в audit_log_default. Кожна партиція — у
+    своїй транзакції: збій на одному місяці не відкочує решту.
+    """
+    if db.bind.dialect.name != "postgresql":
+        return 0
+    now = datetime.now(timezone.utc)
+    months = {_month(now, i) for i in range(months_ahead + 1)}
+    if (await db.execute(text("SELECT to_regclass('audit_log_default')"))).scalar():
+        spilled = (await db.execute(text(
+            "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') FROM audit_log_default"
+        ))).scalars().all()
+        months |= {m.replace(tzinfo=timezone.utc) for m in spilled}
+    await db.commit()
+
+    created = 0
+    for start in sorted(months):
+        name = partition_name(start)
+        if (await db.execute(text("SELECT to_regclass(:n)"), {"n": name})).scalar():
+            await db.rollback()
+            continue
+        try:
+            await _create_partition(db, start)
+            await db.commit()
+            created += 1
+        except Exception:
+            await db.rollback()
+            log.exception("audit_partition_failed", extra={"partition": name})
+    return created
+
+
+async def drop_expired_partitions(db: AsyncSession, *, retention_months: int) -> int:
+    """DROP партицій, що цілком старші за retention_months від поточного місяця."""
+    if db.bind.dialect.name != "postgresql" or retention_months <= 0:
+        return 0
+    cutoff = _month(datetime.now(timezone.utc), -retention_months)
+    names = (
+        await db.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'audit_log'::regclass"
+        ))
+    ).scalars().all()
+    dropped_n = 0
+    for name in names:
+        m = _PARTITION_RE.match(name)
+        if not m:
+            continue  # audit_log_default тощо
+        if _month(datetime(int(m[1]), int(m[2]), 1, tzinfo=timezone.utc), 1) <= cutoff:
+            await db.execute(text(f"DROP TABLE {name}"))
+            dropped_n += 1
+    await db.commit()
+    return dropped_n
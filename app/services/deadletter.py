@@ -0,0 +1,182 @@
+# app/services/deadletter.py
+"""
+Dead-letter для подій нотифікацій.
+
+Подія, що не пройшла після всіх повторів (RQ Retry / STREAM_MAX_DELIVERIES),
+потрапляє сюди, а не «висить» у failed registry. Зберігаємо в Redis:
+
+  dlq:entry:{id}          — HASH: event_type, destination, error_class, error, payload, failed_at
+  dlq:all                 — ZSET id → failed_at (хронологія)
+  dlq:idx:type:{t}        — SET id-шників за типом події
+  dlq:idx:dest:{d}        — SET за адресатом (host вебхука / mail / log)
+  dlq:idx:err:{e}         — SET за класом помилки
+  dlq:failures            — HASH event_type → скільки разів взагалі падало (лічильник)
+
+Replay кладе події назад через звичайний enqueue() з обмеженням швидкості,
+щоб після падіння вебхука не завалити отримувача всім беклогом одразу.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from typing import Any, Callable, Iterable, Mapping
+from urllib.parse import urlparse
+
+import redis
+
+_ENTRY = "dlq:entry:"
+_ALL = "dlq:all"
+_IDX_TYPE = "dlq:idx:type:"
+_IDX_DEST = "dlq:idx:dest:"
+_IDX_ERR = "dlq:idx:err:"
+_FAILURES = "dlq:failures"
+
+
+def _s(v: Any) -> str:
+    return v.decode() if isinstance(v, bytes) else str(v)
+
+
+def destination_of(url: str | None, fallback: str = "mail") -> str:
+    """Нормалізований адресат для індексу: host вебхука або fallback."""
+    if url:
+        return urlparse(url).netloc or url
+    return fallback
+
+
+def record(
+    conn: redis.Redis,
+    event_type: str,
+    payload: Mapping[str, Any] | None,
+    *,
+    destination: str,
+    error_class: str,
+    error: str,
+) -> str:
+    entry_id = uuid.uuid4().hex
+    now = time.time()
+    pipe = conn.pipeline(transaction=True)
+    pipe.hset(
+        f"{_ENTRY}{entry_id}",
+        mapping={
+            "event_type": event_type,
+            "destination": destination,
+            "error_class": error_class,
+            "error": error[:2000],
+            "payload": json.dumps(dict(payload or {}), ensure_ascii=False, default=str),
+            "failed_at": now,
+        },
+    )
+    pipe.zadd(_ALL, {entry_id: now})
+    pipe.sadd(f"{_IDX_TYPE}{event_type}", entry_id)
+    pipe.sadd(f"{_IDX_DEST}{destination}", entry_id)
+    pipe.sadd(f"{_IDX_ERR}{error_class}", entry_id)
+    pipe.hincrby(_FAILURES, event_type, 1)
+    pipe.execute()
+    return entry_id
+
+
+def _decode(entry_id: str, raw: Mapping) -> dict[str, Any]:
+    d = {_s(k): _s(v) for k, v in raw.items()}
+    return {
+        "id": entry_id,
+        "event_type": d.get("event_type"),
+        "destination": d.get("destination"),
+        "error_class": d.get("error_class"),
+        "error": d.get("error"),
+        "payload": json.loads(d["payload"]) if d.get("payload") else {},
+        "failed_at": float(d.get("failed_at") or 0),
+    }
+
+
+def find_ids(
+    conn: redis.Redis,
+    *,
+    event_type: str | None = None,
+    destination: str | None = None,
+    error_class: str | None = None,
+    limit: int = 100,
+) -> list[str]:
+    """id записів за фільтрами (перетин індексів), від найстаріших."""
+    keys = []
+    if event_type:
+        keys.append(f"{_IDX_TYPE}{event_type}")
+    if destination:
+        keys.append(f"{_IDX_DEST}{destination}")
+    if error_class:
+        keys.append(f"{_IDX_ERR}{error_class}")
+    if not keys:
+        return [_s(i) for i in conn.zrange(_ALL, 0, limit - 1)]
+    ids = {_s(i) for i in conn.sinter(keys)}
+    if not ids:
+        return []
+    # порядок — за часом падіння
+    pipe = conn.pipeline(transaction=False)
+    for i in ids:
+        pipe.zscore(_ALL, i)
+    scored = sorted(zip(ids, pipe.execute()), key=lambda p: p[1] or 0)
+    return [i for i, _ in scored[:limit]]
+
+
+def get_many(conn: redis.Redis, ids: Iterable[str]) -> list[dict[str, Any]]:
+    ids = list(ids)
+    pipe = conn.pipeline(transaction=False)
+    for i in ids:
+        pipe.hgetall(f"{_ENTRY}{i}")
+    return [_decode(i, raw) for i, raw in zip(ids, pipe.execute()) if raw]
+
+
+def remove(conn: redis.Redis, entry: Mapping[str, Any]) -> None:
+    eid = entry["id"]
+    pipe = conn.pipeline(transaction=True)
+    pipe.delete(f"{_ENTRY}{eid}")
+    pipe.zrem(_ALL, eid)
+    pipe.srem(f"{_IDX_TYPE}{entry['event_type']}", eid)
+    pipe.srem(f"{_IDX_DEST}{entry['destination']}", eid)
+    pipe.srem(f"{_IDX_ERR}{entry['error_class']}", eid)
+    pipe.execute()
+
+
+def stats(conn: redis.Redis) -> dict[str, Any]:
+    """Скільки падало за весь час (по типах) і скільки зараз лежить у DLQ."""
+    failures = {_s(k): int(v) for k, v in conn.hgetall(_FAILURES).items()}
+    types = set(failures)
+    types.update(_s(k)[len(_IDX_TYPE):] for k in conn.scan_iter(match=f"{_IDX_TYPE}*"))
+    pipe = conn.pipeline(transaction=False)
+    ordered = sorted(types)
+    for t in ordered:
+        pipe.scard(f"{_IDX_TYPE}{t}")
+    pending = dict(zip(ordered, (int(n) for n in pipe.execute())))
+    return {
+        "failures_total": failures,
+        "pending": pending,
+        "pending_total": int(conn.zcard(_ALL)),
+    }
+
+
+def replay(
+    conn: redis.Redis,
+    ids: Iterable[str],
+    enqueue: Callable[[str, Mapping[str, Any]], Any],
+    *,
+    rate_per_sec: float = 10.0,
+) -> dict[str, int]:
+    """
+    Повертає події в чергу не швидше за rate_per_sec. Запис видаляється з DLQ
+    лише якщо enqueue повернув не-None (див. notifications.enqueue).
+    """
+    interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+    replayed = failed = 0
+    next_at = time.monotonic()
+    for entry in get_many(conn, ids):
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        next_at = max(next_at, time.monotonic()) + interval
+        if enqueue(entry["event_type"], entry["payload"]) is None:
+            failed += 1
+            continue
+        remove(conn, entry)
+        replayed += 1
+    return {"replayed": replayed, "failed": failed}
@@ -0,0 +1,349 @@
+# app/services/mail.py
+"""
+Поштовий бекенд для воркера нотифікацій.
+
+MAIL_BACKEND (settings.mail_backend):
+  - log    — лише лог (поведінка за замовчуванням, як старий send_mail_mock);
+  - smtp   — реальна відправка через пул SMTP-з'єднань: листи з усіх job-ів
+             буферизуються в Redis (mail:outbox) і йдуть пачкою, щойно
+             набралось mail_batch_size або минуло mail_flush_interval_s;
+  - digest — листи користувачу накопичуються в Redis і раз на
+             mail_digest_interval_s ідуть одним листом-зведенням
+             (відправка — теж через пул).
+
+SMTP-з'єднання дороге (TCP + EHLO + STARTTLS + AUTH), тож тримаємо невеликий
+пул живих конектів і перевикористовуємо їх; send_many шле пачку листів через
+одне з'єднання.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from typing import Callable, Iterable, Iterator
+
+import redis
+
+from app.core.config import settings
+
+log = logging.getLogger("worker.mail")
+
+_DIGEST_PREFIX = "mail:digest:"
+_DIGEST_DUE_KEY = "mail:digest:due"
+_OUTBOX_KEY = "mail:outbox"
+_OUTBOX_DUE_KEY = "mail:outbox:due"
+
+Mail = tuple[str, str, str]  # (to, subject, body)
+
+
+class SMTPPool:
+    """Потокобезпечний пул SMTP-з'єднань з ледачим підключенням і reconnect."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        username: str | None = None,
+        password: str | None = None,
+        starttls: bool = False,
+        size: int = 2,
+        timeout: float = 10.0,
+    ) -> None:
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.starttls = starttls
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[smtplib.SMTP] = queue.LifoQueue(maxsize=size)
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password or "")
+        return conn
+
+    @staticmethod
+    def _alive(conn: smtplib.SMTP) -> bool:
+        try:
+            return conn.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        self._slots.acquire()
+        conn: smtplib.SMTP | None = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+                if not self._alive(conn):
+                    self._close(conn)
+                    conn = self._connect()
+            except queue.Empty:
+                conn = self._connect()
+            yield conn
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # зламане з'єднання назад у пул не повертаємо
+            if conn is not None:
+                self._close(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put_nowait(conn)
+            self._slots.release()
+
+    @staticmethod
+    def _close(conn: smtplib.SMTP) -> None:
+        try:
+            conn.quit()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _message(to: str, subject: str, body: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = settings.smtp_from
+    msg["To"] = to
+    msg["Subject"] = subject
+    msg.set_content(body)
+    return msg
+
+
+_pool: SMTPPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SMTPPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool(
+                settings.smtp_host,
+                settings.smtp_port,
+                username=settings.smtp_user,
+                password=settings.smtp_password,
+                starttls=settings.smtp_starttls,
+                size=settings.smtp_pool_size,
+            )
+        return _pool
+
+
+def send_many(mails: Iterable[Mail], pool: SMTPPool | None = None) -> int:
+    """
+    Шле листи пачками по mail_batch_size через одне з'єднання на пачку.
+    Повертає к-сть відправлених.
+    """
+    pool = pool or get_pool()
+    batch: list[Mail] = []
+    sent = 0
+
+    def _flush() -> None:
+        nonlocal sent
+        if not batch:
+            return
+        with pool.connection() as conn:
+            for to, subject, body in batch:
+                conn.send_message(_message(to, subject, body))
+                sent += 1
+        batch.clear()
+
+    for m in mails:
+        batch.append(m)
+        if len(batch) >= settings.mail_batch_size:
+            _flush()
+    _flush()
+    return sent
+
+
+# ---------- smtp: буфер листів ----------
+
+
+def queue_mail(conn: redis.Redis, to: str, subject: str, body: str) -> tuple[int, bool]:
+    """
+    Кладе лист у спільний буфер. Повертає (довжина буфера, чи відкрито нове
+    вікно): довжина >= mail_batch_size — викликач шле пачку одразу
+    (send_queued), нове вікно — планує flush_outbox через mail_flush_interval_s.
+    """
+    item = json.dumps({"to": to, "subject": subject, "body": body}, ensure_ascii=False)
+    pipe = conn.pipeline(transaction=True)
+    pipe.rpush(_OUTBOX_KEY, item)
+    pipe.zadd(_OUTBOX_DUE_KEY, {"outbox": time.time() + settings.mail_flush_interval_s}, nx=True)
+    size, opened = pipe.execute()
+    return int(size), bool(opened)
+
+
+def _take(conn: redis.Redis, n: int) -> list:
+    pipe = conn.pipeline(transaction=True)
+    pipe.lrange(_OUTBOX_KEY, 0, n - 1)
+    pipe.ltrim(_OUTBOX_KEY, n, -1)
+    raw_items, _ = pipe.execute()
+    return raw_items
+
+
+def send_queued(
+    conn: redis.Redis,
+    *,
+    batches: int | None = None,
+    pool: SMTPPool | None = None,
+    schedule: Callable[[float], None] | None = None,
+) -> int:
+    """
+    Шле буфер пачками по mail_batch_size, одне з'єднання пулу на пачку
+    (batches=None — поки буфер не спорожніє). Повертає к-сть відправлених.
+
+    Не кидає на помилці SMTP: невідправлений залишок пачки повертається на
+    початок буфера, вікно перевідкривається (schedule(delay_s) — для RQ).
+    Адресу, яку сервер відхилив (SMTPRecipientsRefused), не повторюємо.
+    """
+    pool = pool or get_pool()
+    sent = taken = 0
+    while batches is None or taken < batches:
+        raw_items = _take(conn, settings.mail_batch_size)
+        if not raw_items:
+            break
+        taken += 1
+        done = 0
+        try:
+            with pool.connection() as smtp:
+                for raw in raw_items:
+                    m = json.loads(raw)
+                    try:
+                        smtp.send_message(_message(m["to"], m["subject"], m["body"]))
+                        sent += 1
+                    except smtplib.SMTPRecipientsRefused:
+                        log.error("mail_recipient_refused", extra={"to": m["to"]})
+                    done += 1
+        except (smtplib.SMTPException, OSError):
+            rest = raw_items[done:]
+            log.exception("mail_send_failed", extra={"sent": sent, "requeued": len(rest)})
+            pipe = conn.pipeline(transaction=True)
+            pipe.lpush(_OUTBOX_KEY, *reversed(rest))
+            pipe.zadd(_OUTBOX_DUE_KEY, {"outbox": time.time() + settings.mail_flush_interval_s})
+            pipe.execute()
+            if schedule is not None:
+                schedule(settings.mail_flush_interval_s)
+            break
+    return sent
+
+
+def flush_outbox(
+    conn: redis.Redis,
+    *,
+    now: float | None = None,
+    pool: SMTPPool | None = None,
+    schedule: Callable[[float], None] | None = None,
+) -> int:
+    """Скидання буфера за часом: якщо вікно сплило — весь буфер пачками."""
+    now = time.time() if now is None else now
+    if not conn.zrangebyscore(_OUTBOX_DUE_KEY, "-inf", now):
+        return 0
+    # ZREM == 1 → скидання наше; листи, що прийдуть після, відкриють нове вікно
+    if not conn.zrem(_OUTBOX_DUE_KEY, "outbox"):
+        return 0
+    return send_queued(conn, pool=pool, schedule=schedule)
+
+
+# ---------- digest ----------
+
+
+def queue_digest(conn: redis.Redis, to: str, subject: str, body: str) -> bool:
+    """
+    Кладе лист у дайджест користувача. True — відкрито нове вікно дайджесту
+    (викликач має запланувати flush_digests через mail_digest_interval_s).
+    """
+    key = f"{_DIGEST_PREFIX}{to}"
+    item = json.dumps({"subject": subject, "body": body, "at": time.time()}, ensure_ascii=False)
+    pipe = conn.pipeline(transaction=True)
+    pipe.rpush(key, item)
+    pipe.zadd(_DIGEST_DUE_KEY, {to: time.time() + settings.mail_digest_interval_s}, nx=True)
+    _, opened = pipe.execute()
+    return bool(opened)
+
+
+def _digest_body(items: list[dict]) -> str:
+    parts = []
+    for i in items:
+        at = time.strftime("%Y-%m-%d %H:%M", time.localtime(i["at"]))
+        parts.append(f"[{at}] {i['subject']}\n{i['body']}")
+    return "\n\n".join(parts)
+
+
+def _requeue_digest(conn: redis.Redis, to: str, raw_items: list, due_at: float) -> None:
+    """Повертає забрані листи на початок дайджесту і знову ставить його в розклад."""
+    pipe = conn.pipeline(transaction=True)
+    pipe.lpush(f"{_DIGEST_PREFIX}{to}", *reversed(raw_items))
+    pipe.zadd(_DIGEST_DUE_KEY, {to: due_at})
+    pipe.execute()
+
+
+def flush_digests(
+    conn: redis.Redis,
+    *,
+    now: float | None = None,
+    pool: SMTPPool | None = None,
+    schedule: Callable[[float], None] | None = None,
+) -> int:
+    """
+    Збирає всі дайджести, чий інтервал сплив, і шле їх пачками через пул.
+    Повертає к-сть відправлених.
+
+    Помилка SMTP не губить листи: цей і всі ще не відправлені дайджести
+    повертаються в Redis на наступний інтервал (schedule(delay_s) — для RQ).
+    Адресу, яку сервер відхилив (SMTPRecipientsRefused), не повторюємо.
+    """
+    pool = pool or get_pool()
+    now = time.time() if now is None else now
+    taken: list[tuple[str, list, Mail]] = []
+    for raw in conn.zrangebyscore(_DIGEST_DUE_KEY, "-inf", now):
+        # ZREM == 1 → цей дайджест наш
+        if not conn.zrem(_DIGEST_DUE_KEY, raw):
+            continue
+        to = raw.decode() if isinstance(raw, bytes) else str(raw)
+        pipe = conn.pipeline(transaction=True)
+        pipe.lrange(f"{_DIGEST_PREFIX}{to}", 0, -1)
+        pipe.delete(f"{_DIGEST_PREFIX}{to}")
+        raw_items, _ = pipe.execute()
+        items = [json.loads(r) for r in raw_items]
+        if not items:
+            continue
+        subject = items[0]["subject"] if len(items) == 1 else f"DeskLite: {len(items)} оновлень"
+        taken.append((to, raw_items, (to, subject, _digest_body(items))))
+
+    sent = done = 0
+    try:
+        for start in range(0, len(taken), settings.mail_batch_size):
+            with pool.connection() as smtp:
+                for to, _, m in taken[start:start + settings.mail_batch_size]:
+                    try:
+                        smtp.send_message(_message(*m))
+                        sent += 1
+                    except smtplib.SMTPRecipientsRefused:
+                        log.error("digest_recipient_refused", extra={"to": to})
+                    done += 1
+    except (smtplib.SMTPException, OSError):
+        rest = taken[done:]
+        log.exception("digest_send_failed", extra={"sent": sent, "requeued": len(rest)})
+        for to, raw_items, _ in rest:
+            _requeue_digest(conn, to, raw_items, now + settings.mail_digest_interval_s)
+        if rest and schedule is not None:
+            schedule(settings.mail_digest_interval_s)
+    return sent
@@ -1,7 +1,10 @@
 # app/services/notifications.py
 import os
+import json
 import logging
-from typing import Any, Mapping
+import time
+from datetime import timezone
+from typing import Any, Mapping, Sequence
 
 import redis
 from rq import Queue
@@ -13,19 +16,84 @@ except Exception:
     # старі RQ не мають rq.retry
     Retry = None  # type: ignore
 
+try:
+    from rq.job import Callback  # type: ignore
+except Exception:
+    Callback = None  # type: ignore
+
 log = logging.getLogger(__name__)
 
 DEFAULT_QUEUE = os.getenv("NOTIFICATIONS_QUEUE", "notifications")
 DEFAULT_REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
-_queue: Queue | None = None
+# rq (за замовчуванням) | streams — Redis Streams + consumer groups (app/workers/stream_worker.py)
+BACKEND = os.getenv("NOTIFICATIONS_BACKEND", "rq").strip().lower()
+STREAM_KEY = os.getenv("NOTIFICATIONS_STREAM", "notifications:stream")
+# приблизна межа довжини стріму (XADD MAXLEN ~), щоб не рости безкінечно
+STREAM_MAXLEN = int(os.getenv("NOTIFICATIONS_STREAM_MAXLEN", "100000"))
+
+HANDLER_PATH = "app.workers.rq_worker.handle_event"
+FAILURE_CALLBACK_PATH = "app.workers.rq_worker.on_job_failure"
+LATENCY_KEY_PREFIX = "notifications:latency:"
+
+# ==== Пріоритетні лейни (RQ) ====
+# high — фінальні погодження (вебхуки), default — створення заявок,
+# low — масові status_changed. Пріоритет заявки зсуває лейн на крок.
+LANES = ("high", "default", "low")
+_EVENT_LANE = {
+    "ticket.admin_approved": "high",
+    "ticket.operator_approved": "high",
+    "sla.breach_imminent": "high",
+    "ticket.coalesced": "default",
+    "ticket_created": "default",
+    "status_changed": "low",
+}
+_PRIORITY_SHIFT = {"high": -1, "low": 1}
+
+_queues: dict[str, Queue] = {}
+_redis: redis.Redis | None = None
+
+
+def _get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = redis.from_url(DEFAULT_REDIS_URL)
+    return _redis
+
+
+def lane_queue_name(lane: str) -> str:
+    # default-лейн лишається під старою назвою — уже запущені воркери її слухають
+    return DEFAULT_QUEUE if lane == "default" else f"{DEFAULT_QUEUE}:{lane}"
 
 
-def _get_queue() -> Queue:
-    global _queue
-    if _queue is None:
-        _queue = Queue(DEFAULT_QUEUE, connection=redis.from_url(DEFAULT_REDIS_URL))
-    return _queue
+def lane_for(event_type: str, payload: Mapping[str, Any]) -> str:
+    """Лейн за типом події, зсунутий PriorityEnum заявки (high ↑, low ↓)."""
+    base = LANES.index(_EVENT_LANE.get(event_type, "default"))
+    priority = payload.get("priority") or (payload.get("ticket") or {}).get("priority")
+    idx = base + _PRIORITY_SHIFT.get(str(priority), 0)
+    return LANES[min(max(idx, 0), len(LANES) - 1)]
+
+
+def _get_queue(lane: str = "default") -> Queue:
+    q = _queues.get(lane)
+    if q is None:
+        q = _queues[lane] = Queue(lane_queue_name(lane), connection=_get_redis())
+    return q
+
+
+def _stream_fields(event_type: str, payload: Mapping[str, Any]) -> dict[str, str]:
+    return {
+        "event_type": event_type,
+        "payload": json.dumps(dict(payload), ensure_ascii=False, default=str),
+    }
+
+
+def _xadd_many(events: Sequence[tuple[str, Mapping[str, Any]]]) -> list[str]:
+    pipe = _get_redis().pipeline(transaction=False)
+    for event_type, payload in events:
+        pipe.xadd(STREAM_KEY, _stream_fields(event_type, payload), maxlen=STREAM_MAXLEN, approximate=True)
+    ids = pipe.execute()
+    return [i.decode() if isinstance(i, bytes) else str(i) for i in ids]
 
 def notify_operator_approved(ticket: dict, actor: dict) -> None:
     enqueue("ticket.operator_approved", {"ticket": ticket, "actor": actor})
@@ -33,14 +101,7 @@ def notify_operator_approved(ticket: dict, actor: dict) -> None:
 def notify_admin_approved(ticket: dict, actor: dict) -> None:
     enqueue("ticket.admin_approved", {"ticket": ticket, "actor": actor})
 
-def enqueue(event_type: str, payload: Mapping[str, Any]) -> str | None:
-    """
-    Кладемо подію в чергу: викликаємо handle_event у воркері.
-    Якщо Retry недоступний (старий RQ) — не передаємо його.
-    Повертає job.id або None у разі помилки (щоб не валити HTTP-запит).
-    """
-    q = _get_queue()
-
+def _job_kwargs() -> dict[str, Any]:
     # Базові аргументи для enqueue
     kwargs: dict[str, Any] = {
         "job_timeout": 60,
@@ -48,16 +109,93 @@ def enqueue(event_type: str, payload: Mapping[str, Any]) -> str | None:
     # Додаємо retry тільки якщо клас доступний
     if Retry is not None:
         kwargs["retry"] = Retry(max=3, interval=[5, 15, 30])
+    # після останнього повтору подія йде в dead-letter (app/services/deadletter.py)
+    if Callback is not None:
+        kwargs["on_failure"] = Callback(FAILURE_CALLBACK_PATH)
+    return kwargs
 
+
+def enqueue(event_type: str, payload: Mapping[str, Any]) -> str | None:
+    """
+    Кладемо подію в чергу: викликаємо handle_event у воркері
+    (RQ або Redis Stream — залежно від NOTIFICATIONS_BACKEND).
+    Якщо Retry недоступний (старий RQ) — не передаємо його.
+    Повертає job.id або None у разі помилки (щоб не валити HTTP-запит).
+    """
     try:
+        if BACKEND == "streams":
+            return _xadd_many([(event_type, payload)])[0]
+
+        q = _get_queue(lane_for(event_type, payload))
         job = q.enqueue(
-            "app.workers.rq_worker.handle_event",
+            HANDLER_PATH,
             event_type,
             dict(payload),
-            **kwargs,
+            **_job_kwargs(),
         )
         return getattr(job, "id", None)
     except Exception as e:
         # Логуємо й не піднімаємо виняток — щоб UI не отримував 500
         log.exception("Failed to enqueue event '%s': %s", event_type, e)
         return None
+
+
+def enqueue_many(events: Sequence[tuple[str, Mapping[str, Any]]]) -> list[str]:
+    """
+    Пакетний enqueue одним Redis-pipeline (використовує outbox-relay).
+    На відміну від enqueue() — НЕ ковтає помилки: relay має знати,
+    що батч не доїхав, і залишити події в outbox.
+    """
+    if not events:
+        return []
+    if BACKEND == "streams":
+        return _xadd_many(events)
+
+    kwargs = _job_kwargs()
+    by_lane: dict[str, list] = {}
+    for event_type, payload in events:
+        by_lane.setdefault(lane_for(event_type, payload), []).append(
+            Queue.prepare_data(
+                HANDLER_PATH,
+                args=(event_type, dict(payload)),
+                timeout=kwargs.get("job_timeout"),
+                retry=kwargs.get("retry"),
+                on_failure=kwargs.get("on_failure"),
+            )
+        )
+    # усі лейни — одним pipeline; всередині лейну порядок зберігається
+    ids: list[str] = []
+    with _get_redis().pipeline() as pipe:
+        for lane, datas in by_lane.items():
+            ids += [j.id for j in _get_queue(lane).enqueue_many(datas, pipeline=pipe)]
+        pipe.execute()
+    return ids
+
+
+def lane_stats(conn: redis.Redis | None = None) -> dict[str, dict[str, Any]]:
+    """
+    Глибина і латентність по лейнах: к-сть job-ів у черзі, вік найстарішого
+    (сек) і середня затримка enqueue→start за останні ~5 хв (пише воркер).
+    """
+    conn = conn or _get_redis()
+    out: dict[str, dict[str, Any]] = {}
+    now = time.time()
+    for lane in LANES:
+        q = Queue(lane_queue_name(lane), connection=conn)
+        oldest_age = None
+        head = q.get_job_ids(0, 0)
+        if head:
+            job = q.fetch_job(head[0])
+            if job is not None and job.enqueued_at is not None:
+                oldest_age = round(now - job.enqueued_at.replace(tzinfo=timezone.utc).timestamp(), 3)
+        lat = {k.decode() if isinstance(k, bytes) else k: float(v) for k, v in conn.hgetall(LATENCY_KEY_PREFIX + lane).items()}
+        n = lat.get("count", 0.0)
+        out[lane] = {
+            "queue": q.name,
+            "depth": q.count,
+            "oldest_age_s": oldest_age,
+            "started": q.started_job_registry.count,
+            "failed": q.failed_job_registry.count,
+            "latency_avg_ms": round(lat["sum_ms"] / n, 1) if n else None,
+        }
+    return out
@@ -0,0 +1,111 @@
+"""
+Transactional outbox для подій по заявках.
+
+Роутери НЕ ходять у Redis під час запиту: подія пишеться рядком у таблицю
+`outbox` у тій самій транзакції, що й зміна заявки (add_event + commit).
+Окремий async relay пакетно перекладає події в RQ і видаляє їх з outbox:
+  - латентність запиту не залежить від Redis;
+  - якщо Redis недоступний — події лишаються в таблиці й доїдуть пізніше.
+
+Порядок по заявці: relay бере події за зростанням id і кладе батч в RQ
+одним pipeline; якщо батч не доїхав — він цілком лишається в outbox і
+повториться наступним проходом у тому ж порядку. У Postgres одночасно
+дренує лише один relay (advisory lock), тож кілька uvicorn-воркерів не
+переставляють події місцями.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Mapping
+
+from sqlalchemy import delete, select, update, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import OutboxEvent
+from app.services.notifications import enqueue_many
+
+log = logging.getLogger(__name__)
+
+# ключ pg_advisory_xact_lock для relay (довільна константа)
+_RELAY_LOCK_KEY = 727_001
+
+
+def add_event(
+    db: AsyncSession,
+    event_type: str,
+    payload: Mapping[str, Any],
+    *,
+    ticket_id: int | None = None,
+) -> None:
+    """Додає подію в поточну транзакцію; запишеться разом із commit()."""
+    db.add(OutboxEvent(ticket_id=ticket_id, event_type=event_type, payload=dict(payload)))
+
+
+async def _try_lock(db: AsyncSession) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return True
+    res = await db.execute(text("SELECT pg_try_advisory_xact_lock(:k)"), {"k": _RELAY_LOCK_KEY})
+    return bool(res.scalar())
+
+
+async def relay_once(db: AsyncSession, batch_size: int | None = None) -> int:
+    """
+    Один прохід relay. Повертає кількість доставлених у RQ подій.
+    """
+    batch_size = batch_size or settings.outbox_batch_size
+    if not await _try_lock(db):
+        await db.rollback()
+        return 0
+
+    rows = (
+        await db.execute(
+            select(OutboxEvent)
+            .order_by(OutboxEvent.id.asc())
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+    ).scalars().all()
+    if not rows:
+        await db.rollback()
+        return 0
+
+    events = [(r.event_type, r.payload or {}) for r in rows]
+    try:
+        # redis-клієнт синхронний — не блокуємо event loop
+        await asyncio.to_thread(enqueue_many, events)
+    except Exception as e:
+        # батч не доїхав: лишаємо все в outbox, фіксуємо спробу
+        log.warning("outbox_relay_failed: %s", e)
+        await db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_([r.id for r in rows]))
+            .values(attempts=OutboxEvent.attempts + 1, last_error=str(e)[:1000])
+        )
+        await db.commit()
+        return 0
+
+    await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_([r.id for r in rows])))
+    await db.commit()
+    return len(rows)
+
+
+async def run_relay(session_factory, *, poll_interval: float | None = None) -> None:
+    """
+    Нескінченний цикл relay (запускається як background task у lifespan).
+    Поки є повні батчі — дренуємо без пауз, інакше спимо poll_interval.
+    """
+    poll_interval = poll_interval if poll_interval is not None else settings.outbox_poll_interval
+    while True:
+        try:
+            async with session_factory() as db:
+                sent = await relay_once(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("outbox_relay_error")
+            sent = 0
+        if sent < settings.outbox_batch_size:
+            await asyncio.sleep(poll_interval)
@@ -0,0 +1,130 @@
+# app/services/sla.py
+"""
+SLA-дедлайни заявок.
+
+Політика — пара (реакція, рішення) у хвилинах, за ключем:
+  "{dept}:{priority}"  →  "{priority}"  →  "default"
+Дефолти нижче; перевизначити можна через SLA_POLICIES (JSON), напр.
+  {"high": [30, 240], "mgmt:high": [15, 120]}
+
+stamp() виставляє tickets.response_due_at / resolve_due_at від created_at;
+mark_responded() фіксує першу реакцію — першу дію оператора/адміна над заявкою.
+
+Пошук прострочень — діапазоном по частковим індексам (лише відкриті заявки):
+  ix_tickets_response_due_open  (response_due_at) WHERE responded_at IS NULL AND status IN (...)
+  ix_tickets_resolve_due_open   (resolve_due_at)  WHERE status IN (...)
+Запит з тим самим предикатом + due_at BETWEEN now AND now+lead — index range
+scan, що читає лише заявки з дедлайном у вікні, а не всі відкриті.
+Повтори в сусідніх проходах відсікає Redis SET NX на (вид, заявка, дедлайн).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import redis
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import SLA_OPEN_STATUSES as OPEN_STATUSES, Ticket, User
+
+log = logging.getLogger(__name__)
+
+BREACH_IMMINENT_EVENT = "sla.breach_imminent"
+
+# (реакція, рішення), хвилини
+DEFAULT_POLICIES: dict[str, tuple[int, int]] = {
+    "high": (60, 8 * 60),
+    "medium": (4 * 60, 24 * 60),
+    "normal": (8 * 60, 3 * 24 * 60),
+    "low": (24 * 60, 7 * 24 * 60),
+    "default": (8 * 60, 3 * 24 * 60),
+}
+
+_WARNED_PREFIX = "sla:warned:"
+
+
+def _policies() -> dict[str, tuple[int, int]]:
+    policies = dict(DEFAULT_POLICIES)
+    if settings.sla_policies:
+        try:
+            policies.update({k: (int(v[0]), int(v[1])) for k, v in json.loads(settings.sla_policies).items()})
+        except (ValueError, TypeError, IndexError):
+            log.warning("sla_policies_invalid")
+    return policies
+
+
+def policy_for(priority: Any, dept: str | None) -> tuple[int, int]:
+    p = getattr(priority, "value", priority) or "normal"
+    policies = _policies()
+    return policies.get(f"{dept}:{p}") or policies.get(str(p)) or policies["default"]
+
+
+def stamp(t: Ticket, *, base: datetime | None = None) -> None:
+    """Дедлайни від base (для нової заявки created_at ще не завантажено)."""
+    base = base or t.created_at or datetime.now(timezone.utc)
+    response_min, resolve_min = policy_for(t.priority, t.dept)
+    t.response_due_at = base + timedelta(minutes=response_min)
+    t.resolve_due_at = base + timedelta(minutes=resolve_min)
+
+
+def mark_responded(t: Ticket) -> None:
+    """Перша дія оператора/адміна над заявкою (авто-призначення не рахується)."""
+    if t.responded_at is None:
+        t.responded_at = datetime.now(timezone.utc)
+
+
+def _imminent_query(kind: str, now: datetime, until: datetime):
+    due = Ticket.response_due_at if kind == "response" else Ticket.resolve_due_at
+    # предикат слово в слово як у часткового індексу — інакше планувальник його не візьме
+    pred = [Ticket.status.in_(OPEN_STATUSES)]
+    if kind == "response":
+        pred.append(Ticket.responded_at.is_(None))
+    return (
+        select(Ticket.id, Ticket.priority, Ticket.assignee_id, due.label("due_at"), User.email.label("assignee_email"))
+        .outerjoin(User, User.id == Ticket.assignee_id)
+        .where(and_(*pred))
+        .where(due > now, due <= until)
+        .order_by(due)
+    )
+
+
+async def find_imminent(db: AsyncSession, *, lead_s: int, now: datetime | None = None) -> list[dict[str, Any]]:
+    now = now or datetime.now(timezone.utc)
+    until = now + timedelta(seconds=lead_s)
+    out: list[dict[str, Any]] = []
+    for kind in ("response", "resolve"):
+        for r in (await db.execute(_imminent_query(kind, now, until))).all():
+            out.append({
+                "ticket_id": r.id,
+                "kind": kind,
+                "due_at": r.due_at.isoformat() if hasattr(r.due_at, "isoformat") else str(r.due_at),
+                "priority": getattr(r.priority, "value", str(r.priority)),
+                "assignee_id": r.assignee_id,
+                "assignee_email": r.assignee_email,
+            })
+    return out
+
+
+def emit_imminent(conn: redis.Redis, events: list[dict[str, Any]], enqueue, *, lead_s: int) -> int:
+    """sla.breach_imminent через enqueue; кожну пару (вид, заявка) — один раз."""
+    if not events:
+        return 0
+    # ключ включає due_at: перештампований дедлайн попереджається заново
+    keys = [f"{_WARNED_PREFIX}{e['kind']}:{e['ticket_id']}:{e['due_at']}" for e in events]
+    pipe = conn.pipeline(transaction=False)
+    for key in keys:
+        pipe.set(key, 1, nx=True, ex=lead_s * 2)
+    sent = 0
+    for e, key, fresh in zip(events, keys, pipe.execute()):
+        if not fresh:
+            continue
+        if enqueue(BREACH_IMMINENT_EVENT, e) is None:
+            conn.delete(key)  # не доїхало — спробуємо наступним проходом
+            continue
+        sent += 1
+    return sent
@@ -0,0 +1,182 @@
+# app/services/workload.py
+"""
+Живий індекс навантаження операторів для авто-призначення.
+
+  workload:operators — ZSET operator_id → к-сть відкритих заявок на ньому
+                       (статуси SLA_OPEN_STATUSES + assignee_id = оператор)
+
+Індекс оновлюється дельтами на кожне призначення / зміну статусу (apply),
+тож вибір найменш завантаженого — ZRANGE 0 0, O(log n), без агрегації по
+tickets. Вибір і +1 робляться одним Lua-скриптом: дві паралельні нові
+заявки не дістануться одному оператору «за старим» значенням.
+
+Дельти можуть розійтись із БД (впав процес між commit і ZINCRBY, ручні
+правки в БД) — maintenance-задача reconcile раз на інтервал перебудовує
+ZSET одним GROUP BY і атомарно підміняє ключ (RENAME).
+
+Усі функції «м'які»: недоступний Redis не ламає запит, заявка просто
+лишається без виконавця, як раніше.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+import redis
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import SLA_OPEN_STATUSES, RoleEnum, Ticket, User
+from app.services.notifications import _get_redis
+
+log = logging.getLogger(__name__)
+
+KEY = "workload:operators"
+
+# найменш завантажений → +1 атомарно; повертає id або nil
+_PICK_LUA = """
+local top = redis.call('ZRANGE', KEYS[1], 0, 0)
+if #top == 0 then return false end
+redis.call('ZINCRBY', KEYS[1], 1, top[1])
+return top[1]
+"""
+
+# ZINCRBY лише для тих, хто вже в індексі (неактивних/не-операторів не додаємо)
+_INCR_LUA = """
+for i = 1, #ARGV, 2 do
+  if redis.call('ZSCORE', KEYS[1], ARGV[i]) then
+    redis.call('ZINCRBY', KEYS[1], ARGV[i + 1], ARGV[i])
+  end
+end
+return 1
+"""
+
+
+def _is_open(status: Any) -> bool:
+    return status in SLA_OPEN_STATUSES
+
+
+def pick_least_loaded(conn: redis.Redis) -> int | None:
+    """Найменш завантажений активний оператор (його лічильник одразу +1)."""
+    try:
+        raw = conn.eval(_PICK_LUA, 1, KEY)
+    except redis.RedisError:
+        log.warning("workload_pick_failed", exc_info=log.isEnabledFor(logging.DEBUG))
+        return None
+    if not raw:
+        return None
+    return int(raw.decode() if isinstance(raw, bytes) else raw)
+
+
+def apply(
+    conn: redis.Redis,
+    *,
+    old_assignee: int | None,
+    old_status: Any,
+    new_assignee: int | None,
+    new_status: Any,
+) -> None:
+    """Дельта індексу після зміни заявки (викликати після commit)."""
+    deltas: dict[int, int] = {}
+    if old_assignee is not None and _is_open(old_status):
+        deltas[old_assignee] = deltas.get(old_assignee, 0) - 1
+    if new_assignee is not None and _is_open(new_status):
+        deltas[new_assignee] = deltas.get(new_assignee, 0) + 1
+    args: list[Any] = []
+    for op_id, d in deltas.items():
+        if d:
+            args += [op_id, d]
+    if not args:
+        return
+    try:
+        conn.eval(_INCR_LUA, 1, KEY, *args)
+    except redis.RedisError:
+        log.warning("workload_update_failed", exc_info=log.isEnabledFor(logging.DEBUG))
+
+
+def release(conn: redis.Redis, operator_id: int) -> None:
+    """Відкат pick_least_loaded, якщо заявку так і не збережено."""
+    apply(conn, old_assignee=operator_id, old_status=SLA_OPEN_STATUSES[0], new_assignee=None, new_status=None)
+
+
+def set_operator(conn: redis.Redis, operator_id: int, *, active: bool) -> None:
+    """Оператор з'явився (роль / активація) — у індекс з 0; зник — геть з індексу."""
+    try:
+        if active:
+            conn.zadd(KEY, {operator_id: 0}, nx=True)
+        else:
+            conn.zrem(KEY, operator_id)
+    except redis.RedisError:
+        log.warning("workload_update_failed", exc_info=log.isEnabledFor(logging.DEBUG))
+
+
+# ---------- async-обгортки для роутерів (Redis-клієнт синхронний) ----------
+# при вимкненому авто-призначенні індекс не ведемо — жодних походів у Redis із запиту
+
+
+async def claim() -> int | None:
+    if not settings.auto_assign_enabled:
+        return None
+    return await asyncio.to_thread(pick_least_loaded, _get_redis())
+
+
+async def unclaim(operator_id: int) -> None:
+    if not settings.auto_assign_enabled:
+        return
+    await asyncio.to_thread(release, _get_redis(), operator_id)
+
+
+async def track(*, old_assignee: int | None, old_status: Any, new_assignee: int | None, new_status: Any) -> None:
+    if not settings.auto_assign_enabled:
+        return
+    await asyncio.to_thread(
+        apply,
+        _get_redis(),
+        old_assignee=old_assignee,
+        old_status=old_status,
+        new_assignee=new_assignee,
+        new_status=new_status,
+    )
+
+
+async def track_operator(operator_id: int, *, active: bool) -> None:
+    if not settings.auto_assign_enabled:
+        return
+    await asyncio.to_thread(set_operator, _get_redis(), operator_id, active=active)
+
+
+def snapshot(conn: redis.Redis) -> dict[int, int]:
+    return {int(m): int(s) for m, s in conn.zrange(KEY, 0, -1, withscores=True)}
+
+
+async def rebuild(db: AsyncSession, conn: redis.Redis) -> int:
+    """Повний перерахунок з БД (reconcile). Повертає к-сть операторів в індексі."""
+    operators = (
+        await db.execute(
+            select(User.id).where(User.role == RoleEnum.operator).where(User.is_active == True)  # noqa: E712
+        )
+    ).scalars().all()
+    counts = dict(
+        (
+            await db.execute(
+                select(Ticket.assignee_id, func.count())
+                .where(Ticket.assignee_id.in_(operators))
+                .where(Ticket.status.in_(SLA_OPEN_STATUSES))
+                .group_by(Ticket.assignee_id)
+            )
+        ).all()
+    ) if operators else {}
+    await db.commit()
+    tmp = f"{KEY}:rebuild"
+    pipe = conn.pipeline(transaction=True)
+    pipe.delete(tmp)
+    if operators:
+        pipe.zadd(tmp, {op_id: int(counts.get(op_id, 0)) for op_id in operators})
+        pipe.rename(tmp, KEY)
+    else:
+        pipe.delete(KEY)
+    pipe.execute()
+    return len(operators)
@@ -0,0 +1,216 @@
+# app/workers/coalesce.py
+"""
+Вікно коалесценції подій по заявці (опційно, NOTIFICATIONS_COALESCE_WINDOW=N сек).
+
+Заявка часто проходить new→triage→in_progress за секунди, і кожен перехід /
+approve — окремий лист і вебхук. Коли вікно увімкнене, події однієї заявки
+не доставляються одразу, а складаються в Redis. Бакет = заявка + отримувач
+(e-mail автора з payload: "author" у status_changed, ticket.author_email в
+approve-подіях), визначений уже в offer():
+
+  coalesce:{ticket_id}:{recipient}  — список подій (RPUSH)
+  coalesce:due                      — ZSET ключів із часом flush
+
+Перша подія в бакеті відкриває вікно (ZADD NX). Після N секунд flush_due()
+забирає бакет атомарно і віддає ОДНУ доставку `ticket.coalesced` з повним
+списком переходів (або оригінальну подію, якщо вона була одна).
+Стан у Redis, тож кілька воркерів коалесціюють спільно; flush бере той,
+хто першим зробив ZREM.
+
+Доставка впала → бакет повертається в Redis (на початок списку, з
+attempts+1) і вікно перевідкривається через WINDOW_S × attempts; після
+MAX_ATTEMPTS спроб доставка йде в dead-letter (app/services/deadletter.py).
+Payload доставки несе delivery_id (сталий для тих самих подій бакета), а
+обробник шле кожен крок через deliver_once(): вебхук, що вже пішов, на
+повторі не дублюється — повторюється лише крок, що впав.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Mapping
+
+import redis
+
+from app.services import deadletter
+
+WINDOW_S = float(os.getenv("NOTIFICATIONS_COALESCE_WINDOW", "0"))
+# 1 спроба + 3 повтори, як STREAM_MAX_DELIVERIES / Retry(max=3) у RQ
+MAX_ATTEMPTS = int(os.getenv("NOTIFICATIONS_COALESCE_MAX_ATTEMPTS", "4"))
+
+COALESCED_EVENT = "ticket.coalesced"
+COALESCABLE = {"status_changed", "ticket.operator_approved", "ticket.admin_approved"}
+
+_DUE_KEY = "coalesce:due"
+_BUCKET_PREFIX = "coalesce:"
+_SENT_PREFIX = "coalesce:sent:"
+# відмітки «крок доставлено» мають пережити всі повтори і replay з dead-letter
+_SENT_TTL_S = 24 * 3600
+
+Dispatch = Callable[[str, Mapping[str, Any]], None]
+
+logger = logging.getLogger("worker.notifications.coalesce")
+
+
+def enabled() -> bool:
+    return WINDOW_S > 0
+
+
+def _ticket_id(payload: Mapping[str, Any]) -> Any:
+    ticket = payload.get("ticket") or {}
+    return payload.get("ticket_id", ticket.get("id"))
+
+
+def _recipient(payload: Mapping[str, Any]) -> str | None:
+    return payload.get("author") or (payload.get("ticket") or {}).get("author_email")
+
+
+def _bucket_key(ticket_id: Any, recipient: str | None) -> str:
+    return f"{_BUCKET_PREFIX}{ticket_id}:{recipient or ''}"
+
+
+def offer(conn: redis.Redis, event_type: str, payload: Mapping[str, Any]) -> bool | None:
+    """
+    Пробує покласти подію в бакет.
+    None  — подія не коалесціюється, доставляти як зазвичай;
+    True  — відкрито нове вікно (викликач має запланувати flush_due через WINDOW_S);
+    False — подію дописано у вже відкрите вікно.
+    """
+    if event_type not in COALESCABLE:
+        return None
+    ticket_id = _ticket_id(payload)
+    if ticket_id is None:
+        return None
+    recipient = _recipient(payload)
+    key = _bucket_key(ticket_id, recipient)
+    item = json.dumps(
+        {"event_type": event_type, "payload": dict(payload), "recipient": recipient, "at": time.time()},
+        default=str,
+    )
+
+    pipe = conn.pipeline(transaction=True)
+    pipe.rpush(key, item)
+    # страховка: бакет не живе вічно, навіть якщо flush так і не відбувся
+    pipe.expire(key, int(WINDOW_S * 10) + 60)
+    pipe.zadd(_DUE_KEY, {key: time.time() + WINDOW_S}, nx=True)
+    _, _, opened = pipe.execute()
+    return bool(opened)
+
+
+def _merge(key: str, items: list[dict]) -> dict[str, Any]:
+    ticket_id = key[len(_BUCKET_PREFIX):].partition(":")[0]
+    # отримувач у всіх подій бакета однаковий — він частина ключа
+    recipient = items[0].get("recipient")
+    transitions = [
+        {"from": i["payload"].get("from"), "to": i["payload"].get("to"), "at": i["at"]}
+        for i in items
+        if i["event_type"] == "status_changed"
+    ]
+    return {
+        "ticket_id": int(ticket_id) if ticket_id.isdigit() else ticket_id,
+        "recipient": recipient,
+        "events": items,
+        "transitions": transitions,
+    }
+
+
+def _delivery_id(key: str, items: list[dict]) -> str:
+    # attempts у items змінюється між повторами, тому id — лише з самих подій
+    raw = json.dumps([key, [(i["event_type"], i["at"]) for i in items]])
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def deliver_once(conn: redis.Redis, payload: Mapping[str, Any], destination: str, send: Callable[[], None]) -> None:
+    """
+    Крок доставки (вебхук на адресу / лист отримувачу) не більше одного разу
+    на delivery_id: повтор бакета після збою пропускає вже виконані кроки.
+    Payload без delivery_id (подія не з flush_due) — просто send().
+    """
+    delivery_id = payload.get("delivery_id")
+    if not delivery_id:
+        send()
+        return
+    key = f"{_SENT_PREFIX}{delivery_id}"
+    if conn.sismember(key, destination):
+        logger.info("coalesced_step_skipped", extra={"delivery_id": delivery_id, "destination": destination})
+        return
+    send()
+    pipe = conn.pipeline(transaction=False)
+    pipe.sadd(key, destination)
+    pipe.expire(key, _SENT_TTL_S)
+    pipe.execute()
+
+
+def _requeue(conn: redis.Redis, key: str, raw_items: list, attempts: int, now: float) -> None:
+    """Повертає забрані події на початок бакета (порядок зберігається) і перевідкриває вікно."""
+    marked = [json.dumps({**json.loads(r), "attempts": attempts}, default=str) for r in raw_items]
+    pipe = conn.pipeline(transaction=True)
+    pipe.lpush(key, *reversed(marked))
+    pipe.expire(key, int(WINDOW_S * 10 * (attempts + 1)) + 60)
+    pipe.zadd(_DUE_KEY, {key: now + WINDOW_S * attempts})
+    pipe.execute()
+
+
+def flush_due(
+    conn: redis.Redis,
+    dispatch: Dispatch,
+    *,
+    now: float | None = None,
+    destination_for: Callable[[str], str] | None = None,
+    schedule: Callable[[float], None] | None = None,
+) -> int:
+    """
+    Доставляє всі бакети, чиє вікно сплило. Повертає к-сть доставок.
+    Помилка dispatch не перериває flush: бакет повертається на повтор
+    (schedule(delay_s) — для RQ, де flush запускається відкладеним job-ом),
+    після MAX_ATTEMPTS — у dead-letter (адресат — destination_for(event_type)).
+    """
+    now = time.time() if now is None else now
+    delivered = 0
+    for raw_key in conn.zrangebyscore(_DUE_KEY, "-inf", now):
+        # ZREM == 1 → цей бакет наш (інший воркер його вже не візьме)
+        if not conn.zrem(_DUE_KEY, raw_key):
+            continue
+        key = raw_key.decode() if isinstance(raw_key, bytes) else str(raw_key)
+        pipe = conn.pipeline(transaction=True)
+        pipe.lrange(key, 0, -1)
+        pipe.delete(key)
+        raw_items, _ = pipe.execute()
+        items = [json.loads(r) for r in raw_items]
+        if not items:
+            continue
+        if len(items) == 1:
+            event_type, payload = items[0]["event_type"], dict(items[0]["payload"])
+        else:
+            event_type, payload = COALESCED_EVENT, _merge(key, items)
+        payload["delivery_id"] = _delivery_id(key, items)
+        try:
+            dispatch(event_type, payload)
+        except Exception as e:
+            attempts = max(i.get("attempts", 0) for i in items) + 1
+            if attempts < MAX_ATTEMPTS:
+                logger.warning(
+                    "coalesced_delivery_failed",
+                    extra={"bucket": key, "events": len(items), "attempts": attempts},
+                    exc_info=True,
+                )
+                _requeue(conn, key, raw_items, attempts, now)
+                if schedule is not None:
+                    schedule(WINDOW_S * attempts)
+                continue
+            entry_id = deadletter.record(
+                conn,
+                event_type,
+                payload,
+                destination=destination_for(event_type) if destination_for else "mail",
+                error_class=type(e).__name__,
+                error=str(e),
+            )
+            logger.error("coalesced_dead_lettered", extra={"bucket": key, "dlq_id": entry_id})
+            continue
+        delivered += 1
+    return delivered
@@ -0,0 +1,228 @@
+# app/workers/maintenance.py
+"""
+Планувальник фонових maintenance-задач усередині процесу воркера.
+
+Задачі:
+  - archive_done_tickets      — done довше за N днів → archived;
+  - move_archived_tickets     — archived → tickets_archive (див. services.archive);
+  - sla_breach_imminent       — заявки з дедлайном у найближчі sla_warning_lead_s → подія;
+  - workload_reconcile        — перебудова індексу навантаження операторів з БД;
+  - audit_partitions          — місячні партиції audit_log наперед + DROP старих (Postgres);
+  - close_answered_questions  — answered без руху M днів → closed.
+
+Обидві працюють обмеженими чанками: SELECT ... FOR UPDATE SKIP LOCKED
+на maintenance_chunk_size рядків, UPDATE, COMMIT — і так до вичерпання.
+Кожна транзакція коротка, рядки, які зараз редагує живий трафік, просто
+пропускаються (дістануться наступного проходу), тож довгих локів немає.
+
+Планувальник — окремий daemon-потік зі своїм event loop і своїм engine
+(async-engine не можна ділити між loop-ами). Щоб кілька воркерів / нод
+не робили ту саму роботу, кожен запуск задачі бере Redis-лок на інтервал.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+import redis
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.cache import invalidate_sync
+from app.core.config import settings
+from app.db.dialects import days_ago
+from app.db.models import Question, QuestionStatusEnum, Ticket, TicketStatusEnum
+from app.db.session import make_engine
+from app.services import audit, sla, workload
+from app.services.notifications import _get_redis, enqueue
+from app.services.archive import move_archived
+
+log = logging.getLogger("worker.maintenance")
+
+_LOCK_PREFIX = "maintenance:lock:"
+
+
+async def archive_done_tickets(db: AsyncSession, *, older_than_days: int, chunk: int) -> int:
+    """done, закриті понад older_than_days днів тому → archived. Повертає к-сть."""
+    total = 0
+    closed_at = func.coalesce(Ticket.resolved_at, Ticket.updated_at)
+    while True:
+        ids = (
+            await db.execute(
+                select(Ticket.id)
+                .where(Ticket.status == TicketStatusEnum.done)
+                .where(closed_at < days_ago(older_than_days))
+                .order_by(Ticket.id)
+                .limit(chunk)
+                .with_for_update(skip_locked=True)
+            )
+        ).scalars().all()
+        if not ids:
+            break
+        await db.execute(
+            update(Ticket)
+            .where(Ticket.id.in_(ids))
+            .values(status=TicketStatusEnum.archived, updated_at=func.now(), version=Ticket.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        # статус і version змінились — кешовані деталі (з ETag) і звіти застаріли
+        invalidate_sync(_get_redis(), *[f"ticket:{i}" for i in ids], "reports")
+        total += len(ids)
+        if len(ids) < chunk:
+            break
+    await db.commit()
+    return total
+
+
+async def close_answered_questions(db: AsyncSession, *, older_than_days: int, chunk: int) -> int:
+    """answered без оновлень понад older_than_days днів → closed. Повертає к-сть."""
+    total = 0
+    while True:
+        ids = (
+            await db.execute(
+                select(Question.id)
+                .where(Question.status == QuestionStatusEnum.answered)
+                .where(Question.updated_at < days_ago(older_than_days))
+                .order_by(Question.id)
+                .limit(chunk)
+                .with_for_update(skip_locked=True)
+            )
+        ).scalars().all()
+        if not ids:
+            break
+        await db.execute(
+            update(Question)
+            .where(Question.id.in_(ids))
+            .values(status=QuestionStatusEnum.closed, updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        invalidate_sync(_get_redis(), *[f"question:{i}" for i in ids], "reports")
+        total += len(ids)
+        if len(ids) < chunk:
+            break
+    await db.commit()
+    return total
+
+
+async def _sla_breach_imminent(db: AsyncSession) -> int:
+    lead_s = settings.sla_warning_lead_s
+    events = await sla.find_imminent(db, lead_s=lead_s)
+    await db.commit()
+    return sla.emit_imminent(_get_redis(), events, enqueue, lead_s=lead_s)
+
+
+async def _workload_reconcile(db: AsyncSession) -> int:
+    return await workload.rebuild(db, _get_redis())
+
+
+async def _audit_partitions(db: AsyncSession) -> int:
+    created = await audit.ensure_partitions(db, months_ahead=settings.audit_partitions_ahead)
+    dropped = await audit.drop_expired_partitions(db, retention_months=settings.audit_retention_months)
+    return created + dropped
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    interval_s: int
+    run: Callable[[AsyncSession], Awaitable[int]]
+    next_at: float = 0.0
+
+
+def default_jobs() -> list[PeriodicJob]:
+    chunk = settings.maintenance_chunk_size
+    jobs: list[PeriodicJob] = []
+    if settings.archive_done_after_days > 0:
+        jobs.append(PeriodicJob(
+            "archive_done_tickets",
+            settings.maintenance_interval_s,
+            lambda db: archive_done_tickets(db, older_than_days=settings.archive_done_after_days, chunk=chunk),
+        ))
+    jobs.append(PeriodicJob(
+        "move_archived_tickets",
+        settings.maintenance_interval_s,
+        lambda db: move_archived(db, chunk=chunk),
+    ))
+    if settings.sla_check_interval_s > 0:
+        jobs.append(PeriodicJob("sla_breach_imminent", settings.sla_check_interval_s, _sla_breach_imminent))
+    if settings.auto_assign_enabled:
+        jobs.append(PeriodicJob("workload_reconcile", settings.workload_reconcile_interval_s, _workload_reconcile))
+    if settings.audit_enabled:
+        jobs.append(PeriodicJob("audit_partitions", settings.maintenance_interval_s, _audit_partitions))
+    if settings.close_answered_after_days > 0:
+        jobs.append(PeriodicJob(
+            "close_answered_questions",
+            settings.maintenance_interval_s,
+            lambda db: close_answered_questions(db, older_than_days=settings.close_answered_after_days, chunk=chunk),
+        ))
+    return jobs
+
+
+class MaintenanceScheduler:
+    def __init__(self, jobs: list[PeriodicJob], *, redis_url: str | None = None, tick_s: float = 5.0) -> None:
+        self.jobs = jobs
+        self.tick_s = tick_s
+        self._redis = redis.from_url(redis_url) if redis_url else None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _claim(self, job: PeriodicJob) -> bool:
+        # один запуск на інтервал на весь кластер воркерів
+        if self._redis is None:
+            return True
+        try:
+            return bool(self._redis.set(f"{_LOCK_PREFIX}{job.name}", "1", nx=True, ex=max(job.interval_s - 1, 1)))
+        except redis.RedisError:
+            log.warning("maintenance_lock_unavailable", extra={"job": job.name})
+            return True
+
+    async def _loop(self) -> None:
+        engine = make_engine(workload="background")
+        sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                for job in self.jobs:
+                    if now < job.next_at:
+                        continue
+                    job.next_at = now + job.interval_s
+                    if not self._claim(job):
+                        continue
+                    t0 = time.perf_counter()
+                    try:
+                        async with sessions() as db:
+                            n = await job.run(db)
+                        log.info(
+                            "maintenance_done",
+                            extra={"job": job.name, "rows": n, "ms": round((time.perf_counter() - t0) * 1000)},
+                        )
+                    except Exception:
+                        log.exception("maintenance_failed", extra={"job": job.name})
+                await asyncio.sleep(self.tick_s)
+        finally:
+            await engine.dispose()
+
+    def start(self) -> None:
+        if not self.jobs:
+            return
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._loop()), name="maintenance", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def start_in_background() -> MaintenanceScheduler | None:
+    if not settings.maintenance_enabled:
+        return None
+    scheduler = MaintenanceScheduler(default_jobs(), redis_url=settings.redis_url)
+    scheduler.start()
+    log.info("maintenance_started", extra={"jobs": [j.name for j in scheduler.jobs]})
+    return scheduler
@@ -1,20 +1,45 @@
 # app/workers/rq_worker.py
 import os
+import argparse
 import logging
 import json
 import hmac, hashlib
+import multiprocessing
+import time
+from datetime import timedelta, timezone
 from typing import Any, Mapping
 
 import redis
 import requests
-from rq import Queue, Worker
+from rq import Queue, Worker, get_current_job
 
 from app.core.config import settings
 from app.core.logging import setup_logging
+from app.services import deadletter, mail
+from app.services.notifications import (
+    BACKEND as NOTIFICATIONS_BACKEND,
+    LANES,
+    LATENCY_KEY_PREFIX,
+    lane_queue_name,
+    lane_stats,
+)
+from app.workers import coalesce, maintenance
 
 QUEUE_NAME = os.getenv("NOTIFICATIONS_QUEUE", "notifications")
+# скільки процесів-воркерів і як вони діляться між лейнами (high/default/low)
+WORKER_PROCESSES = int(os.getenv("NOTIFICATIONS_WORKERS", "1"))
+LANE_WEIGHTS = os.getenv("NOTIFICATIONS_LANE_WEIGHTS", "high=6,default=3,low=1")
+REPORT_INTERVAL_S = int(os.getenv("NOTIFICATIONS_REPORT_INTERVAL", "60"))
 logger = logging.getLogger("worker.notifications")
 
+_conn: redis.Redis | None = None
+
+def _redis() -> redis.Redis:
+    global _conn
+    if _conn is None:
+        _conn = redis.from_url(settings.redis_url)
+    return _conn
+
 def _sign(payload: Mapping[str, Any]) -> str | None:
     if not settings.webhook_secret:
         return None
@@ -35,12 +60,48 @@ def _post(url: str, event_type: str, payload: Mapping[str, Any]) -> None:
 def send_mail_mock(to: str, subject: str, body: str) -> None:
     logger.info("SEND_MAIL", extra={"to": to, "subject": subject, "body_len": len(body)})
 
+def send_mail(to: str, subject: str, body: str) -> None:
+    """Відправка листа згідно settings.mail_backend (log | smtp | digest)."""
+    backend = settings.mail_backend
+    if backend == "smtp":
+        size, opened = mail.queue_mail(_redis(), to, subject, body)
+        if size >= settings.mail_batch_size:
+            # набралась пачка — шле той job, що її доповнив
+            mail.send_queued(_redis(), batches=1, schedule=_schedule_mail_flush)
+        elif opened and NOTIFICATIONS_BACKEND == "rq":
+            # streams-воркер сам викликає flush_outbox у своєму циклі
+            _schedule_mail_flush(settings.mail_flush_interval_s)
+    elif backend == "digest":
+        opened = mail.queue_digest(_redis(), to, subject, body)
+        if opened and NOTIFICATIONS_BACKEND == "rq":
+            # streams-воркер сам викликає flush_digests у своєму циклі
+            Queue(QUEUE_NAME, connection=_redis()).enqueue_in(
+                timedelta(seconds=settings.mail_digest_interval_s), "app.workers.rq_worker.flush_mail_digests",
+            )
+    else:
+        send_mail_mock(to, subject, body)
+
+def _schedule(func: str, delay_s: float) -> None:
+    Queue(QUEUE_NAME, connection=_redis()).enqueue_in(timedelta(seconds=delay_s), func)
+
+def _schedule_mail_flush(delay_s: float) -> None:
+    if NOTIFICATIONS_BACKEND == "rq":
+        _schedule("app.workers.rq_worker.flush_mail_outbox", delay_s)
+
+def flush_mail_outbox() -> int:
+    return mail.flush_outbox(_redis(), schedule=_schedule_mail_flush)
+
+def flush_mail_digests() -> int:
+    return mail.flush_digests(
+        _redis(), schedule=lambda delay: _schedule("app.workers.rq_worker.flush_mail_digests", delay),
+    )
+
 def on_ticket_created(payload: Mapping[str, Any]) -> None:
     ticket_id = payload.get("ticket_id")
     author = payload.get("author")
     logger.info("ticket_created", extra={"ticket_id": ticket_id, "author": author})
     if author:
-        send_mail_mock(author, f"Ticket #{ticket_id} created", "Your request was registered.")
+        send_mail(author, f"Ticket #{ticket_id} created", "Your request was registered.")
 
 def on_status_changed(payload: Mapping[str, Any]) -> None:
     ticket_id = payload.get("ticket_id")
@@ -48,41 +109,245 @@ def on_status_changed(payload: Mapping[str, Any]) -> None:
     new = payload.get("to")
     logger.info("status_changed", extra={"ticket_id": ticket_id, "from": old, "to": new})
 
+def _once(payload: Mapping[str, Any], destination: str, send) -> None:
+    # крок доставки подій з coalesce.flush_due — один раз на delivery_id:
+    # повтор бакета після збою не дублює вже виконані кроки
+    coalesce.deliver_once(_redis(), payload, destination, send)
+
 def on_operator_approved(payload: Mapping[str, Any]) -> None:
-    _post(settings.webhook_operator_approved or "", "ticket.operator_approved", payload)
+    url = settings.webhook_operator_approved or ""
+    _once(payload, f"webhook:{url}", lambda: _post(url, "ticket.operator_approved", payload))
     email = payload.get("ticket", {}).get("author_email")
     tid   = payload.get("ticket", {}).get("id")
     if email:
-        send_mail_mock(email, f"Заявку #{tid} погодив оператор", "Вашу заявку погоджено оператором.")
+        _once(payload, f"mail:{email}", lambda: send_mail(
+            email, f"Заявку #{tid} погодив оператор", "Вашу заявку погоджено оператором.",
+        ))
 
 def on_admin_approved(payload: Mapping[str, Any]) -> None:
-    _post(settings.webhook_admin_approved or "", "ticket.admin_approved", payload)
+    url = settings.webhook_admin_approved or ""
+    _once(payload, f"webhook:{url}", lambda: _post(url, "ticket.admin_approved", payload))
     email = payload.get("ticket", {}).get("author_email")
     tid   = payload.get("ticket", {}).get("id")
     if email:
-        send_mail_mock(email, f"Заявку #{tid} погодив адміністратор", "Вашу заявку остаточно погоджено адміном.")
+        _once(payload, f"mail:{email}", lambda: send_mail(
+            email, f"Заявку #{tid} погодив адміністратор", "Вашу заявку остаточно погоджено адміном.",
+        ))
+
+def on_sla_breach_imminent(payload: Mapping[str, Any]) -> None:
+    tid, kind, due = payload.get("ticket_id"), payload.get("kind"), payload.get("due_at")
+    logger.warning("sla_breach_imminent", extra={"ticket_id": tid, "kind": kind, "due_at": due})
+    email = payload.get("assignee_email")
+    if email:
+        what = "реакції" if kind == "response" else "вирішення"
+        send_mail(email, f"SLA: заявка #{tid} скоро прострочиться", f"Дедлайн {what}: {due}")
+
+_WEBHOOK_BY_EVENT = {
+    "ticket.operator_approved": lambda: settings.webhook_operator_approved,
+    "ticket.admin_approved": lambda: settings.webhook_admin_approved,
+}
+
+def on_coalesced(payload: Mapping[str, Any]) -> None:
+    """Одна доставка замість кількох подій заявки за вікно (див. coalesce.py)."""
+    ticket_id = payload.get("ticket_id")
+    events = payload.get("events") or []
+    transitions = payload.get("transitions") or []
+    logger.info("ticket_coalesced", extra={"ticket_id": ticket_id, "events": len(events), "transitions": transitions})
+
+    # по одному вебхуку на кожну адресу, незалежно від кількості подій
+    urls: dict[str, str] = {}
+    for e in events:
+        url = (_WEBHOOK_BY_EVENT.get(e.get("event_type")) or (lambda: None))()
+        if url:
+            urls.setdefault(url, e["event_type"])
+    # повтор бакета (впав лист) не шле вебхуки, що вже пішли — див. coalesce.deliver_once
+    for url in urls:
+        _once(payload, f"webhook:{url}", lambda url=url: _post(url, coalesce.COALESCED_EVENT, payload))
+
+    email = payload.get("recipient")
+    if email:
+        lines = [f"{t.get('from')} → {t.get('to')}" for t in transitions]
+        lines += [e["event_type"] for e in events if e.get("event_type") != "status_changed"]
+        _once(payload, f"mail:{email}", lambda: send_mail(
+            email, f"Заявка #{ticket_id}: {len(events)} оновлень", "\n".join(lines),
+        ))
 
 EVENT_HANDLERS: dict[str, callable] = {
     "ticket_created": on_ticket_created,
     "status_changed": on_status_changed,
     "ticket.operator_approved": on_operator_approved,
     "ticket.admin_approved": on_admin_approved,
+    "sla.breach_imminent": on_sla_breach_imminent,
+    coalesce.COALESCED_EVENT: on_coalesced,
 }
 
-def handle_event(event_type: str, payload: Mapping[str, Any] | None = None) -> None:
+def dispatch(event_type: str, payload: Mapping[str, Any] | None = None) -> None:
     handler = EVENT_HANDLERS.get(event_type)
     if not handler:
         logger.warning("unknown_event", extra={"event_type": event_type})
         return
     handler(payload or {})
 
+_LANE_BY_QUEUE = {lane_queue_name(l): l for l in LANES}
+
+def _record_latency() -> None:
+    """Затримка enqueue→start поточного job-а в ковзне вікно лейну (~5 хв)."""
+    job = get_current_job()
+    lane = _LANE_BY_QUEUE.get(getattr(job, "origin", None))
+    if job is None or lane is None or job.enqueued_at is None:
+        return
+    ms = (time.time() - job.enqueued_at.replace(tzinfo=timezone.utc).timestamp()) * 1000
+    key = LATENCY_KEY_PREFIX + lane
+    pipe = job.connection.pipeline(transaction=False)
+    pipe.hincrbyfloat(key, "sum_ms", ms)
+    pipe.hincrby(key, "count", 1)
+    pipe.expire(key, 300, nx=True)
+    pipe.execute()
+
+def handle_event(event_type: str, payload: Mapping[str, Any] | None = None) -> None:
+    payload = payload or {}
+    try:
+        _record_latency()
+    except Exception:
+        logger.debug("latency_record_failed", exc_info=True)
+    if coalesce.enabled():
+        opened = coalesce.offer(_redis(), event_type, payload)
+        if opened is None:
+            dispatch(event_type, payload)
+        elif opened and NOTIFICATIONS_BACKEND == "rq":
+            # streams-воркер сам викликає flush_due у своєму циклі
+            Queue(QUEUE_NAME, connection=_redis()).enqueue_in(
+                timedelta(seconds=coalesce.WINDOW_S), "app.workers.rq_worker.flush_coalesced",
+            )
+        return
+    dispatch(event_type, payload)
+
+def destination_for(event_type: str) -> str:
+    """Адресат події для індексу dead-letter: host вебхука або mail."""
+    url = (_WEBHOOK_BY_EVENT.get(event_type) or (lambda: None))()
+    return deadletter.destination_of(url, fallback="mail")
+
+def on_job_failure(job, connection, exc_type, exc_value, tb) -> None:
+    """RQ on_failure: у dead-letter лише після останнього повтору."""
+    if getattr(job, "should_retry", False):
+        return
+    args = list(getattr(job, "args", None) or [])
+    event_type = str(args[0]) if args else "unknown"
+    payload = args[1] if len(args) > 1 and isinstance(args[1], Mapping) else {}
+    entry_id = deadletter.record(
+        connection,
+        event_type,
+        payload,
+        destination=destination_for(event_type),
+        error_class=getattr(exc_type, "__name__", str(exc_type)),
+        error=str(exc_value),
+    )
+    logger.error("event_dead_lettered", extra={"event_type": event_type, "dlq_id": entry_id})
+
+def flush_coalesced() -> int:
+    return coalesce.flush_due(
+        _redis(), dispatch, destination_for=destination_for,
+        schedule=lambda delay: _schedule("app.workers.rq_worker.flush_coalesced", delay),
+    )
+
+def parse_weights(raw: str) -> dict[str, int]:
+    out = {lane: 1 for lane in LANES}
+    for part in raw.split(","):
+        lane, _, w = part.partition("=")
+        if lane.strip() in out and w.strip().isdigit():
+            out[lane.strip()] = max(int(w), 0)
+    return out
+
+def lane_orders(processes: int, weights: Mapping[str, int]) -> list[list[str]]:
+    """
+    Порядок черг для кожного процесу. Кількість процесів, що «ведуть» лейн
+    (слухають його першим), пропорційна вазі; кожен лейн веде хоча б один
+    процес (якщо процесів вистачає) — low не голодує. Решту лейнів процес
+    слухає за пріоритетом, тож вільний воркер допомагає сусіднім лейнам.
+    """
+    processes = max(processes, 1)
+    lanes = sorted(LANES, key=lambda l: -weights.get(l, 0))
+    leads = {l: 0 for l in LANES}
+    if processes >= len(LANES):
+        for l in LANES:
+            leads[l] = 1
+    else:
+        for l in lanes[:processes]:
+            leads[l] = 1
+    spare = processes - sum(leads.values())
+    total = sum(weights.get(l, 0) for l in LANES) or 1
+    if spare > 0:
+        shares = {l: spare * weights.get(l, 0) / total for l in LANES}
+        for l in LANES:
+            leads[l] += int(shares[l])
+        rest = spare - sum(int(v) for v in shares.values())
+        for l in sorted(LANES, key=lambda l: -(shares[l] - int(shares[l])))[:rest]:
+            leads[l] += 1
+    orders: list[list[str]] = []
+    for l in LANES:
+        orders += [[l] + [o for o in LANES if o != l]] * leads[l]
+    return orders
+
+def _run_worker(lanes: list[str], name: str, with_scheduler: bool) -> None:
+    setup_logging(settings.log_level)
+    conn = redis.from_url(settings.redis_url)
+    queues = [Queue(lane_queue_name(l), connection=conn) for l in lanes]
+    worker = Worker(queues, connection=conn, name=name)
+    worker.work(logging_level=logging.INFO, with_scheduler=with_scheduler)
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="RQ-воркер нотифікацій (лейни high/default/low)")
+    p.add_argument("-n", "--processes", type=int, default=WORKER_PROCESSES)
+    p.add_argument("--weights", default=LANE_WEIGHTS, help="напр. high=6,default=3,low=1")
+    return p.parse_args()
+
 def main() -> None:
+    args = _parse_args()
     setup_logging(settings.log_level)
-    logger.info("worker_starting", extra={"queue": QUEUE_NAME, "redis": settings.redis_url})
+    # with_scheduler — для відкладених flush_coalesced / flush_mail_outbox / flush_mail_digests
+    with_scheduler = coalesce.enabled() or settings.mail_backend in ("smtp", "digest")
+    base_name = os.getenv("WORKER_NAME", "notifications-worker")
+    orders = lane_orders(args.processes, parse_weights(args.weights))
+    logger.info("worker_starting", extra={"processes": len(orders), "orders": orders, "redis": settings.redis_url})
+
+    # периодичні maintenance-задачі — потік у головному процесі (не в кожному дочірньому)
+    maintenance.start_in_background()
+
+    if len(orders) == 1:
+        # один процес — строгий пріоритет high → default → low
+        _run_worker(list(LANES), base_name, with_scheduler)
+        return
+
+    def _spawn(i: int) -> multiprocessing.Process:
+        # планувальник достатньо тримати в одному процесі
+        proc = multiprocessing.Process(
+            target=_run_worker,
+            args=(orders[i], f"{base_name}-{i}", with_scheduler and i == 0),
+            daemon=False,
+        )
+        proc.start()
+        return proc
+
+    procs = [_spawn(i) for i in range(len(orders))]
     conn = redis.from_url(settings.redis_url)
-    queue = Queue(QUEUE_NAME, connection=conn)
-    worker = Worker([queue], connection=conn, name=os.getenv("WORKER_NAME", "notifications-worker"))
-    worker.work(logging_level=logging.INFO)
+    try:
+        while True:
+            time.sleep(REPORT_INTERVAL_S)
+            for i, proc in enumerate(procs):
+                if not proc.is_alive():
+                    logger.warning("worker_restarting", extra={"index": i, "exitcode": proc.exitcode})
+                    procs[i] = _spawn(i)
+            try:
+                logger.info("lanes", extra={"lanes": lane_stats(conn)})
+            except Exception:
+                logger.exception("lane_stats_failed")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.join(timeout=10)
 
 if __name__ == "__main__":
     main()
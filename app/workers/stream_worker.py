@@ -0,0 +1,168 @@
+# app/workers/stream_worker.py
+"""
+Альтернативний бекенд нотифікацій: Redis Streams + consumer group.
+
+Кілька процесів (на різних нодах) читають один стрім у складі однієї групи:
+  - XREADGROUP роздає кожен запис рівно одному споживачу;
+  - XACK лише після успішного handle_event → at-least-once доставка;
+  - записи, що зависли в PEL (споживач упав), забирає XAUTOCLAIM
+    після stream_claim_idle_ms;
+  - після STREAM_MAX_DELIVERIES невдалих спроб запис іде в dead-letter
+    (app/services/deadletter.py) і ACK-ається, щоб не крутився вічно.
+
+Диспетчеризація — той самий EVENT_HANDLERS/handle_event з rq_worker.py.
+Продюсер вмикається через NOTIFICATIONS_BACKEND=streams (app/services/notifications.py).
+"""
+
+import json
+import logging
+import os
+import socket
+from typing import Any
+
+import redis
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.services import deadletter, mail
+from app.services.notifications import STREAM_KEY
+from app.workers import coalesce, maintenance
+from app.workers.rq_worker import destination_for, dispatch, handle_event
+
+GROUP_NAME = os.getenv("NOTIFICATIONS_GROUP", "notifications-workers")
+CONSUMER_NAME = os.getenv("WORKER_NAME") or f"{socket.gethostname()}-{os.getpid()}"
+BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "100"))
+BLOCK_MS = int(os.getenv("STREAM_BLOCK_MS", "5000"))
+CLAIM_IDLE_MS = int(os.getenv("STREAM_CLAIM_IDLE_MS", "60000"))
+MAX_DELIVERIES = int(os.getenv("STREAM_MAX_DELIVERIES", "4"))  # 1 спроба + 3 повтори, як Retry(max=3) у RQ
+
+logger = logging.getLogger("worker.notifications.streams")
+
+
+def _s(v: Any) -> str:
+    return v.decode() if isinstance(v, bytes) else str(v)
+
+
+def ensure_group(conn: redis.Redis, stream: str = STREAM_KEY, group: str = GROUP_NAME) -> None:
+    try:
+        conn.xgroup_create(stream, group, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def _dispatch(fields: dict) -> None:
+    event_type = _s(fields.get(b"event_type", fields.get("event_type", "")))
+    raw = fields.get(b"payload", fields.get("payload"))
+    payload = json.loads(_s(raw)) if raw else {}
+    handle_event(event_type, payload)
+
+
+def _process(conn: redis.Redis, entries: list, *, stream: str, group: str) -> int:
+    """Обробляє записи, ACK-ає успішні одним викликом. Повертає к-сть оброблених."""
+    done: list = []
+    for entry_id, fields in entries:
+        if not fields:
+            # запис уже видалено з стріму (MAXLEN), у PEL лишився лише id
+            done.append(entry_id)
+            continue
+        try:
+            _dispatch(fields)
+            done.append(entry_id)
+        except Exception:
+            logger.exception("stream_event_failed", extra={"entry_id": _s(entry_id)})
+    if done:
+        conn.xack(stream, group, *done)
+    return len(done)
+
+
+def _drop_poison(conn: redis.Redis, *, stream: str, group: str) -> None:
+    """Записи, що перевищили MAX_DELIVERIES, — у dead-letter і ACK."""
+    pending = conn.xpending_range(stream, group, min="-", max="+", count=BATCH_SIZE, idle=CLAIM_IDLE_MS)
+    poison = [p["message_id"] for p in pending if p.get("times_delivered", 0) >= MAX_DELIVERIES]
+    for entry_id in poison:
+        for _id, fields in conn.xrange(stream, min=entry_id, max=entry_id):
+            event_type = _s(fields.get(b"event_type", fields.get("event_type", "")))
+            raw = fields.get(b"payload", fields.get("payload"))
+            try:
+                payload = json.loads(_s(raw)) if raw else {}
+            except ValueError:
+                payload = {"raw": _s(raw)}
+            deadletter.record(
+                conn,
+                event_type,
+                payload,
+                destination=destination_for(event_type),
+                error_class="MaxDeliveriesExceeded",
+                error=f"delivered {MAX_DELIVERIES} times without ack",
+            )
+    if poison:
+        logger.error("stream_event_dead_lettered", extra={"ids": [_s(i) for i in poison]})
+        conn.xack(stream, group, *poison)
+
+
+def _reclaim(conn: redis.Redis, *, stream: str, group: str, consumer: str) -> int:
+    _drop_poison(conn, stream=stream, group=group)
+    res = conn.xautoclaim(stream, group, consumer, min_idle_time=CLAIM_IDLE_MS, start_id="0-0", count=BATCH_SIZE)
+    claimed = res[1] if len(res) > 1 else []
+    return _process(conn, claimed, stream=stream, group=group) if claimed else 0
+
+
+def run(
+    conn: redis.Redis,
+    *,
+    stream: str = STREAM_KEY,
+    group: str = GROUP_NAME,
+    consumer: str = CONSUMER_NAME,
+    burst: bool = False,
+) -> int:
+    """
+    Основний цикл споживача. burst=True — вийти, щойно стрім порожній
+    (для бенчмарків/тестів). Повертає загальну к-сть оброблених записів.
+    """
+    ensure_group(conn, stream, group)
+    total = _reclaim(conn, stream=stream, group=group, consumer=consumer)
+    # з вікном коалесценції / буфером листів прокидаємось частіше, щоб вчасно їх флашити
+    block_ms = min(BLOCK_MS, int(coalesce.WINDOW_S * 1000)) if coalesce.enabled() else BLOCK_MS
+    if settings.mail_backend == "smtp":
+        block_ms = min(block_ms, int(settings.mail_flush_interval_s * 1000))
+    while True:
+        # помилка flush не має зупиняти споживача: бакети/дайджести лишаються в Redis
+        if coalesce.enabled():
+            try:
+                coalesce.flush_due(conn, dispatch, destination_for=destination_for)
+            except Exception:
+                logger.exception("coalesce_flush_failed")
+        if settings.mail_backend == "smtp":
+            try:
+                mail.flush_outbox(conn)
+            except Exception:
+                logger.exception("mail_flush_failed")
+        if settings.mail_backend == "digest":
+            try:
+                mail.flush_digests(conn)
+            except Exception:
+                logger.exception("digest_flush_failed")
+        resp = conn.xreadgroup(group, consumer, {stream: ">"}, count=BATCH_SIZE, block=None if burst else block_ms)
+        if not resp:
+            if burst:
+                return total
+            # тиша в стрімі — саме час підібрати зависле в PEL
+            total += _reclaim(conn, stream=stream, group=group, consumer=consumer)
+            continue
+        for _stream, entries in resp:
+            total += _process(conn, entries, stream=stream, group=group)
+
+
+def main() -> None:
+    setup_logging(settings.log_level)
+    logger.info(
+        "stream_worker_starting",
+        extra={"stream": STREAM_KEY, "group": GROUP_NAME, "consumer": CONSUMER_NAME},
+    )
+    maintenance.start_in_background()
+    run(redis.from_url(settings.redis_url))
+
+
+if __name__ == "__main__":
+    main()
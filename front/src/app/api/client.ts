@@ -20,15 +20,56 @@ api.interceptors.request.use((config) => {
     return config
 })
 
+/** POST-и, що створюють записи: Idempotency-Key на логічну дію (повтори — з тим самим ключем) */
+const IDEMPOTENT_POSTS = ['/tickets', '/questions', '/auth/register', '/auth/register-operator',
+    '/auth/password-recovery-request', '/auth/password/recovery']
+const IDEMPOTENT_RETRIES = 3
+
+/** crypto.randomUUID є лише в secure context (HTTPS / localhost); на plain HTTP — UUID v4 з getRandomValues */
+function idempotencyKey(): string {
+    if (typeof crypto.randomUUID === 'function') return crypto.randomUUID()
+    const b = crypto.getRandomValues(new Uint8Array(16))
+    b[6] = (b[6] & 0x0f) | 0x40
+    b[8] = (b[8] & 0x3f) | 0x80
+    const hex = Array.from(b, (x) => x.toString(16).padStart(2, '0')).join('')
+    return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`
+}
+
+api.interceptors.request.use((config) => {
+    if ((config.method ?? '').toLowerCase() === 'post' && IDEMPOTENT_POSTS.includes(config.url ?? '')) {
+        const h = config.headers as any
+        const has = typeof h.get === 'function' ? h.get('Idempotency-Key') : h['Idempotency-Key']
+        if (!has) {
+            const key = idempotencyKey()
+            if (typeof h.set === 'function') h.set('Idempotency-Key', key)
+            else h['Idempotency-Key'] = key
+        }
+    }
+    return config
+})
+
 /** 401 → логаут і редірект на /login.html */
 api.interceptors.response.use(
     (r) => r,
-    (err) => {
+    async (err) => {
         if (err?.response?.status === 401) {
             localStorage.removeItem('token')
             localStorage.removeItem('user')
             window.location.href = '/login.html'
         }
+        // таймаут / мережа / 409 «ще виконується» / 503 — безпечно повторити з тим самим ключем
+        const cfg = err?.config as any
+        const status = err?.response?.status
+        const keyed = cfg?.headers && (typeof cfg.headers.get === 'function'
+            ? cfg.headers.get('Idempotency-Key') : cfg.headers['Idempotency-Key'])
+        if (keyed && (!err.response || status === 409 || status === 503)
+            && (cfg.__idemRetry ?? 0) < IDEMPOTENT_RETRIES
+            && !(status === 409 && !err.response?.headers?.['retry-after'])) {
+            cfg.__idemRetry = (cfg.__idemRetry ?? 0) + 1
+            const wait = Number(err.response?.headers?.['retry-after'] ?? 0) * 1000 || 300 * cfg.__idemRetry
+            await new Promise((r) => setTimeout(r, wait))
+            return api.request(cfg)
+        }
         return Promise.reject(err)
     }
 )
@@ -0,0 +1,46 @@
+import os
+
+# тести ганяються без Postgres/Redis: in-memory SQLite і ті самі вимикачі, що й
+# у app.scripts.query_counts (змінні мають бути до першого імпорту app.*)
+os.environ["DATABASE_URL"] = os.environ.get("HARNESS_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+os.environ.setdefault("OUTBOX_RELAY_ENABLED", "false")
+os.environ.setdefault("AUDIT_ENABLED", "false")
+os.environ.setdefault("AUTO_ASSIGN_ENABLED", "false")
+os.environ.setdefault("CACHE_ENABLED", "false")
+
+import httpx
+import pytest_asyncio
+
+USERS = {
+    "admin": ("admin@t.io", "admin"),
+    "op": ("op@t.io", "operator"),
+    "op2": ("op2@t.io", "operator"),
+    "user": ("u@t.io", "user"),
+}
+
+
+@pytest_asyncio.fixture
+async def api():
+    """Клієнт поверх lifespan застосунку на чистій схемі + заголовки Authorization на роль."""
+    from app.core.security import hash_password
+    from app.db.models import Base, RoleEnum, User
+    from app.db.session import AsyncSessionLocal, engine
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        pw = hash_password("pw")
+        async with AsyncSessionLocal() as db:
+            for email, role in USERS.values():
+                db.add(User(email=email, password_hash=pw, role=RoleEnum(role), is_active=True))
+            await db.commit()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as c:
+            c.auth_headers = {}
+            for name, (email, _) in USERS.items():
+                r = await c.post("/api/auth/login", json={"username": email, "password": "pw"})
+                c.auth_headers[name] = {"Authorization": "Bearer " + r.json()["access_token"]}
+            yield c
+    # in-memory SQLite живе в конекті пулу, а він — у loop-і цього тесту
+    await engine.dispose()
@@ -0,0 +1,43 @@
+import pytest
+
+from app.core.admission import admission
+from app.core.config import settings
+
+
+@pytest.fixture
+def saturated_read(monkeypatch):
+    """Усі слоти класу read зайняті, черга — з одного місця на 50 мс."""
+    gate = admission.gates["read"]
+    monkeypatch.setattr(settings, "admission_queue_size", 1)
+    monkeypatch.setattr(settings, "admission_queue_timeout_s", 0.05)
+    held = gate.limit - gate.inflight
+    gate.inflight += held
+    yield gate
+    for _ in range(held):
+        gate.release()
+
+
+@pytest.mark.asyncio
+async def test_saturated_class_gets_503_with_retry_after(api, saturated_read):
+    H = {**api.auth_headers["user"], "Origin": "http://localhost:5173"}
+    r = await api.get("/api/tickets", headers=H)
+
+    assert r.status_code == 503
+    assert r.json()["class"] == "read"
+    assert int(r.headers["retry-after"]) >= 1
+    assert r.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert r.headers["x-request-id"]
+    assert saturated_read.stats["rejected_timeout"] >= 1
+
+    # інші класи не зачеплені
+    r = await api.post("/api/tickets", headers=H, json={"title": "t", "description": "d"})
+    assert r.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_without_waiting(api, saturated_read, monkeypatch):
+    monkeypatch.setattr(settings, "admission_queue_size", 0)
+    r = await api.get("/api/tickets", headers=api.auth_headers["user"])
+
+    assert r.status_code == 503 and "retry-after" in r.headers
+    assert saturated_read.stats["rejected_queue_full"] >= 1
@@ -0,0 +1,41 @@
+import fakeredis
+import pytest
+
+from app.core import idempotency
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(idempotency, "_get_redis", lambda: conn)
+    monkeypatch.setattr(idempotency, "_redis_down_until", 0.0)
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_retry_with_same_key_replays_without_new_row(api, redis_store):
+    U = {**api.auth_headers["user"], "Idempotency-Key": "k-1", "Origin": "http://localhost:5173"}
+    body = {"title": "t", "description": "d"}
+    first = await api.post("/api/tickets", headers=U, json=body)
+    again = await api.post("/api/tickets", headers=U, json=body)
+
+    assert first.status_code == again.status_code == 201
+    assert again.json()["id"] == first.json()["id"]
+    assert again.headers["idempotent-replayed"] == "true"
+    # повтор іде зсередини CORS і RequestId — їхні заголовки на місці
+    assert again.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert again.headers["x-request-id"]
+
+    r = await api.get("/api/tickets", headers=api.auth_headers["user"])
+    assert [t["id"] for t in r.json()] == [first.json()["id"]]
+
+
+@pytest.mark.asyncio
+async def test_same_key_with_other_body_is_422(api, redis_store):
+    U = {**api.auth_headers["user"], "Idempotency-Key": "k-2", "Origin": "http://localhost:5173"}
+    assert (await api.post("/api/tickets", headers=U, json={"title": "a", "description": "d"})).status_code == 201
+
+    r = await api.post("/api/tickets", headers=U, json={"title": "b", "description": "d"})
+    assert r.status_code == 422
+    assert r.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert r.headers["x-request-id"]
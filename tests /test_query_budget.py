@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+
+from app.scripts import query_budget
+
+SIZES = [10, 1000]
+
+
+@pytest.fixture(scope="module")
+def by_size() -> dict[int, dict[str, int]]:
+    return asyncio.run(query_budget.measure(SIZES))
+
+
+@pytest.mark.parametrize("sc", query_budget.SCENARIOS, ids=lambda sc: sc.name)
+def test_route_within_budget(by_size, sc):
+    budget = query_budget.load_budget()
+    assert sc.name in budget, f"{sc.name}: немає в query_budget.json (--write)"
+    counts = [by_size[n][sc.name] for n in SIZES]
+    assert not query_budget.problems(counts, budget[sc.name]), f"{sc.name}: {counts} при n={SIZES}"
+
+
+def test_all_routes_covered():
+    assert query_budget.uncovered_routes() == []
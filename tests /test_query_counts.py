@@ -0,0 +1,18 @@
+import asyncio
+
+import pytest
+
+from app.scripts import query_counts
+
+
+@pytest.fixture(scope="module")
+def counts() -> dict[str, int]:
+    return asyncio.run(query_counts.measure())
+
+
+@pytest.mark.parametrize("name", list(query_counts.MAX_STATEMENTS))
+def test_statement_count(counts, name):
+    assert name in counts, f"{name}: сценарій не виконався"
+    assert counts[name] <= query_counts.MAX_STATEMENTS[name], (
+        f"{name}: {counts[name]} SQL-стейтментів > {query_counts.MAX_STATEMENTS[name]}"
+    )
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from app.db.models import Ticket
+
+
+@pytest.fixture
+def concurrent_bump():
+    """Перед flush-ем чужий UPDATE піднімає version — гонка між SELECT і UPDATE хендлера."""
+
+    tickets = Ticket.__table__
+
+    def bump(session, flush_context, instances):
+        for obj in session.dirty:
+            if isinstance(obj, Ticket):
+                session.connection().execute(
+                    update(tickets).where(tickets.c.id == obj.id).values(version=tickets.c.version + 1)
+                )
+
+    event.listen(Session, "before_flush", bump)
+    yield
+    event.remove(Session, "before_flush", bump)
+
+
+async def _ticket(api) -> dict:
+    r = await api.post("/api/tickets", headers=api.auth_headers["user"], json={"title": "t", "description": "d"})
+    return r.json()
+
+
+@pytest.mark.asyncio
+async def test_stale_if_match_is_412(api):
+    t = await _ticket(api)
+    U, O = api.auth_headers["user"], api.auth_headers["op"]
+    stale = {"If-Match": f'"{t["version"]}"'}
+    r = await api.patch(f"/api/tickets/{t['id']}", headers={**U, **stale}, json={"title": "t2"})
+    assert r.status_code == 200 and r.headers["ETag"] == f'"{t["version"] + 1}"'
+
+    r = await api.patch(f"/api/tickets/{t['id']}", headers={**U, **stale}, json={"title": "t3"})
+    assert r.status_code == 412
+    r = await api.patch(f"/api/tickets/{t['id']}", headers={**O, **stale}, json={"status": "triage"})
+    assert r.status_code == 412
+    r = await api.post(f"/api/tickets/{t['id']}/operator-approve", headers={**O, **stale})
+    assert r.status_code == 412
+
+
+@pytest.mark.asyncio
+async def test_concurrent_change_without_if_match_is_409(api, concurrent_bump):
+    t = await _ticket(api)
+    r = await api.patch(f"/api/tickets/{t['id']}", headers=api.auth_headers["op"], json={"status": "triage"})
+    assert r.status_code == 409
+
+    r = await api.get(f"/api/tickets/{t['id']}", headers=api.auth_headers["admin"])
+    assert r.json()["status"] == "new"
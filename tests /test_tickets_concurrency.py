@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+
+async def _new_tickets(api, n: int) -> list[dict]:
+    U = api.auth_headers["user"]
+    return [
+        (await api.post("/api/tickets", headers=U, json={"title": f"t{i}", "description": "d"})).json()
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_next_never_hands_out_same_ticket(api):
+    created = await _new_tickets(api, 4)
+    heads = [api.auth_headers["op"], api.auth_headers["op2"]] * 4
+    rs = await asyncio.gather(*(api.post("/api/tickets/next", headers=h) for h in heads))
+
+    claimed = [r.json()["id"] for r in rs if r.status_code == 200]
+    assert sorted(claimed) == sorted(t["id"] for t in created)
+    assert [r.status_code for r in rs].count(204) == len(heads) - len(created)
+
+
+@pytest.mark.asyncio
+async def test_operator_approve_of_foreign_ticket_is_409(api):
+    (t,) = await _new_tickets(api, 1)
+    r = await api.post(f"/api/tickets/{t['id']}/operator-approve", headers=api.auth_headers["op"])
+    assert r.status_code == 200
+
+    r = await api.post(f"/api/tickets/{t['id']}/operator-approve", headers=api.auth_headers["op2"])
+    assert r.status_code == 409
+    r = await api.get(f"/api/tickets/{t['id']}", headers=api.auth_headers["admin"])
+    assert r.json()["version"] == t["version"] + 1
@@ -0,0 +1,29 @@
+import pytest
+
+
+async def _me(api, who: str) -> dict:
+    return (await api.get("/api/users/me", headers=api.auth_headers[who])).json()
+
+
+@pytest.mark.asyncio
+async def test_admin_update_of_own_account_returns_new_values(api):
+    A = api.auth_headers["admin"]
+    me = await _me(api, "admin")
+    r = await api.patch(f"/api/users/{me['id']}", headers=A, json={"name": "NEWNAME"})
+    assert r.status_code == 200
+    assert r.json()["name"] == "NEWNAME"
+    assert (await _me(api, "admin"))["name"] == "NEWNAME"
+
+
+@pytest.mark.asyncio
+async def test_admin_update_of_other_user(api):
+    other = await _me(api, "user")
+    r = await api.patch(f"/api/users/{other['id']}", headers=api.auth_headers["admin"], json={"name": "V", "is_active": False})
+    assert r.status_code == 200
+    assert r.json()["name"] == "V" and r.json()["is_active"] is False
+
+
+@pytest.mark.asyncio
+async def test_update_me_returns_new_values(api):
+    r = await api.patch("/api/users/me", headers=api.auth_headers["op"], json={"name": "N"})
+    assert r.status_code == 200 and r.json()["name"] == "N"